@@ -0,0 +1,18 @@
+import os
+import tempfile
+
+from app.export.cache import ArtifactCache, ArtifactKey
+from app.export.formats import (
+    CHUNK_SIZE, CSV_COLUMNS, MEDIA_TYPES, csv_chunks, export_chunks, file_chunks, gzip_chunks, json_chunks,
+)
+from app.export.jobs import ReportJobs
+from app.export.pdf import pdf_chunks
+
+# Rendered reports are cached on disk, keyed by report id, format and indicator data version
+REPORT_CACHE_DIR = os.getenv("TIP_REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tip-report-cache"))
+REPORT_CACHE_MAX_BYTES = int(os.getenv("TIP_REPORT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+REPORT_JOB_WORKERS = int(os.getenv("TIP_REPORT_JOB_WORKERS", "2"))
+
+# Opened in the application lifespan
+artifact_cache = ArtifactCache(REPORT_CACHE_DIR, REPORT_CACHE_MAX_BYTES)
+report_jobs = ReportJobs(artifact_cache, max_workers=REPORT_JOB_WORKERS)
@@ -0,0 +1,151 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Iterable, Iterator, NamedTuple, Optional
+
+
+class ArtifactKey(NamedTuple):
+    report_id: str
+    format: str
+    version: str
+
+    @property
+    def prefix(self) -> str:
+        return _report_prefix(self.report_id)
+
+    @property
+    def filename(self) -> str:
+        return f"{self.prefix}.{self.version}.{self.format}"
+
+
+def _report_prefix(report_id: str) -> str:
+    # Report ids come from clients; hashing keeps them out of the filesystem namespace
+    return hashlib.sha1(report_id.encode()).hexdigest()[:16]
+
+
+class ArtifactCache:
+    """Rendered report files on disk, evicted least recently used first once `max_bytes` is exceeded.
+
+    Files are written under a temporary name and renamed into place, so a
+    reader never sees a partial artifact. Several workers may share the
+    directory: each keeps its own index (rebuilt from the directory when
+    opened), and an entry whose file another worker evicted is a miss.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with os.scandir(self.directory) as it:
+            files = [(entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                     for entry in it if entry.is_file() and not entry.name.startswith(".")]
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            for _, name, size in sorted(files):
+                self._entries[name] = size
+                self._size += size
+        self._evict()
+
+    def size_of(self, key: ArtifactKey) -> Optional[int]:
+        """Size of a cached artifact, or None if it is not cached."""
+        with self._lock:
+            return self._entries.get(key.filename)
+
+    def get(self, key: ArtifactKey) -> Optional[BinaryIO]:
+        """An open file for the artifact, or None on a miss.
+
+        Artifacts written by other workers are picked up from the directory.
+        The file stays readable if it is evicted while being served.
+        """
+        name = key.filename
+        try:
+            file = open(os.path.join(self.directory, name), "rb")
+        except FileNotFoundError:
+            self._forget(name)
+            return None
+        with self._lock:
+            if name in self._entries:
+                self._entries.move_to_end(name)
+                return file
+        self._add(name, os.fstat(file.fileno()).st_size)
+        return file
+
+    def put(self, key: ArtifactKey, chunks: Iterable[bytes]) -> int:
+        """Write a whole artifact and return its size."""
+        for _ in self.tee(key, chunks):
+            pass
+        return self.size_of(key) or 0
+
+    def tee(self, key: ArtifactKey, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Pass `chunks` through while writing them to the cache.
+
+        The artifact is only stored once the stream has been fully consumed;
+        an abandoned stream (e.g. a client disconnecting mid-download) leaves
+        nothing behind.
+        """
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".part")
+        complete = False
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+                size = file.tell()
+            os.replace(path, os.path.join(self.directory, key.filename))
+            complete = True
+        finally:
+            if not complete:
+                os.unlink(path)
+        self._add(key.filename, size)
+
+    def discard_report(self, report_id: str):
+        """Drop every artifact of a report, in all formats and versions."""
+        prefix = _report_prefix(report_id) + "."
+        with self._lock:
+            names = [name for name in self._entries if name.startswith(prefix)]
+        # Other workers' artifacts for the report are not in this index, so look at the directory too
+        with os.scandir(self.directory) as it:
+            names += [entry.name for entry in it if entry.name.startswith(prefix)]
+        for name in set(names):
+            self._forget(name)
+            self._unlink(name)
+
+    def _add(self, name: str, size: int):
+        with self._lock:
+            self._size += size - self._entries.pop(name, 0)
+            self._entries[name] = size
+        self._evict()
+
+    def _forget(self, name: str):
+        with self._lock:
+            self._size -= self._entries.pop(name, 0)
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._size <= self.max_bytes or not self._entries:
+                    return
+                name, size = self._entries.popitem(last=False)
+                self._size -= size
+            self._unlink(name)
+
+    def _unlink(self, name: str):
+        try:
+            os.unlink(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
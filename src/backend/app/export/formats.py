@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator
+
+from app.export.pdf import pdf_chunks
+from app.store.records import IndicatorRecord, format_timestamp
+
+# Bytes buffered before a chunk is handed to the response
+CHUNK_SIZE = 64 * 1024
+
+CSV_COLUMNS = ["id", "type", "value", "source", "confidence", "timestamp", "tags", "description"]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "pdf": "application/pdf",
+}
+
+
+def csv_chunks(records: Iterable[IndicatorRecord], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """One header row, then one row per indicator; tags are joined with ';'."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for record in records:
+        writer.writerow((
+            record.id, record.type, record.value, record.source, record.confidence,
+            format_timestamp(record.timestamp), ";".join(record.tags), record.description or "",
+        ))
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def json_chunks(report: dict, records: Iterable[IndicatorRecord], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """`{"report": {...}, "indicators": [...]}`, written one indicator at a time."""
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    parts = ['{"report":', encode(report), ',"indicators":[']
+    size = sum(map(len, parts))
+    separator = ""
+    for record in records:
+        part = separator + encode(record.to_dict())
+        separator = ",\n"
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    parts.append("]}\n")
+    yield "".join(parts).encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Compress a chunk stream into a single gzip member as it is produced."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def file_chunks(file, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Read an open file out in chunks, closing it at the end."""
+    with file:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def export_chunks(format: str, report: dict, records: Iterable[IndicatorRecord]) -> Iterator[bytes]:
+    """Render `records` as an export of `report` in `format`, as a stream of byte chunks.
+
+    Records are pulled one at a time and output is flushed in bounded chunks,
+    so memory stays flat however many indicators are exported.
+    """
+    if format == "csv":
+        return csv_chunks(records)
+    if format == "json":
+        return json_chunks(report, records)
+    if format == "pdf":
+        return pdf_chunks(report, records)
+    raise ValueError(f"Unsupported export format {format!r}")
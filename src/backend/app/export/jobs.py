@@ -0,0 +1,99 @@
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+import anyio
+
+from app.export.cache import ArtifactCache, ArtifactKey
+from app.export.formats import export_chunks
+from app.repositories.base import IndicatorFilters, IndicatorRepository
+
+
+class ReportJobs:
+    """Renders report artifacts into the cache in the background.
+
+    At most `max_workers` renders run at once, each on a worker thread;
+    later submissions queue. Submitting a report/format that is already
+    queued or running returns the existing job, and one whose artifact is
+    already cached for the current data version completes immediately.
+    Job status lives in this process; the last `max_finished` finished jobs
+    are kept.
+    """
+
+    def __init__(self, cache: ArtifactCache, max_workers: int = 2, max_finished: int = 1000):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._active: Dict[tuple, dict] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self._jobs.get(job_id)
+
+    def submit(self, report: dict, format: str, repository: IndicatorRepository) -> dict:
+        active = self._active.get((report["id"], format))
+        if active is not None:
+            return active
+        job = {
+            "id": str(uuid.uuid4()),
+            "reportId": report["id"],
+            "format": format,
+            "status": "queued",
+            "dataVersion": None,
+            "cached": False,
+            "size": None,
+            "error": None,
+            "createdAt": datetime.now().isoformat(),
+            "finishedAt": None,
+        }
+        self._jobs[job["id"]] = job
+        self._active[(report["id"], format)] = job
+
+        async def run():
+            if self._limiter is None:
+                self._limiter = anyio.CapacityLimiter(self.max_workers)
+            try:
+                async with self._limiter:
+                    job["status"] = "running"
+                    # Read the version before the data: an artifact is never older than its key says
+                    key = ArtifactKey(report["id"], format, await repository.version())
+                    job["dataVersion"] = key.version
+                    job["size"] = self.cache.size_of(key)
+                    if job["size"] is not None:
+                        job["cached"] = True
+                    else:
+                        records = await repository.search(IndicatorFilters())
+                        job["size"] = await anyio.to_thread.run_sync(
+                            self.cache.put, key, export_chunks(format, report, records),
+                        )
+                job["status"] = "completed"
+            except Exception as exc:
+                job["status"] = "failed"
+                job["error"] = str(exc)
+            finally:
+                job["finishedAt"] = datetime.now().isoformat()
+                del self._active[(report["id"], format)]
+                self._prune()
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def _prune(self):
+        finished = len(self._jobs) - len(self._active)
+        for job_id in list(self._jobs):
+            if finished <= self.max_finished:
+                return
+            if self._jobs[job_id]["finishedAt"] is not None:
+                del self._jobs[job_id]
+                finished -= 1
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
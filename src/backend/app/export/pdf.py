@@ -0,0 +1,99 @@
+from typing import Iterable, Iterator, List
+
+from app.store.records import IndicatorRecord, format_timestamp
+
+# A4 in points, 7pt Courier: 4.2pt per character and a 9pt line pitch
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+MARGIN = 36
+FONT_SIZE = 7
+LEADING = 9
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+LINE_WIDTH = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.6))
+
+# Fixed object numbers; page content streams and pages are numbered from FIRST_PAGE_OBJECT up
+CATALOG, PAGES, FONT = 1, 2, 3
+FIRST_PAGE_OBJECT = 4
+
+
+def _escape(line: str) -> bytes:
+    line = line[:LINE_WIDTH].replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    # The standard Type1 fonts only cover Latin-1
+    return line.encode("latin-1", "replace")
+
+
+def _lines(report: dict, records: Iterable[IndicatorRecord]) -> Iterator[str]:
+    yield report.get("name", "")
+    if report.get("description"):
+        yield report["description"]
+    yield f"Created {report.get('createdAt', '')} by {report.get('createdBy', '')}"
+    yield ""
+    yield f"{'TYPE':<7} {'VALUE':<64} {'SOURCE':<16} {'CONF':>4} {'DATE':<10} TAGS"
+    for record in records:
+        yield (
+            f"{record.type:<7.7} {record.value:<64.64} {record.source:<16.16} {record.confidence:>4.2f} "
+            f"{format_timestamp(record.timestamp)[:10]} {','.join(record.tags)}"
+        )
+
+
+class _Writer:
+    """Tracks byte offsets of objects as they are emitted, for the cross-reference table."""
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+
+    def emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def obj(self, number: int, body: bytes) -> bytes:
+        self.offsets[number] = self.position
+        return self.emit(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+
+def pdf_chunks(report: dict, records: Iterable[IndicatorRecord]) -> Iterator[bytes]:
+    """A plain text listing as a PDF, one page at a time.
+
+    Objects are written as soon as a page fills up; the page tree and the
+    cross-reference table go at the end, so only their offsets (a few
+    integers per page) are kept.
+    """
+    writer = _Writer()
+    yield writer.emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    yield writer.obj(CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % PAGES)
+    yield writer.obj(FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+
+    pages: List[int] = []
+    next_object = FIRST_PAGE_OBJECT
+
+    def page(lines: List[bytes]) -> bytes:
+        nonlocal next_object
+        content_object, page_object = next_object, next_object + 1
+        next_object += 2
+        pages.append(page_object)
+        text = b"BT /F1 %d Tf %d TL %d %d Td\n" % (FONT_SIZE, LEADING, MARGIN, PAGE_HEIGHT - MARGIN - FONT_SIZE)
+        text += b"".join(b"(" + line + b") '\n" for line in lines) + b"ET"
+        stream = b"<< /Length %d >>\nstream\n" % len(text) + text + b"\nendstream"
+        return writer.obj(content_object, stream) + writer.obj(page_object, (
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+        ) % (PAGES, PAGE_WIDTH, PAGE_HEIGHT, FONT, content_object))
+
+    lines: List[bytes] = []
+    for line in _lines(report, records):
+        lines.append(_escape(line))
+        if len(lines) == LINES_PER_PAGE:
+            yield page(lines)
+            lines = []
+    if lines or not pages:
+        yield page(lines)
+
+    kids = b" ".join(b"%d 0 R" % number for number in pages)
+    yield writer.obj(PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(pages)))
+
+    xref_offset = writer.position
+    entries = [b"0000000000 65535 f \n"] + [b"%010d 00000 n \n" % writer.offsets[n] for n in range(1, next_object)]
+    yield (
+        b"xref\n0 %d\n" % next_object + b"".join(entries)
+        + b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (next_object, CATALOG, xref_offset)
+    )
@@ -0,0 +1,5 @@
+from app.ingest.ndjson import iter_batches, iter_lines
+from app.ingest.normalize import indicator_id_for, normalize_indicator
+
+# The feed pipeline pulls in httpx, so it is imported from app.ingest.pipeline
+# where needed rather than re-exported here.
@@ -0,0 +1,39 @@
+import zlib
+from typing import AsyncIterator, List, Tuple
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], compressed: bool = False) -> AsyncIterator[bytes]:
+    """Split a (optionally gzip-compressed) byte stream into non-empty lines without buffering the whole body."""
+    # wbits=47 accepts both gzip and zlib headers
+    decompressor = zlib.decompressobj(wbits=47) if compressed else None
+    pending = b""
+    async for chunk in chunks:
+        if decompressor is not None:
+            chunk = decompressor.decompress(chunk)
+        if not chunk:
+            continue
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield line
+    if decompressor is not None:
+        pending += decompressor.flush()
+        if not decompressor.eof:
+            raise zlib.error("Truncated gzip stream")
+    if pending.strip():
+        yield pending
+
+
+async def iter_batches(lines: AsyncIterator[bytes], size: int) -> AsyncIterator[List[Tuple[int, bytes]]]:
+    """Group lines into batches of (line_number, line), numbering from 1."""
+    batch: List[Tuple[int, bytes]] = []
+    number = 0
+    async for line in lines:
+        number += 1
+        batch.append((number, line))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,30 @@
+import hashlib
+from datetime import datetime, timezone
+
+from app.store import IndicatorRecord, parse_timestamp
+
+
+def indicator_id_for(type: str, value: str) -> str:
+    return "indicator-" + hashlib.sha1(f"{type}:{value}".encode()).hexdigest()[:16]
+
+
+def normalize_indicator(item: dict, source: str) -> IndicatorRecord:
+    """Build a record from a feed or bulk-ingest item; raises KeyError/ValueError/TypeError for malformed items."""
+    type = item["type"]
+    value = item["value"].strip()
+    if not type or not value:
+        raise ValueError("type and value are required")
+    timestamp = item.get("timestamp")
+    confidence = float(item.get("confidence", 0.5))
+    if not 0.0 <= confidence <= 1.0:
+        raise ValueError("confidence must be between 0 and 1")
+    return IndicatorRecord(
+        id=item.get("id") or indicator_id_for(type, value),
+        type=type,
+        value=value,
+        source=item.get("source") or source,
+        confidence=confidence,
+        timestamp=parse_timestamp(timestamp) if timestamp else datetime.now(timezone.utc).timestamp(),
+        tags=tuple(item.get("tags") or ()),
+        description=item.get("description"),
+    )
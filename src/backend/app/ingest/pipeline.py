@@ -0,0 +1,245 @@
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from app.ingest.normalize import normalize_indicator
+from app.repositories import FeedIndicatorRepository, IndicatorRepository
+from app.store import IndicatorRecord
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FeedSource:
+    feed_id: str
+    url: str
+    source: str
+    # Maximum requests per second against this feed; 0 disables the limit
+    rate_limit: float = 0.0
+
+
+@dataclass
+class IngestStats:
+    feed_id: str
+    status: str = "pending"
+    received: int = 0
+    ingested: int = 0
+    duplicates: int = 0
+    rejected: int = 0
+    batches: int = 0
+    attempts: int = 0
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def indicators_per_second(self) -> float:
+        return self.ingested / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class _Validators:
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass
+class _RateLimiter:
+    rate: float
+    _next: float = 0.0
+    _lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    async def wait(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + 1.0 / self.rate
+
+
+class FeedIngestor:
+    """Pulls threat feeds concurrently and upserts their indicators into a repository.
+
+    Feeds are fetched with at most `max_concurrency` requests in flight, each
+    behind its own rate limiter. Transport errors, 429 and 5xx responses are
+    retried with exponential backoff (honouring Retry-After, both capped at
+    `max_backoff` seconds); a retry picks up after the indicators an earlier
+    attempt already stored. ETag and Last-Modified validators from the
+    previous successful pull are sent back so unchanged feeds cost a 304. NDJSON bodies are parsed line by line as
+    they arrive; JSON documents (a list, or an object with an `indicators`
+    list) are parsed whole. Indicators are deduplicated on (type, value) and
+    written to the repository in batches. With `links`, each batch is also
+    linked to its feed; an indicator published by several feeds in one run
+    is linked to the first.
+    """
+
+    def __init__(
+        self,
+        repository: IndicatorRepository,
+        max_concurrency: int = 4,
+        batch_size: int = 1000,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 30.0,
+        client_factory: Optional[Callable[[], httpx.AsyncClient]] = None,
+        links: Optional[FeedIndicatorRepository] = None,
+    ):
+        self.repository = repository
+        self.links = links
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self._client_factory = client_factory or (lambda: httpx.AsyncClient(timeout=timeout))
+        self._validators: Dict[str, _Validators] = {}
+        self._limiters: Dict[str, _RateLimiter] = {}
+
+    async def run(self, feeds: List[FeedSource]) -> List[IngestStats]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Shared across feeds so the same indicator published twice is only counted once
+        seen: Set[Tuple[str, str]] = set()
+
+        async def ingest(client: httpx.AsyncClient, feed: FeedSource) -> IngestStats:
+            async with semaphore:
+                return await self.ingest_feed(client, feed, seen)
+
+        async with self._client_factory() as client:
+            return list(await asyncio.gather(*(ingest(client, feed) for feed in feeds)))
+
+    async def ingest_feed(
+        self, client: httpx.AsyncClient, feed: FeedSource, seen: Optional[Set[Tuple[str, str]]] = None
+    ) -> IngestStats:
+        stats = IngestStats(feed_id=feed.feed_id)
+        seen = set() if seen is None else seen
+        started = time.perf_counter()
+        try:
+            await self._pull(client, feed, stats, seen)
+        except (httpx.HTTPError, ValueError) as exc:
+            stats.status = "failed"
+            stats.error = str(exc) or exc.__class__.__name__
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    async def _pull(self, client: httpx.AsyncClient, feed: FeedSource, stats: IngestStats, seen: Set[Tuple[str, str]]):
+        validators = self._validators.setdefault(feed.feed_id, _Validators())
+        limiter = self._limiters.setdefault(feed.feed_id, _RateLimiter(feed.rate_limit))
+        # The feed's limit may have been changed since its last pull
+        limiter.rate = feed.rate_limit
+        headers = {}
+        if validators.etag:
+            headers["If-None-Match"] = validators.etag
+        if validators.last_modified:
+            headers["If-Modified-Since"] = validators.last_modified
+        # (type, value) keys this pull has written, so a retry neither re-stores nor counts them as duplicates
+        stored: Set[Tuple[str, str]] = set()
+
+        for attempt in range(self.max_retries + 1):
+            await limiter.wait()
+            stats.attempts += 1
+            # Counts start over with each attempt; ingested and batches only ever cover what was written
+            stats.received = stats.duplicates = stats.rejected = 0
+            retry_after = None
+            try:
+                async with client.stream("GET", feed.url, headers=headers) as response:
+                    if response.status_code == 304:
+                        stats.status = "not_modified"
+                        return
+                    if response.status_code not in RETRYABLE_STATUS:
+                        response.raise_for_status()
+                        await self._consume(response, feed, stats, seen, stored)
+                        validators.etag = response.headers.get("ETag")
+                        validators.last_modified = response.headers.get("Last-Modified")
+                        stats.status = "updated"
+                        return
+                    retry_after = response.headers.get("Retry-After")
+                    error: Exception = httpx.HTTPStatusError(
+                        f"{response.status_code} from {feed.url}", request=response.request, response=response
+                    )
+            except httpx.TransportError as exc:
+                error = exc
+            if attempt == self.max_retries:
+                raise error
+            await asyncio.sleep(self._backoff(attempt, retry_after))
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        delay = min(self.backoff_base * (2 ** attempt), self.max_backoff)
+        return delay + random.uniform(0, delay / 2)
+
+    async def _consume(
+        self,
+        response: httpx.Response,
+        feed: FeedSource,
+        stats: IngestStats,
+        seen: Set[Tuple[str, str]],
+        stored: Set[Tuple[str, str]],
+    ):
+        batch: List[IndicatorRecord] = []
+        replayed: Set[Tuple[str, str]] = set()
+        try:
+            async for item in self._items(response):
+                stats.received += 1
+                try:
+                    record = normalize_indicator(item, feed.source)
+                except (KeyError, ValueError, TypeError, AttributeError):
+                    stats.rejected += 1
+                    continue
+                key = (record.type, record.value)
+                if key in stored and key not in replayed:
+                    # Written by an earlier attempt of this pull
+                    replayed.add(key)
+                    continue
+                if key in seen:
+                    stats.duplicates += 1
+                    continue
+                # Claimed straight away so concurrent feeds skip it, released below if it is never written
+                seen.add(key)
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    await self._flush(batch, stats, stored)
+                    batch = []
+                    await asyncio.sleep(0)
+            if batch:
+                await self._flush(batch, stats, stored)
+        except BaseException:
+            seen.difference_update((record.type, record.value) for record in batch)
+            raise
+
+    async def _flush(self, batch: List[IndicatorRecord], stats: IngestStats, stored: Set[Tuple[str, str]]):
+        # Re-publishing a known indicator updates it in place rather than adding a second copy
+        existing = await self.repository.find_ids([(record.type, record.value) for record in batch])
+        for record in batch:
+            record.id = existing.get((record.type, record.value), record.id)
+        await self.repository.add_many(batch)
+        if self.links is not None:
+            await self.links.link(stats.feed_id, batch)
+        stored.update((record.type, record.value) for record in batch)
+        stats.ingested += len(batch)
+        stats.batches += 1
+
+    @staticmethod
+    async def _items(response: httpx.Response) -> AsyncIterator[dict]:
+        content_type = response.headers.get("Content-Type", "")
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            async for line in response.aiter_lines():
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield {}
+            return
+        document = json.loads(await response.aread())
+        items = document.get("indicators", []) if isinstance(document, dict) else document
+        for item in items:
+            yield item
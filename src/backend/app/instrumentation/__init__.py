@@ -0,0 +1,20 @@
+import os
+
+from app.instrumentation.metrics import CONTENT_TYPE, Counter, Histogram, sample_lines
+from app.instrumentation.middleware import (
+    Instrumentation, InstrumentationMiddleware, InstrumentedRoute, RequestTimings, phase,
+)
+
+# Per-route latency and phase timings; "0" removes the middleware entirely
+METRICS_ENABLED = os.getenv("TIP_METRICS", "1") == "1"
+# "1" lets loopback clients scrape /api/metrics without a token. Off by default: behind a
+# reverse proxy on the same host every request arrives from loopback
+METRICS_LOOPBACK_SCRAPE = os.getenv("TIP_METRICS_LOOPBACK_SCRAPE", "0") == "1"
+# Fraction of requests whose peak memory is sampled; any value above 0 turns tracemalloc on
+MEMORY_SAMPLE_RATE = float(os.getenv("TIP_TRACEMALLOC_SAMPLE_RATE", "0"))
+TRACEMALLOC_FRAMES = int(os.getenv("TIP_TRACEMALLOC_FRAMES", "1"))
+# Lets a request ask for a cProfile run with an X-Profile header
+PROFILING_ENABLED = os.getenv("TIP_PROFILING", "0") == "1"
+
+# Started and stopped in the application lifespan
+instrumentation = Instrumentation(MEMORY_SAMPLE_RATE, TRACEMALLOC_FRAMES, PROFILING_ENABLED)
@@ -0,0 +1,102 @@
+import bisect
+import threading
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Prometheus text exposition format; Starlette appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Seconds; wide enough for a cache hit and a full report export alike
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def sample_lines(name: str, kind: str, help: str, samples: Iterable[Tuple[Labels, float]]) -> Iterator[str]:
+    """HELP and TYPE lines for a metric followed by one line per labelled sample."""
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} {kind}"
+    for labels, value in samples:
+        yield f"{name}{format_labels(labels)} {_number(value)}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Prometheus histogram family: fixed bucket bounds, one set of counters per label set."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Labels, value: float):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = _Histogram(len(self.buckets) + 1)
+            # Non-cumulative here; render() sums them up
+            series.counts[bisect.bisect_left(self.buckets, value)] += 1
+            series.sum += value
+            series.count += 1
+
+    def totals(self) -> Dict[Labels, Tuple[float, int]]:
+        """Sum and count of the observations for each label set."""
+        with self._lock:
+            return {labels: (s.sum, s.count) for labels, s in self._series.items()}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(s.counts), s.sum, s.count) for labels, s in sorted(self._series.items())]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                lines.append(f"{self.name}_bucket{format_labels(labels + (('le', _number(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {count}")
+        return lines
+
+
+class Counter:
+    """Prometheus counter family."""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            samples = sorted(self._values.items())
+        return list(sample_lines(self.name, "counter", self.help, samples))
@@ -0,0 +1,298 @@
+import asyncio
+import cProfile
+import functools
+import io
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, Optional
+
+from fastapi.routing import APIRoute
+
+from app.instrumentation.metrics import Counter, Histogram, Labels, sample_lines
+
+# Bytes, for the peak memory of sampled requests
+MEMORY_BUCKETS = tuple(float(1 << shift) for shift in range(10, 31, 2))
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestTimings:
+    """Time spent in each phase of one request.
+
+    The route splits a request into consecutive segments (validation, then
+    handler, then serialization). Time inside a named `phase` is charged to
+    that phase and taken out of the segment it ran in.
+    """
+
+    __slots__ = ("phases", "_segment", "_mark", "_nested")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self._segment: Optional[str] = None
+        self._mark = 0.0
+        self._nested = 0.0
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def split(self, next_segment: Optional[str]):
+        """Close the current segment, if any, and start `next_segment`."""
+        now = time.perf_counter()
+        if self._segment is not None:
+            self.add(self._segment, max(0.0, now - self._mark - self._nested))
+        self._segment = next_segment
+        self._mark = now
+        self._nested = 0.0
+
+    def nested(self, seconds: float):
+        self._nested += seconds
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Charge the time spent in the block to `name` in the current request's timings."""
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timings.add(name, elapsed)
+        timings.nested(elapsed)
+
+
+def _timed_endpoint(endpoint: Callable) -> Callable:
+    # functools.wraps keeps the signature FastAPI reads parameters and the response model from
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            timings = _timings.get()
+            if timings is None:
+                return await endpoint(*args, **kwargs)
+            timings.split("handler")
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                timings.split("serialization")
+    else:
+        @functools.wraps(endpoint)
+        def timed(*args, **kwargs):
+            timings = _timings.get()
+            if timings is None:
+                return endpoint(*args, **kwargs)
+            timings.split("handler")
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                timings.split("serialization")
+    return timed
+
+
+class InstrumentedRoute(APIRoute):
+    """APIRoute that splits each request into validation, handler and serialization time.
+
+    Validation covers dependency resolution and body parsing, handler is the
+    endpoint itself, serialization is response model validation and encoding.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            timings = _timings.get()
+            if timings is None:
+                return await handler(request)
+            timings.split("validation")
+            try:
+                return await handler(request)
+            finally:
+                timings.split(None)
+
+        return timed_handler
+
+
+class Instrumentation:
+    """Request metrics for this worker, plus optional allocation sampling and per-request profiles.
+
+    With `memory_sample_rate` above zero, tracemalloc runs from `start()`
+    (slowing every allocation) and that fraction of requests records the
+    peak traced memory above where it started. Only one request is sampled
+    at a time, but concurrent requests still add to its peak.
+
+    With `profiling` on, a request sent with an X-Profile header runs under
+    cProfile and its id comes back in X-Profile-Id. The profiler sees the
+    whole thread, so other requests in flight show up in the profile too;
+    one profile runs at a time and the last `max_profiles` are kept.
+    """
+
+    def __init__(
+        self, memory_sample_rate: float = 0.0, trace_frames: int = 1, profiling: bool = False, max_profiles: int = 16,
+    ):
+        self.memory_sample_rate = memory_sample_rate
+        self.trace_frames = trace_frames
+        self.profiling = profiling
+        self.max_profiles = max_profiles
+        self.requests = Counter("tip_http_requests_total", "Requests handled, by method, route and status code.")
+        self.latency = Histogram(
+            "tip_http_request_duration_seconds", "Time from receiving a request to sending the last body byte.",
+        )
+        self.phases = Histogram(
+            "tip_http_request_phase_seconds",
+            "Time per request phase: auth, validation (other dependencies and body parsing), handler, serialization.",
+        )
+        self.memory = Histogram(
+            "tip_http_request_memory_peak_bytes",
+            "Peak traced memory above the starting point, for sampled requests.",
+            MEMORY_BUCKETS,
+        )
+        self.in_progress = 0
+        self._profiles: "OrderedDict[str, cProfile.Profile]" = OrderedDict()
+        self._profiling_active = False
+        self._sampling_active = False
+        self._started_tracing = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.memory_sample_rate > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def record(self, labels: Labels, status: int, seconds: float, timings: RequestTimings):
+        self.requests.inc(labels + (("status", str(status)),))
+        self.latency.observe(labels, seconds)
+        for name, elapsed in timings.phases.items():
+            self.phases.observe(labels + (("phase", name),), elapsed)
+
+    def begin_memory_sample(self) -> Optional[int]:
+        """Traced bytes at the start of a sampled request, or None if this request is not sampled."""
+        if self.memory_sample_rate <= 0 or not tracemalloc.is_tracing() or random.random() >= self.memory_sample_rate:
+            return None
+        with self._lock:
+            if self._sampling_active:
+                return None
+            self._sampling_active = True
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+
+    def end_memory_sample(self, labels: Labels, baseline: int):
+        if tracemalloc.is_tracing():
+            self.memory.observe(labels, max(0, tracemalloc.get_traced_memory()[1] - baseline))
+        self._sampling_active = False
+
+    def begin_profile(self) -> Optional[cProfile.Profile]:
+        with self._lock:
+            if not self.profiling or self._profiling_active:
+                return None
+            self._profiling_active = True
+        return cProfile.Profile()
+
+    def end_profile(self, profile_id: str, profile: cProfile.Profile):
+        with self._lock:
+            self._profiles[profile_id] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+            self._profiling_active = False
+
+    def profile_report(self, profile_id: str, sort: str = "cumulative", limit: int = 50) -> Optional[str]:
+        profile = self._profiles.get(profile_id)
+        if profile is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(profile, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def allocation_report(self, limit: int = 25) -> Optional[str]:
+        """The source lines holding the most traced memory, or None when tracemalloc is off."""
+        if not tracemalloc.is_tracing():
+            return None
+        top = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+        return "".join(f"{stat}\n" for stat in top)
+
+    def render(self) -> str:
+        lines = self.requests.render() + self.latency.render() + self.phases.render() + self.memory.render()
+        lines += sample_lines(
+            "tip_http_requests_in_progress", "gauge", "Requests being handled by this worker.", [((), self.in_progress)],
+        )
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines += sample_lines("tip_tracemalloc_traced_bytes", "gauge", "Memory traced by tracemalloc.", [((), current)])
+            lines += sample_lines("tip_tracemalloc_peak_bytes", "gauge", "Peak traced memory since the last reset.",
+                                  [((), peak)])
+        return "\n".join(lines) + "\n"
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware timing every HTTP request into an Instrumentation.
+
+    Latency runs until the last body chunk is sent, so streamed responses
+    are timed in full. Requests are labelled by route template, never by
+    raw path; anything that matched no route is labelled "unmatched".
+    """
+
+    def __init__(self, app, instrumentation: Instrumentation):
+        self.app = app
+        self.instrumentation = instrumentation
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        instrumentation = self.instrumentation
+        timings = RequestTimings()
+        token = _timings.set(timings)
+        status = 500
+        profile = profile_id = None
+        if instrumentation.profiling and any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            profile = instrumentation.begin_profile()
+            profile_id = uuid.uuid4().hex if profile is not None else None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile_id is not None:
+                    headers = [*message.get("headers", ()), (PROFILE_ID_HEADER, profile_id.encode())]
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        memory_baseline = instrumentation.begin_memory_sample()
+        instrumentation.in_progress += 1
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if profile is not None:
+                profile.disable()
+                instrumentation.end_profile(profile_id, profile)
+            elapsed = time.perf_counter() - start
+            instrumentation.in_progress -= 1
+            route = scope.get("route")
+            labels = (("method", scope["method"]), ("route", getattr(route, "path", UNMATCHED_ROUTE)))
+            instrumentation.record(labels, status, elapsed, timings)
+            if memory_baseline is not None:
+                instrumentation.end_memory_sample(labels, memory_baseline)
+            _timings.reset(token)
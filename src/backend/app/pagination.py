@@ -0,0 +1,50 @@
+import base64
+import json
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: int) -> str:
+    raw = json.dumps({"p": position}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)["p"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(position, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return position
+
+
+def paginate(
+    items: Iterable[Any], limit: Optional[int], position_of: Callable[[Any], int]
+) -> Tuple[List[Any], Optional[int]]:
+    """Take up to `limit` items and return them with the position to resume after, if there are more."""
+    if limit is None:
+        return list(items), None
+    iterator = iter(items)
+    page = list(islice(iterator, limit))
+    if len(page) < limit or next(iterator, None) is None:
+        return page, None
+    return page, position_of(page[-1])
+
+
+def cursor_headers(next_position: Optional[int]) -> Dict[str, str]:
+    return {NEXT_CURSOR_HEADER: encode_cursor(next_position)} if next_position is not None else {}
+
+
+def ndjson_lines(items: Iterable[dict]) -> Iterator[bytes]:
+    # Encoded like FastAPI's JSONResponse (UTF-8, no NaN), so lines match the fast path's byte for byte
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode() + b"\n"
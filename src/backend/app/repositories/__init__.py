@@ -0,0 +1,51 @@
+import os
+
+from app.repositories.base import (
+    DocumentRepository, FeedIndicatorRepository, IndicatorFilters, IndicatorRepository, Page, Repositories,
+)
+from app.repositories.memory import (
+    MemoryDocumentRepository, MemoryFeedIndicatorRepository, MemoryIndicatorRepository, MemoryRepositories,
+)
+from app.store import indicator_store, segment_storage
+
+# "memory" keeps everything in this process; "sqlite" stores it in TIP_DATABASE_URL
+STORAGE_BACKEND = os.getenv("TIP_STORAGE_BACKEND", "memory")
+DATABASE_URL = os.getenv("TIP_DATABASE_URL", "sqlite:///./tip.db")
+# Indicators alone can be moved to "elasticsearch"; "fake://" runs the in-process stand-in
+INDICATOR_BACKEND = os.getenv("TIP_INDICATOR_BACKEND", STORAGE_BACKEND)
+ELASTICSEARCH_URL = os.getenv("TIP_ELASTICSEARCH_URL", "http://localhost:9200")
+ELASTICSEARCH_INDEX = os.getenv("TIP_ELASTICSEARCH_INDEX", "indicators")
+
+# Users with precomputed password hashes, loaded into an empty user repository on open
+USERS_FILE = os.getenv("TIP_USERS_FILE", os.path.join(os.path.dirname(__file__), "..", "data", "users.json"))
+
+
+def create_elasticsearch_repository(url: str = ELASTICSEARCH_URL, index: str = ELASTICSEARCH_INDEX) -> IndicatorRepository:
+    from app.repositories.elastic import ElasticsearchIndicatorRepository
+    if url.startswith("fake://"):
+        from app.repositories.fake_elastic import FakeElasticsearch
+        return ElasticsearchIndicatorRepository(FakeElasticsearch(), index)
+    from elasticsearch import Elasticsearch
+    return ElasticsearchIndicatorRepository(Elasticsearch(url), index)
+
+
+def create_repositories(
+    backend: str = STORAGE_BACKEND, database_url: str = DATABASE_URL, indicator_backend: str = INDICATOR_BACKEND,
+) -> Repositories:
+    if backend == "sqlite":
+        # Imported on demand so the in-memory backend does not load SQLAlchemy
+        from app.repositories.sqlite import SQLiteRepositories
+        created: Repositories = SQLiteRepositories(database_url)
+    elif backend == "memory":
+        created = MemoryRepositories(indicator_store, segment_storage)
+    else:
+        raise ValueError(f"Unknown storage backend {backend!r}")
+    if indicator_backend == "elasticsearch":
+        created.indicators = create_elasticsearch_repository()
+    elif indicator_backend != backend:
+        raise ValueError(f"Unknown indicator backend {indicator_backend!r}")
+    return created
+
+
+# Process-wide repositories shared by the routers
+repositories = create_repositories()
@@ -0,0 +1,168 @@
+import json
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.store.aggregates import Aggregates
+from app.store.records import IndicatorRecord
+
+# A page of results and the position to resume after, or None on the last page
+Page = Tuple[List, Optional[int]]
+
+
+@dataclass
+class IndicatorFilters:
+    type: Optional[str] = None
+    source: Optional[str] = None
+    min_confidence: Optional[float] = None
+    tags: Optional[List[str]] = None
+    search_term: Optional[str] = None
+    since: Optional[float] = None
+    until: Optional[float] = None
+
+
+class IndicatorRepository(ABC):
+    """Storage for threat indicators.
+
+    Results come back in insertion order; positions handed out with a page
+    are opaque to callers and only ever passed back as `after`.
+    """
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abstractmethod
+    async def version(self) -> str:
+        """Opaque token that changes whenever indicators are added, replaced or deleted."""
+
+    @abstractmethod
+    async def get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        ...
+
+    @abstractmethod
+    async def get_many(self, indicator_ids: List[str]) -> List[IndicatorRecord]:
+        """The stored indicators among `indicator_ids`, in that order; unknown ids are left out."""
+
+    @abstractmethod
+    async def find_ids(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        """Ids of the stored indicators for the given (type, value) keys; unknown keys are left out."""
+
+    @abstractmethod
+    async def lookup(self, values: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        """Indicators whose value is exactly one of `values`, by value; values with no match are left out."""
+
+    @abstractmethod
+    async def covering(self, observables: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        """IP indicators whose address or CIDR block contains each observable address or block, and
+        Domain indicators on each observable name or a parent of it, broadest first, by observable."""
+
+    @abstractmethod
+    async def add_many(self, records: List[IndicatorRecord]):
+        """Insert or replace (by id) a batch of indicators in one write."""
+
+    @abstractmethod
+    async def delete(self, indicator_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def search(self, filters: IndicatorFilters, after: Optional[int] = None) -> Iterator[IndicatorRecord]:
+        """Every match past position `after`, produced lazily for streaming."""
+
+    @abstractmethod
+    async def search_page(self, filters: IndicatorFilters, limit: Optional[int], after: Optional[int] = None) -> Page:
+        ...
+
+    @abstractmethod
+    async def related(self, indicator_id: str, limit: int = 50, depth: int = 1) -> List[IndicatorRecord]:
+        """Indicators up to `depth` hops away, nearest hop first, then by shared-tag count."""
+
+    @abstractmethod
+    async def aggregate(self, filters: IndicatorFilters) -> Aggregates:
+        ...
+
+
+class DocumentRepository(ABC):
+    """JSON documents (feeds, reports, users) keyed by one of their fields, in creation order."""
+
+    def __init__(self, key: str = "id"):
+        self.key = key
+
+    @abstractmethod
+    async def count(self) -> int:
+        ...
+
+    @abstractmethod
+    async def version(self) -> str:
+        """Opaque token that changes whenever a document is created, updated or deleted, by any worker."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def list_page(self, limit: Optional[int] = None, after: Optional[int] = None) -> Page:
+        ...
+
+    @abstractmethod
+    async def create(self, document: dict) -> bool:
+        """Store a new document; False if one with the same key already exists."""
+
+    @abstractmethod
+    async def update(self, key: str, document: dict) -> bool:
+        """Replace a document in place, keeping its position; False if it does not exist."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        ...
+
+
+class FeedIndicatorRepository(ABC):
+    """Which indicators each feed has published, as references into the indicator repository.
+
+    A link carries the indicator's type so per-feed counters need no join.
+    Links are kept in the order they were made and paged like indicators.
+    """
+
+    @abstractmethod
+    async def link(self, feed_id: str, records: List[IndicatorRecord]):
+        """Reference `records` from the feed; indicators it already references are skipped."""
+
+    @abstractmethod
+    async def type_counts(self, feed_id: str) -> Dict[str, int]:
+        """Number of indicators the feed references, by type."""
+
+    @abstractmethod
+    async def page(self, feed_id: str, limit: Optional[int], after: Optional[int] = None) -> Page:
+        """Ids of the indicators the feed references."""
+
+    @abstractmethod
+    async def unlink_feed(self, feed_id: str):
+        """Drop every link from the feed; the indicators themselves stay."""
+
+
+class Repositories:
+    """The repositories behind the routers, opened once per worker from the application lifespan."""
+
+    indicators: IndicatorRepository
+    feeds: DocumentRepository
+    feed_indicators: FeedIndicatorRepository
+    reports: DocumentRepository
+    users: DocumentRepository
+
+    async def open(self, users_file: Optional[str] = None):
+        await self.indicators.open()
+        # Users ship with precomputed password hashes, loaded on first open of an empty store
+        if users_file and not await self.users.count():
+            with open(users_file) as f:
+                for user in json.load(f).values():
+                    await self.users.create(user)
+
+    async def close(self):
+        await self.indicators.close()
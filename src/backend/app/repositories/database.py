@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+import anyio
+from sqlalchemy import Connection, MetaData, create_engine, event
+from sqlalchemy.pool import QueuePool, StaticPool
+
+T = TypeVar("T")
+
+
+def _sqlite_pragmas(dbapi_connection, _connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a writer commits; NORMAL sync is durable at checkpoints
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+class Database:
+    """Pooled SQLAlchemy engine with a bounded hop off the event loop.
+
+    Blocking work goes through `run`, which executes it on a worker thread;
+    at most as many calls run at once as the pool has connections, so
+    requests queue on the limiter instead of holding threads while they wait
+    for a connection.
+    """
+
+    def __init__(self, url: str, pool_size: int = 5, max_overflow: int = 10):
+        self.url = url
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            # One shared connection, otherwise every checkout would see its own empty database
+            self.engine = create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+            self.max_connections = 1
+        else:
+            connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+            self.engine = create_engine(
+                url, poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow, connect_args=connect_args,
+            )
+            self.max_connections = pool_size + max_overflow
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _sqlite_pragmas)
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+
+    def create_all(self, metadata: MetaData):
+        metadata.create_all(self.engine)
+
+    @contextmanager
+    def transaction(self) -> Iterator[Connection]:
+        with self.engine.begin() as connection:
+            yield connection
+
+    @contextmanager
+    def connect(self) -> Iterator[Connection]:
+        with self.engine.connect() as connection:
+            yield connection
+
+    async def run(self, function: Callable[..., T], *args) -> T:
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_connections)
+        return await anyio.to_thread.run_sync(function, *args, limiter=self._limiter)
+
+    def dispose(self):
+        self.engine.dispose()
@@ -0,0 +1,366 @@
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import anyio
+from elasticsearch import helpers
+
+from app.repositories.base import IndicatorFilters, IndicatorRepository, Page
+from app.repositories.value_filter import ValueFilter
+from app.store.aggregates import DAY, Aggregates
+from app.store.graph import expand_related
+from app.store.matching import covering_keys, group_covering
+from app.store.records import IndicatorRecord
+
+# Hits per search request while streaming or scanning
+_PAGE_SIZE = 1000
+# Terms aggregation buckets; far above the number of distinct sources or types
+_TERMS_SIZE = 1000
+
+# `value` and `description` use the wildcard field type, which serves
+# substring queries from an n-gram index while still answering exact terms.
+# Numbers are doubles so range bounds compare exactly as they do in Python.
+MAPPINGS = {
+    "dynamic": "strict",
+    "properties": {
+        "id": {"type": "keyword"},
+        "type": {"type": "keyword"},
+        "value": {"type": "wildcard"},
+        "source": {"type": "keyword"},
+        "confidence": {"type": "double"},
+        "timestamp": {"type": "double"},
+        "tags": {"type": "keyword"},
+        "description": {"type": "wildcard"},
+        "seq": {"type": "long"},
+    },
+}
+
+
+class _Sequence:
+    """Strictly increasing, cluster-unique positions for insertion order.
+
+    Microseconds since the epoch in the high bits and the process id in the
+    low ten, so positions from different workers never collide and roughly
+    follow write time.
+    """
+
+    def __init__(self):
+        self._last = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid() & 0x3FF
+
+    def take(self, count: int) -> int:
+        """First of `count` consecutive positions."""
+        with self._lock:
+            start = max(self._last + 1, time.time_ns() // 1000)
+            self._last = start + count - 1
+        return start
+
+    def position(self, tick: int) -> int:
+        return tick << 10 | self._pid
+
+    @staticmethod
+    def settled(seconds: float) -> int:
+        """Lowest position any worker can have handed out in the last `seconds`."""
+        return int((time.time() - seconds) * 1_000_000) << 10
+
+
+def _escape_wildcard(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("*", "\\*").replace("?", "\\?")
+
+
+def build_query(filters: IndicatorFilters) -> dict:
+    """Translate search filters into a bool query of non-scoring filter clauses."""
+    clauses: List[dict] = []
+    if filters.type:
+        clauses.append({"term": {"type": filters.type}})
+    if filters.source:
+        clauses.append({"term": {"source": filters.source}})
+    if filters.min_confidence is not None:
+        clauses.append({"range": {"confidence": {"gte": filters.min_confidence}}})
+    if filters.since is not None or filters.until is not None:
+        bounds = {}
+        if filters.since is not None:
+            bounds["gte"] = filters.since
+        if filters.until is not None:
+            bounds["lte"] = filters.until
+        clauses.append({"range": {"timestamp": bounds}})
+    if filters.tags:
+        clauses.append({"terms": {"tags": list(filters.tags)}})
+    if filters.search_term:
+        pattern = f"*{_escape_wildcard(filters.search_term.lower())}*"
+        clauses.append({"bool": {
+            "should": [
+                {"wildcard": {field: {"value": pattern, "case_insensitive": True}}}
+                for field in ("value", "description")
+            ],
+            "minimum_should_match": 1,
+        }})
+    if not clauses:
+        return {"match_all": {}}
+    return {"bool": {"filter": clauses}}
+
+
+def _record(source: dict) -> IndicatorRecord:
+    return IndicatorRecord(
+        source["id"], source["type"], source["value"], source["source"], source["confidence"],
+        source["timestamp"], source["tags"], source.get("description"),
+    )
+
+
+class ElasticsearchIndicatorRepository(IndicatorRepository):
+    """Indicators in an Elasticsearch index.
+
+    Filters become a bool query of term/terms/range/wildcard filter clauses,
+    aggregations run server side, writes go through the bulk helper, and
+    results are ordered by a `seq` field so pages resume with search_after.
+    Value lookups check a Bloom filter first, so misses cost no request.
+    The client is the synchronous one (the async client needs aiohttp); calls
+    run on worker threads, at most `max_concurrency` at once.
+    """
+
+    def __init__(
+        self,
+        client,
+        index: str = "indicators",
+        refresh: str = "wait_for",
+        max_concurrency: int = 10,
+        settle_seconds: float = 10,
+    ):
+        self.client = client
+        self.index = index
+        # "wait_for" makes a write visible to searches before it returns, like the other backends
+        self.refresh = refresh
+        self.max_concurrency = max_concurrency
+        # Writes younger than this may not be searchable yet (bulk requests in flight in other
+        # workers, refresh interval, clock skew), so the value filter scans them again on its next
+        # catch-up. A single writer can set it to 0.
+        self.settle_seconds = settle_seconds
+        self._sequence = _Sequence()
+        self._values = ValueFilter()
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+
+    async def _run(self, function, *args):
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.max_concurrency)
+        return await anyio.to_thread.run_sync(function, *args, limiter=self._limiter)
+
+    async def open(self):
+        await self._run(self._create_index)
+
+    def _create_index(self):
+        if not self.client.indices.exists(index=self.index):
+            self.client.indices.create(index=self.index, mappings=MAPPINGS)
+
+    async def close(self):
+        self.client.close()
+
+    async def count(self) -> int:
+        return await self._run(lambda: self.client.count(index=self.index)["count"])
+
+    async def version(self) -> str:
+        return await self._run(self._version)
+
+    def _version(self) -> str:
+        # seq grows with every write, so its maximum moves on every insert and the count on every delete
+        response = self.client.search(
+            index=self.index, size=0, track_total_hits=True, aggs={"last": {"max": {"field": "seq"}}},
+        )
+        return f"{int(response['aggregations']['last']['value'] or 0)}-{response['hits']['total']['value']}"
+
+    async def get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        return await self._run(self._get, indicator_id)
+
+    def _get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        doc = self.client.mget(index=self.index, ids=[indicator_id])["docs"][0]
+        return _record(doc["_source"]) if doc.get("found") else None
+
+    async def get_many(self, indicator_ids: List[str]) -> List[IndicatorRecord]:
+        return await self._run(self._get_many, indicator_ids)
+
+    def _get_many(self, indicator_ids: List[str]) -> List[IndicatorRecord]:
+        if not indicator_ids:
+            return []
+        docs = self.client.mget(index=self.index, ids=indicator_ids)["docs"]
+        return [_record(doc["_source"]) for doc in docs if doc.get("found")]
+
+    async def find_ids(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        return await self._run(self._find_ids, list(keys))
+
+    def _find_ids(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        wanted = set(keys)
+        found = {}
+        for start in range(0, len(keys), _PAGE_SIZE):
+            values = sorted({value for _, value in keys[start:start + _PAGE_SIZE]})
+            query = {"terms": {"value": values}}
+            # Ascending seq, so the newest document wins if a key was stored under several ids
+            for source in self._scan(query, ["id", "type", "value"]):
+                key = (source["type"], source["value"])
+                if key in wanted:
+                    found[key] = source["id"]
+        return found
+
+    async def lookup(self, values: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        return await self._run(self._lookup, values)
+
+    def _value_rows(self, after: Optional[int]) -> Iterator[Tuple[int, str]]:
+        for source in self._scan({"match_all": {}}, ["seq", "value"], after):
+            yield source["seq"], source["value"]
+
+    def _bloom(self):
+        count = lambda: self.client.count(index=self.index)["count"]
+        return self._values.sync(self._value_rows, count, settled=_Sequence.settled(self.settle_seconds))
+
+    def _lookup(self, values: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        bloom = self._bloom()
+        candidates = [value for value in values if value in bloom]
+        found: Dict[str, List[IndicatorRecord]] = {}
+        for start in range(0, len(candidates), _PAGE_SIZE):
+            query = {"terms": {"value": candidates[start:start + _PAGE_SIZE]}}
+            for source in self._scan(query):
+                found.setdefault(source["value"], []).append(_record(source))
+        return found
+
+    async def covering(self, observables: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        return await self._run(self._covering, observables)
+
+    def _covering(self, observables: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        # Every enclosing block or parent domain as an exact value, the Bloom filter first
+        keys = covering_keys(observables)
+        bloom = self._bloom()
+        candidates = [key for key in keys if key[1] in bloom]
+        sources = []
+        for start in range(0, len(candidates), _PAGE_SIZE):
+            chunk = candidates[start:start + _PAGE_SIZE]
+            query = {"bool": {"filter": [
+                {"terms": {"type": sorted({type for type, _ in chunk})}},
+                {"terms": {"value": [value for _, value in chunk]}},
+            ]}}
+            sources.extend(self._scan(query))
+        sources.sort(key=lambda source: source["seq"])
+        return group_covering(keys, map(_record, sources))
+
+    async def add_many(self, records: List[IndicatorRecord]):
+        if records:
+            await self._run(self._add_many, records)
+
+    def _add_many(self, records: List[IndicatorRecord]):
+        # Re-indexing an id replaces the document and moves it to the end, like the in-memory store
+        first = self._sequence.take(len(records))
+        actions = (
+            {
+                "_index": self.index,
+                "_id": record.id,
+                "_source": {
+                    "id": record.id,
+                    "type": record.type,
+                    "value": record.value,
+                    "source": record.source,
+                    "confidence": record.confidence,
+                    "timestamp": record.timestamp,
+                    "tags": list(record.tags),
+                    "description": record.description,
+                    "seq": self._sequence.position(first + offset),
+                },
+            }
+            for offset, record in enumerate(records)
+        )
+        helpers.bulk(self.client, actions, chunk_size=_PAGE_SIZE, refresh=self.refresh)
+
+    async def delete(self, indicator_id: str) -> bool:
+        return await self._run(self._delete, indicator_id)
+
+    def _delete(self, indicator_id: str) -> bool:
+        result = self.client.options(ignore_status=404).delete(index=self.index, id=indicator_id, refresh=self.refresh)
+        return result["result"] == "deleted"
+
+    def _search(self, query: dict, size: int, after: Optional[int], source=True) -> List[dict]:
+        response = self.client.search(
+            index=self.index,
+            query=query,
+            sort=[{"seq": "asc"}],
+            size=size,
+            search_after=None if after is None else [after],
+            source=source,
+            track_total_hits=False,
+        )
+        return response["hits"]["hits"]
+
+    def _scan(self, query: dict, source=True, after: Optional[int] = None) -> Iterator[dict]:
+        # search_after over the seq sort: no scroll context to keep alive or clear
+        while True:
+            hits = self._search(query, _PAGE_SIZE, after, source)
+            for hit in hits:
+                yield hit["_source"]
+            if len(hits) < _PAGE_SIZE:
+                return
+            after = hits[-1]["sort"][0]
+
+    async def search(self, filters: IndicatorFilters, after: Optional[int] = None) -> Iterator[IndicatorRecord]:
+        # A plain generator: the response streams it from a worker thread, a page per request
+        return map(_record, self._scan(build_query(filters), after=after))
+
+    async def search_page(self, filters: IndicatorFilters, limit: Optional[int], after: Optional[int] = None) -> Page:
+        return await self._run(self._search_page, filters, limit, after)
+
+    def _search_page(self, filters: IndicatorFilters, limit: Optional[int], after: Optional[int]) -> Page:
+        query = build_query(filters)
+        if limit is None:
+            return [_record(source) for source in self._scan(query, after=after)], None
+        # One extra hit tells whether there is a next page
+        hits = self._search(query, limit + 1, after)
+        page = [_record(hit["_source"]) for hit in hits[:limit]]
+        return page, hits[limit - 1]["sort"][0] if len(hits) > limit else None
+
+    async def related(self, indicator_id: str, limit: int = 50, depth: int = 1) -> List[IndicatorRecord]:
+        return await self._run(self._related, indicator_id, limit, depth)
+
+    def _related(self, indicator_id: str, limit: int, depth: int) -> List[IndicatorRecord]:
+        tags: Dict[str, List[str]] = {}
+        seq: Dict[str, int] = {}
+        origin = self.client.mget(index=self.index, ids=[indicator_id])["docs"][0]
+        if not origin.get("found"):
+            return []
+        tags[indicator_id] = origin["_source"]["tags"]
+
+        def neighbours(frontier: List[str]) -> Counter:
+            # Every indicator sharing a tag with the frontier, scored by tags shared
+            wanted = Counter(tag for node in frontier for tag in set(tags[node]))
+            counts = Counter()
+            if not wanted:
+                return counts
+            query = {"terms": {"tags": list(wanted)}}
+            for source in self._scan(query, ["id", "tags", "seq"]):
+                other = source["id"]
+                tags[other] = source["tags"]
+                seq[other] = source["seq"]
+                counts[other] = sum(wanted[tag] for tag in set(source["tags"]))
+            return counts
+
+        related = expand_related(indicator_id, neighbours, seq.__getitem__, limit, depth)
+        docs = self.client.mget(index=self.index, ids=related)["docs"] if related else []
+        return [_record(doc["_source"]) for doc in docs if doc.get("found")]
+
+    async def aggregate(self, filters: IndicatorFilters) -> Aggregates:
+        return await self._run(self._aggregate, filters)
+
+    def _aggregate(self, filters: IndicatorFilters) -> Aggregates:
+        response = self.client.search(
+            index=self.index,
+            query=build_query(filters),
+            size=0,
+            aggs={
+                "timeline": {"histogram": {"field": "timestamp", "interval": DAY, "min_doc_count": 1}},
+                "by_source": {"terms": {"field": "source", "size": _TERMS_SIZE}},
+                "by_type": {"terms": {"field": "type", "size": _TERMS_SIZE}},
+            },
+            track_total_hits=False,
+        )
+        aggregations = response["aggregations"]
+        return Aggregates(
+            Counter({int(b["key"] // DAY): b["doc_count"] for b in aggregations["timeline"]["buckets"]}),
+            Counter({b["key"]: b["doc_count"] for b in aggregations["by_source"]["buckets"]}),
+            Counter({b["key"]: b["doc_count"] for b in aggregations["by_type"]["buckets"]}),
+        )
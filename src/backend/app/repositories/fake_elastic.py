@@ -0,0 +1,263 @@
+import fnmatch
+import json
+import re
+import threading
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from elastic_transport import JsonSerializer, ObjectApiResponse, SerializerCollection
+
+
+def _response(body: dict) -> ObjectApiResponse:
+    return ObjectApiResponse(body=body, meta=None)
+
+
+def _values(doc: dict, field: str) -> List[Any]:
+    value = doc.get(field)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _wildcard(pattern: str, case_insensitive: bool) -> "re.Pattern":
+    # Wildcard syntax: * and ? with backslash escapes, matched against the whole value
+    parts, i = [], 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            parts.append(re.escape(pattern[i + 1]))
+            i += 2
+            continue
+        parts.append(".*" if char == "*" else "." if char == "?" else re.escape(char))
+        i += 1
+    return re.compile("".join(parts), re.DOTALL | (re.IGNORECASE if case_insensitive else 0))
+
+
+def _matches(query: dict, doc: dict) -> bool:
+    (kind, body), = query.items()
+    if kind == "match_all":
+        return True
+    if kind == "bool":
+        if not all(_matches(q, doc) for key in ("filter", "must") for q in body.get(key, [])):
+            return False
+        if any(_matches(q, doc) for q in body.get("must_not", [])):
+            return False
+        should = body.get("should", [])
+        if should:
+            required = body.get("minimum_should_match", 0 if "filter" in body or "must" in body else 1)
+            if sum(_matches(q, doc) for q in should) < required:
+                return False
+        return True
+    if kind == "ids":
+        return doc["_id"] in body["values"]
+    (field, condition), = body.items()
+    values = _values(doc["_source"], field)
+    if kind == "term":
+        expected = condition["value"] if isinstance(condition, dict) else condition
+        return expected in values
+    if kind == "terms":
+        return any(value in condition for value in values)
+    if kind == "range":
+        return any(
+            ("gte" not in condition or value >= condition["gte"])
+            and ("gt" not in condition or value > condition["gt"])
+            and ("lte" not in condition or value <= condition["lte"])
+            and ("lt" not in condition or value < condition["lt"])
+            for value in values
+        )
+    if kind == "wildcard":
+        if not isinstance(condition, dict):
+            condition = {"value": condition}
+        pattern = _wildcard(condition["value"], condition.get("case_insensitive", False))
+        return any(pattern.fullmatch(str(value)) for value in values)
+    raise NotImplementedError(f"query type {kind!r} is not supported by FakeElasticsearch")
+
+
+def _sort_key(sort: List, doc: dict) -> List[Any]:
+    key = []
+    for clause in sort:
+        field = clause if isinstance(clause, str) else next(iter(clause))
+        values = _values(doc["_source"], field)
+        key.append(values[0] if values else None)
+    return key
+
+
+def _descending(clause) -> bool:
+    if isinstance(clause, str):
+        return False
+    order = next(iter(clause.values()))
+    return (order.get("order") if isinstance(order, dict) else order) == "desc"
+
+
+def _project(source: dict, includes) -> dict:
+    if includes is True or includes is None:
+        return source
+    if includes is False:
+        return {}
+    if isinstance(includes, str):
+        includes = [includes]
+    return {k: v for k, v in source.items() if any(fnmatch.fnmatchcase(k, p) for p in includes)}
+
+
+def _aggregate(spec: dict, docs: List[dict]) -> dict:
+    (kind, body), = spec.items()
+    field = body["field"]
+    if kind == "terms":
+        counts = Counter(value for doc in docs for value in set(_values(doc["_source"], field)))
+        ordered = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:body.get("size", 10)]
+        return {"buckets": [{"key": key, "doc_count": count} for key, count in ordered]}
+    if kind == "histogram":
+        interval = body["interval"]
+        counts = Counter(
+            (value // interval) * interval for doc in docs for value in _values(doc["_source"], field)
+        )
+        if not counts:
+            return {"buckets": []}
+        keys = sorted(counts)
+        if body.get("min_doc_count", 0) == 0:
+            steps = int(round((keys[-1] - keys[0]) / interval))
+            keys = [keys[0] + step * interval for step in range(steps + 1)]
+        buckets = [{"key": key, "doc_count": counts.get(key, 0)} for key in keys]
+        return {"buckets": [b for b in buckets if b["doc_count"] >= body.get("min_doc_count", 0)]}
+    if kind == "max":
+        values = [value for doc in docs for value in _values(doc["_source"], field)]
+        return {"value": max(values) if values else None}
+    raise NotImplementedError(f"aggregation type {kind!r} is not supported by FakeElasticsearch")
+
+
+class _Indices:
+    def __init__(self, client: "FakeElasticsearch"):
+        self._client = client
+
+    def exists(self, index: str, **_) -> bool:
+        return index in self._client._indices
+
+    def create(self, index: str, mappings: Optional[dict] = None, **_) -> ObjectApiResponse:
+        self._client._indices.setdefault(index, {})
+        return _response({"acknowledged": True, "index": index})
+
+    def delete(self, index: str, **_) -> ObjectApiResponse:
+        self._client._indices.pop(index, None)
+        return _response({"acknowledged": True})
+
+    def refresh(self, index: Optional[str] = None, **_) -> ObjectApiResponse:
+        return _response({"_shards": {"failed": 0}})
+
+
+class FakeElasticsearch:
+    """In-process stand-in for the subset of the Elasticsearch client this app uses.
+
+    Documents live in per-index dicts and every search is a linear scan, so it
+    is for tests and offline benchmarks of the query translation, not a
+    performance proxy. Writes are visible immediately (as if every request
+    asked for refresh). Supports indices.exists/create/delete, bulk (so
+    `elasticsearch.helpers.bulk` works), mget, delete, count, and search
+    with bool/term/terms/range/wildcard/ids queries, sort, search_after,
+    _source filtering and terms/histogram/max aggregations.
+    """
+
+    def __init__(self):
+        self._indices: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.RLock()
+        self.indices = _Indices(self)
+        # Read by the bulk helpers
+        self.transport = SimpleNamespace(serializers=SerializerCollection({"application/json": JsonSerializer()}))
+        self._client_meta = ()
+
+    def options(self, **_) -> "FakeElasticsearch":
+        return self
+
+    def close(self):
+        pass
+
+    def _docs(self, index: str) -> Dict[str, dict]:
+        return self._indices.setdefault(index, {})
+
+    def bulk(self, operations, index: Optional[str] = None, **_) -> ObjectApiResponse:
+        lines = [json.loads(line) if isinstance(line, (bytes, str)) else line for line in operations]
+        items, errors, i = [], False, 0
+        with self._lock:
+            while i < len(lines):
+                (op, meta), = lines[i].items()
+                docs = self._docs(meta.get("_index", index))
+                doc_id = meta.get("_id")
+                if op == "delete":
+                    found = docs.pop(doc_id, None) is not None
+                    status = 200 if found else 404
+                    items.append({op: {"_id": doc_id, "status": status, "result": "deleted" if found else "not_found"}})
+                    errors = errors or not found
+                    i += 1
+                    continue
+                source = lines[i + 1]
+                if op == "update":
+                    source = {**docs.get(doc_id, {}).get("_source", {}), **source.get("doc", {})}
+                if doc_id is None:
+                    doc_id = str(len(docs) + 1)
+                created = doc_id not in docs
+                if op == "create" and not created:
+                    items.append({op: {"_id": doc_id, "status": 409, "error": {"type": "version_conflict_engine_exception"}}})
+                    errors = True
+                else:
+                    docs[doc_id] = {"_id": doc_id, "_source": source}
+                    items.append({op: {"_id": doc_id, "status": 201 if created else 200, "result": "created" if created else "updated"}})
+                i += 2
+        return _response({"took": 0, "errors": errors, "items": items})
+
+    def mget(self, index: str, ids: List[str], **_) -> ObjectApiResponse:
+        with self._lock:
+            docs = self._docs(index)
+            found = [docs.get(doc_id) for doc_id in ids]
+        return _response({"docs": [
+            {"_index": index, "_id": doc_id, "found": True, "_source": doc["_source"]} if doc else
+            {"_index": index, "_id": doc_id, "found": False}
+            for doc_id, doc in zip(ids, found)
+        ]})
+
+    def delete(self, index: str, id: str, **_) -> ObjectApiResponse:
+        with self._lock:
+            found = self._docs(index).pop(id, None) is not None
+        return _response({"_id": id, "result": "deleted" if found else "not_found"})
+
+    def count(self, index: str, query: Optional[dict] = None, **_) -> ObjectApiResponse:
+        with self._lock:
+            docs = list(self._docs(index).values())
+        if query is not None:
+            docs = [doc for doc in docs if _matches(query, doc)]
+        return _response({"count": len(docs)})
+
+    def search(
+        self,
+        index: str,
+        query: Optional[dict] = None,
+        sort: Optional[List] = None,
+        size: int = 10,
+        from_: int = 0,
+        search_after: Optional[List] = None,
+        source=True,
+        aggs: Optional[dict] = None,
+        aggregations: Optional[dict] = None,
+        **_,
+    ) -> ObjectApiResponse:
+        with self._lock:
+            docs = list(self._docs(index).values())
+        query = query or {"match_all": {}}
+        docs = [doc for doc in docs if _matches(query, doc)]
+        body: Dict[str, Any] = {"took": 0, "timed_out": False, "hits": {"total": {"value": len(docs), "relation": "eq"}}}
+        aggs = aggs or aggregations
+        if aggs:
+            body["aggregations"] = {name: _aggregate(spec, docs) for name, spec in aggs.items()}
+        hits = docs
+        if sort:
+            if any(_descending(clause) for clause in sort):
+                raise NotImplementedError("descending sorts are not supported by FakeElasticsearch")
+            keyed = sorted(((_sort_key(sort, doc), doc) for doc in hits), key=lambda item: item[0])
+            if search_after is not None:
+                keyed = [item for item in keyed if item[0] > list(search_after)]
+            hits = [{**doc, "sort": key} for key, doc in keyed]
+        body["hits"]["hits"] = [
+            {"_index": index, "_id": hit["_id"], "_source": _project(hit["_source"], source),
+             **({"sort": hit["sort"]} if "sort" in hit else {})}
+            for hit in hits[from_:from_ + size]
+        ]
+        return _response(body)
@@ -0,0 +1,239 @@
+import asyncio
+import os
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import anyio
+
+from app.pagination import paginate
+from app.repositories.base import (
+    DocumentRepository, FeedIndicatorRepository, IndicatorFilters, IndicatorRepository, Page, Repositories,
+)
+from app.store import IndicatorRecord, IndicatorStore, SegmentStorage
+from app.store.aggregates import Aggregates
+from app.store.sorted_index import SortedIndex
+
+
+class MemoryIndicatorRepository(IndicatorRepository):
+    """Indicators held in this process's IndicatorStore.
+
+    When shared segments are open they are the record of every write: adds
+    and deletes are published as segments from a worker thread, and each
+    worker applies what was published after its last applied sequence to its
+    own store in publish order, its own writes included. A compacted segment
+    is applied only from the records newer than that sequence, so compaction
+    never replays what a worker has already seen. A worker (re)started on an
+    existing directory loads it on open, and other workers' writes show up
+    within the reader's refresh interval.
+
+    Segments replicate writes; they do not serve reads. Searches, matching
+    and aggregates need the store's in-heap indexes, so every worker still
+    holds the whole corpus, and any worker may publish a segment (appends
+    serialize on the writer lock).
+    """
+
+    def __init__(self, store: IndicatorStore, segments: Optional[SegmentStorage] = None):
+        self.store = store
+        self.segments = segments
+        # Sequence number of the last segment applied to the store
+        self._applied = 0
+        # Segments this worker published and has not applied yet, by file name: (sequence, records, deleted)
+        self._own: Dict[str, Tuple[int, List[IndicatorRecord], List[str]]] = {}
+        self._sync_lock = asyncio.Lock()
+
+    async def open(self):
+        await self.sync(force=True)
+
+    async def sync(self, force: bool = False):
+        """Apply segments published since the last sync; the manifest is re-read at most once
+        per refresh interval unless `force` is set."""
+        if self.segments is None or not self.segments.is_open:
+            return
+        async with self._sync_lock:
+            pending = self.segments.since(self._applied, force)
+            for sequence, segment in pending:
+                own = self._own.pop(os.path.basename(segment.path), None)
+                if own is not None:
+                    _, records, deleted = own
+                else:
+                    records, deleted = await anyio.to_thread.run_sync(segment.read, self._applied)
+                for indicator_id in deleted:
+                    self.store.remove(indicator_id)
+                self.store.add_many(records)
+                self._applied = sequence
+            if pending:
+                # Own segments a compaction folded into one already applied
+                self._own = {name: own for name, own in self._own.items() if own[0] > self._applied}
+
+    async def _publish(self, records: List[IndicatorRecord], deleted: List[str]):
+        published = await anyio.to_thread.run_sync(self.segments.append, records, deleted)
+        if published is not None:
+            name, sequence = published
+            self._own[name] = (sequence, records, deleted)
+        await self.sync(force=True)
+
+    async def count(self) -> int:
+        await self.sync()
+        return len(self.store)
+
+    async def version(self) -> str:
+        await self.sync()
+        return self.store.version
+
+    async def get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        await self.sync()
+        return self.store.get(indicator_id)
+
+    async def get_many(self, indicator_ids: List[str]) -> List[IndicatorRecord]:
+        await self.sync()
+        found = []
+        for indicator_id in indicator_ids:
+            record = self.store.get(indicator_id)
+            if record is not None:
+                found.append(record)
+        return found
+
+    async def find_ids(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        await self.sync()
+        found = {}
+        for key in keys:
+            record = self.store.find(*key)
+            if record is not None:
+                found[key] = record.id
+        return found
+
+    async def lookup(self, values: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        await self.sync()
+        # The hash index answers a miss in a few dict probes; a Bloom filter in front would only add work
+        return self.store.lookup(values)
+
+    async def covering(self, observables: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        await self.sync()
+        return self.store.covering(observables)
+
+    async def add_many(self, records: List[IndicatorRecord]):
+        if self.segments is not None and self.segments.is_open:
+            await self._publish(records, [])
+        else:
+            self.store.add_many(records)
+
+    async def delete(self, indicator_id: str) -> bool:
+        if self.segments is not None and self.segments.is_open:
+            await self.sync()
+            if indicator_id not in self.store:
+                return False
+            await self._publish([], [indicator_id])
+            return True
+        return self.store.remove(indicator_id) is not None
+
+    async def search(self, filters: IndicatorFilters, after: Optional[int] = None) -> Iterator[IndicatorRecord]:
+        await self.sync()
+        return self.store.iter_search(after=after, **vars(filters))
+
+    async def search_page(self, filters: IndicatorFilters, limit: Optional[int], after: Optional[int] = None) -> Page:
+        await self.sync()
+        results = self.store.iter_search(after=after, **vars(filters))
+        return paginate(results, limit, lambda record: self.store.position(record.id))
+
+    async def related(self, indicator_id: str, limit: int = 50, depth: int = 1) -> List[IndicatorRecord]:
+        await self.sync()
+        return self.store.related(indicator_id, limit=limit, depth=depth)
+
+    async def aggregate(self, filters: IndicatorFilters) -> Aggregates:
+        await self.sync()
+        return self.store.aggregate(**vars(filters))
+
+
+class MemoryDocumentRepository(DocumentRepository):
+    """Documents in a dict keyed by id, with a sorted position index for paging."""
+
+    def __init__(self, key: str = "id"):
+        super().__init__(key)
+        self._documents: Dict[str, dict] = {}
+        self._seq: Dict[str, int] = {}
+        self._order = SortedIndex()
+        self._next_seq = 0
+        self._version = 0
+
+    async def count(self) -> int:
+        return len(self._documents)
+
+    async def version(self) -> str:
+        return str(self._version)
+
+    async def get(self, key: str) -> Optional[dict]:
+        return self._documents.get(key)
+
+    async def list_page(self, limit: Optional[int] = None, after: Optional[int] = None) -> Page:
+        keys = self._order.range(None if after is None else after + 1)
+        page, next_position = paginate(keys, limit, self._seq.__getitem__)
+        return [self._documents[key] for key in page], next_position
+
+    async def create(self, document: dict) -> bool:
+        key = document[self.key]
+        if key in self._documents:
+            return False
+        self._documents[key] = document
+        self._seq[key] = self._next_seq
+        self._order.add(self._next_seq, key)
+        self._next_seq += 1
+        self._version += 1
+        return True
+
+    async def update(self, key: str, document: dict) -> bool:
+        if key not in self._documents:
+            return False
+        # Stored under `key`, so the document must carry it too
+        self._documents[key] = {**document, self.key: key}
+        self._version += 1
+        return True
+
+    async def delete(self, key: str) -> bool:
+        if self._documents.pop(key, None) is None:
+            return False
+        self._order.remove(self._seq.pop(key), key)
+        self._version += 1
+        return True
+
+
+class MemoryFeedIndicatorRepository(FeedIndicatorRepository):
+    """Per feed, linked ids in a list (a link's position is its index) plus a set and a type Counter."""
+
+    def __init__(self):
+        self._ids: Dict[str, List[str]] = {}
+        self._linked: Dict[str, set] = {}
+        self._types: Dict[str, Counter] = {}
+
+    async def link(self, feed_id: str, records: List[IndicatorRecord]):
+        ids = self._ids.setdefault(feed_id, [])
+        linked = self._linked.setdefault(feed_id, set())
+        types = self._types.setdefault(feed_id, Counter())
+        for record in records:
+            if record.id not in linked:
+                linked.add(record.id)
+                ids.append(record.id)
+                types[record.type] += 1
+
+    async def type_counts(self, feed_id: str) -> Dict[str, int]:
+        return dict(self._types.get(feed_id, {}))
+
+    async def page(self, feed_id: str, limit: Optional[int], after: Optional[int] = None) -> Page:
+        ids = self._ids.get(feed_id, [])
+        start = 0 if after is None else after + 1
+        page = ids[start:] if limit is None else ids[start:start + limit]
+        more = limit is not None and start + limit < len(ids)
+        return page, start + len(page) - 1 if more else None
+
+    async def unlink_feed(self, feed_id: str):
+        self._ids.pop(feed_id, None)
+        self._linked.pop(feed_id, None)
+        self._types.pop(feed_id, None)
+
+
+class MemoryRepositories(Repositories):
+    def __init__(self, store: IndicatorStore, segments: Optional[SegmentStorage] = None):
+        self.indicators = MemoryIndicatorRepository(store, segments)
+        self.feeds = MemoryDocumentRepository()
+        self.feed_indicators = MemoryFeedIndicatorRepository()
+        self.reports = MemoryDocumentRepository()
+        self.users = MemoryDocumentRepository(key="username")
@@ -0,0 +1,511 @@
+import json
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    Column, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text, UniqueConstraint,
+    cast, delete, exists, func, insert, or_, select, tuple_, update,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+
+from app.repositories.base import (
+    DocumentRepository, FeedIndicatorRepository, IndicatorFilters, IndicatorRepository, Page, Repositories,
+)
+from app.repositories.database import Database
+from app.repositories.value_filter import ValueFilter
+from app.store.aggregates import DAY, Aggregates
+from app.store.graph import expand_related
+from app.store.matching import covering_keys, group_covering
+from app.store.records import IndicatorRecord
+
+# Ids per IN (...) clause, well under SQLite's bound-parameter limit
+_CHUNK = 500
+# Rows fetched per round trip while a search streams out
+_STREAM_BATCH = 1000
+
+metadata = MetaData()
+
+indicators = Table(
+    "indicators",
+    metadata,
+    # Integer primary key is SQLite's rowid: search order and cursor positions come straight from it.
+    # AUTOINCREMENT keeps positions from being reused after deletes.
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("id", String, nullable=False, unique=True),
+    Column("type", String, nullable=False, index=True),
+    Column("value", String, nullable=False),
+    Column("source", String, nullable=False, index=True),
+    Column("confidence", Float, nullable=False, index=True),
+    Column("timestamp", Float, nullable=False, index=True),
+    # JSON array, so a fetched row needs no join; filtering goes through indicator_tags
+    Column("tags", Text, nullable=False),
+    Column("description", Text),
+    Index("ix_indicators_type_value", "type", "value"),
+    Index("ix_indicators_value", "value"),
+    sqlite_autoincrement=True,
+)
+
+indicator_tags = Table(
+    "indicator_tags",
+    metadata,
+    Column("indicator_id", String, ForeignKey("indicators.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag", String, primary_key=True),
+    Index("ix_indicator_tags_tag", "tag", "indicator_id"),
+)
+
+# No foreign key to indicators: they may live in another backend
+feed_indicators = Table(
+    "feed_indicators",
+    metadata,
+    Column("seq", Integer, primary_key=True, autoincrement=True),
+    Column("feed_id", String, nullable=False),
+    Column("indicator_id", String, nullable=False),
+    Column("type", String, nullable=False),
+    UniqueConstraint("feed_id", "indicator_id"),
+    Index("ix_feed_indicators_feed_seq", "feed_id", "seq"),
+    Index("ix_feed_indicators_feed_type", "feed_id", "type"),
+    sqlite_autoincrement=True,
+)
+
+
+# One row per document table, bumped in the same transaction as every write to it, so all
+# workers on the database see the same version
+document_versions = Table(
+    "document_versions",
+    metadata,
+    Column("name", String, primary_key=True),
+    Column("version", Integer, nullable=False),
+)
+
+
+def _document_table(name: str) -> Table:
+    return Table(
+        name,
+        metadata,
+        Column("seq", Integer, primary_key=True, autoincrement=True),
+        Column("key", String, nullable=False, unique=True),
+        Column("document", Text, nullable=False),
+        sqlite_autoincrement=True,
+    )
+
+
+feeds = _document_table("feeds")
+reports = _document_table("reports")
+users = _document_table("users")
+
+
+def _chunks(items: List, size: int = _CHUNK) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _record(row) -> IndicatorRecord:
+    return IndicatorRecord(
+        row.id, row.type, row.value, row.source, row.confidence, row.timestamp, json.loads(row.tags), row.description,
+    )
+
+
+def _row(record: IndicatorRecord) -> dict:
+    return {
+        "id": record.id,
+        "type": record.type,
+        "value": record.value,
+        "source": record.source,
+        "confidence": record.confidence,
+        "timestamp": record.timestamp,
+        "tags": json.dumps(record.tags),
+        "description": record.description,
+    }
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _conditions(filters: IndicatorFilters) -> list:
+    c = indicators.c
+    conditions = []
+    if filters.type:
+        conditions.append(c.type == filters.type)
+    if filters.source:
+        conditions.append(c.source == filters.source)
+    if filters.min_confidence is not None:
+        conditions.append(c.confidence >= filters.min_confidence)
+    if filters.since is not None:
+        conditions.append(c.timestamp >= filters.since)
+    if filters.until is not None:
+        conditions.append(c.timestamp <= filters.until)
+    if filters.tags:
+        conditions.append(exists().where(
+            indicator_tags.c.indicator_id == c.id, indicator_tags.c.tag.in_(filters.tags),
+        ))
+    if filters.search_term:
+        pattern = f"%{_escape_like(filters.search_term.lower())}%"
+        conditions.append(or_(
+            func.lower(c.value).like(pattern, escape="\\"),
+            func.lower(c.description).like(pattern, escape="\\"),
+        ))
+    return conditions
+
+
+class SQLiteIndicatorRepository(IndicatorRepository):
+    """Indicators in SQL tables, one row each plus a row per tag.
+
+    Ids, (type, value), type, source, confidence, timestamp and tags are all
+    indexed, so lookups are B-tree probes and searches walk an index instead
+    of the table. Writes go in one transaction per batch as executemany
+    inserts. Every call runs on the database's thread pool. Value lookups
+    check a Bloom filter first, so values that are not stored never reach
+    the database.
+    """
+
+    def __init__(self, database: Database):
+        self.database = database
+        self._values = ValueFilter()
+
+    async def open(self):
+        await self.database.run(self.database.create_all, metadata)
+
+    async def count(self) -> int:
+        return await self.database.run(self._count)
+
+    def _count(self) -> int:
+        with self.database.connect() as connection:
+            return connection.execute(select(func.count()).select_from(indicators)).scalar_one()
+
+    async def version(self) -> str:
+        return await self.database.run(self._version)
+
+    def _version(self) -> str:
+        # Sequence numbers are never reused, so the highest one moves on every insert and the count on every delete
+        with self.database.connect() as connection:
+            count, last = connection.execute(select(func.count(), func.max(indicators.c.seq))).one()
+        return f"{last or 0}-{count}"
+
+    async def get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        return await self.database.run(self._get, indicator_id)
+
+    def _get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        with self.database.connect() as connection:
+            row = connection.execute(select(indicators).where(indicators.c.id == indicator_id)).first()
+        return None if row is None else _record(row)
+
+    async def get_many(self, indicator_ids: List[str]) -> List[IndicatorRecord]:
+        return await self.database.run(self._get_many, indicator_ids)
+
+    def _get_many(self, indicator_ids: List[str]) -> List[IndicatorRecord]:
+        found = {}
+        with self.database.connect() as connection:
+            for chunk in _chunks(indicator_ids):
+                for row in connection.execute(select(indicators).where(indicators.c.id.in_(chunk))):
+                    found[row.id] = _record(row)
+        return [found[i] for i in indicator_ids if i in found]
+
+    async def find_ids(self, keys: Iterable[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        return await self.database.run(self._find_ids, list(keys))
+
+    def _find_ids(self, keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], str]:
+        c = indicators.c
+        found = {}
+        with self.database.connect() as connection:
+            for chunk in _chunks(keys):
+                # Ordered so the newest row wins if a key was stored under several ids
+                stmt = select(c.type, c.value, c.id).where(tuple_(c.type, c.value).in_(chunk)).order_by(c.seq)
+                for type, value, indicator_id in connection.execute(stmt):
+                    found[(type, value)] = indicator_id
+        return found
+
+    async def lookup(self, values: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        return await self.database.run(self._lookup, values)
+
+    def _value_rows(self, after: Optional[int]) -> Iterator[Tuple[int, str]]:
+        stmt = select(indicators.c.seq, indicators.c.value)
+        if after is not None:
+            stmt = stmt.where(indicators.c.seq > after)
+        with self.database.connect() as connection:
+            yield from connection.execute(stmt.execution_options(yield_per=_STREAM_BATCH))
+
+    def _lookup(self, values: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        bloom = self._values.sync(self._value_rows, self._count)
+        candidates = [value for value in values if value in bloom]
+        found: Dict[str, List[IndicatorRecord]] = {}
+        with self.database.connect() as connection:
+            for chunk in _chunks(candidates):
+                stmt = select(indicators).where(indicators.c.value.in_(chunk)).order_by(indicators.c.seq)
+                for row in connection.execute(stmt):
+                    found.setdefault(row.value, []).append(_record(row))
+        return found
+
+    async def covering(self, observables: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        return await self.database.run(self._covering, observables)
+
+    def _covering(self, observables: List[str]) -> Dict[str, List[IndicatorRecord]]:
+        # Every enclosing block or parent domain as an exact (type, value) probe, the Bloom filter first
+        keys = covering_keys(observables)
+        bloom = self._values.sync(self._value_rows, self._count)
+        candidates = [key for key in keys if key[1] in bloom]
+        c = indicators.c
+        rows = []
+        with self.database.connect() as connection:
+            for chunk in _chunks(candidates):
+                stmt = select(indicators).where(tuple_(c.type, c.value).in_(chunk))
+                rows.extend(connection.execute(stmt))
+        rows.sort(key=lambda row: row.seq)
+        return group_covering(keys, map(_record, rows))
+
+    async def add_many(self, records: List[IndicatorRecord]):
+        if records:
+            await self.database.run(self._add_many, records)
+
+    def _add_many(self, records: List[IndicatorRecord]):
+        # A replaced indicator is deleted and re-inserted, moving it to the end like the in-memory store
+        latest = {record.id: record for record in records}
+        ids = list(latest)
+        tag_rows = [{"indicator_id": r.id, "tag": tag} for r in latest.values() for tag in set(r.tags)]
+        with self.database.transaction() as connection:
+            for chunk in _chunks(ids):
+                connection.execute(delete(indicators).where(indicators.c.id.in_(chunk)))
+            connection.execute(insert(indicators), [_row(r) for r in latest.values()])
+            if tag_rows:
+                connection.execute(insert(indicator_tags), tag_rows)
+
+    async def delete(self, indicator_id: str) -> bool:
+        return await self.database.run(self._delete, indicator_id)
+
+    def _delete(self, indicator_id: str) -> bool:
+        with self.database.transaction() as connection:
+            return connection.execute(delete(indicators).where(indicators.c.id == indicator_id)).rowcount > 0
+
+    def _search_statement(self, filters: IndicatorFilters, after: Optional[int]):
+        stmt = select(indicators).where(*_conditions(filters)).order_by(indicators.c.seq)
+        if after is not None:
+            stmt = stmt.where(indicators.c.seq > after)
+        return stmt
+
+    async def search(self, filters: IndicatorFilters, after: Optional[int] = None) -> Iterator[IndicatorRecord]:
+        # A plain generator: the response streams it from a worker thread, fetching in batches
+        return self._stream(self._search_statement(filters, after))
+
+    def _stream(self, stmt) -> Iterator[IndicatorRecord]:
+        with self.database.connect() as connection:
+            for row in connection.execution_options(yield_per=_STREAM_BATCH).execute(stmt):
+                yield _record(row)
+
+    async def search_page(self, filters: IndicatorFilters, limit: Optional[int], after: Optional[int] = None) -> Page:
+        return await self.database.run(self._search_page, filters, limit, after)
+
+    def _search_page(self, filters: IndicatorFilters, limit: Optional[int], after: Optional[int]) -> Page:
+        stmt = self._search_statement(filters, after)
+        if limit is not None:
+            # One extra row tells whether there is a next page
+            stmt = stmt.limit(limit + 1)
+        with self.database.connect() as connection:
+            rows = connection.execute(stmt).all()
+        if limit is None or len(rows) <= limit:
+            return [_record(row) for row in rows], None
+        return [_record(row) for row in rows[:limit]], rows[limit - 1].seq
+
+    async def related(self, indicator_id: str, limit: int = 50, depth: int = 1) -> List[IndicatorRecord]:
+        return await self.database.run(self._related, indicator_id, limit, depth)
+
+    def _related(self, indicator_id: str, limit: int, depth: int) -> List[IndicatorRecord]:
+        origin, other = indicator_tags.alias("origin"), indicator_tags.alias("other")
+        seq: Dict[str, int] = {}
+        with self.database.connect() as connection:
+            def neighbours(frontier: List[str]) -> Counter:
+                # Shared tags per neighbour, summed over the frontier, in one self-join
+                stmt = (
+                    select(other.c.indicator_id, indicators.c.seq, func.count())
+                    .select_from(origin)
+                    .join(other, other.c.tag == origin.c.tag)
+                    .join(indicators, indicators.c.id == other.c.indicator_id)
+                    .where(origin.c.indicator_id.in_(frontier))
+                    .group_by(other.c.indicator_id)
+                )
+                counts = Counter()
+                for neighbour, neighbour_seq, shared in connection.execute(stmt):
+                    seq[neighbour] = neighbour_seq
+                    counts[neighbour] = shared
+                return counts
+
+            related = expand_related(indicator_id, neighbours, seq.__getitem__, limit, depth)
+            records = {}
+            for chunk in _chunks(related):
+                for row in connection.execute(select(indicators).where(indicators.c.id.in_(chunk))):
+                    records[row.id] = _record(row)
+        return [records[i] for i in related if i in records]
+
+    async def aggregate(self, filters: IndicatorFilters) -> Aggregates:
+        return await self.database.run(self._aggregate, filters)
+
+    def _aggregate(self, filters: IndicatorFilters) -> Aggregates:
+        c = indicators.c
+        day = cast(c.timestamp / DAY, Integer)
+        stmt = (
+            select(day, c.source, c.type, func.count())
+            .where(*_conditions(filters))
+            .group_by(day, c.source, c.type)
+        )
+        result = Aggregates(Counter(), Counter(), Counter())
+        with self.database.connect() as connection:
+            for cell_day, source, type, count in connection.execute(stmt):
+                result.timeline[cell_day] += count
+                result.by_source[source] += count
+                result.by_type[type] += count
+        return result
+
+
+class SQLiteDocumentRepository(DocumentRepository):
+    def __init__(self, database: Database, table: Table, key: str = "id"):
+        super().__init__(key)
+        self.database = database
+        self.table = table
+
+    async def count(self) -> int:
+        return await self.database.run(self._count)
+
+    def _count(self) -> int:
+        with self.database.connect() as connection:
+            return connection.execute(select(func.count()).select_from(self.table)).scalar_one()
+
+    async def version(self) -> str:
+        return await self.database.run(self._version)
+
+    def _version(self) -> str:
+        with self.database.connect() as connection:
+            version = connection.execute(
+                select(document_versions.c.version).where(document_versions.c.name == self.table.name)
+            ).scalar_one_or_none()
+        return str(version or 0)
+
+    def _bump_version(self, connection):
+        stmt = sqlite_insert(document_versions).values(name=self.table.name, version=1)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[document_versions.c.name], set_={"version": document_versions.c.version + 1},
+        ))
+
+    async def get(self, key: str) -> Optional[dict]:
+        return await self.database.run(self._get, key)
+
+    def _get(self, key: str) -> Optional[dict]:
+        with self.database.connect() as connection:
+            document = connection.execute(
+                select(self.table.c.document).where(self.table.c.key == key)
+            ).scalar_one_or_none()
+        return None if document is None else json.loads(document)
+
+    async def list_page(self, limit: Optional[int] = None, after: Optional[int] = None) -> Page:
+        return await self.database.run(self._list_page, limit, after)
+
+    def _list_page(self, limit: Optional[int], after: Optional[int]) -> Page:
+        stmt = select(self.table.c.seq, self.table.c.document).order_by(self.table.c.seq)
+        if after is not None:
+            stmt = stmt.where(self.table.c.seq > after)
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        with self.database.connect() as connection:
+            rows = connection.execute(stmt).all()
+        if limit is None or len(rows) <= limit:
+            return [json.loads(row.document) for row in rows], None
+        return [json.loads(row.document) for row in rows[:limit]], rows[limit - 1].seq
+
+    async def create(self, document: dict) -> bool:
+        return await self.database.run(self._create, document)
+
+    def _create(self, document: dict) -> bool:
+        try:
+            with self.database.transaction() as connection:
+                connection.execute(insert(self.table).values(key=document[self.key], document=json.dumps(document)))
+                self._bump_version(connection)
+        except IntegrityError:
+            return False
+        return True
+
+    async def update(self, key: str, document: dict) -> bool:
+        return await self.database.run(self._update, key, document)
+
+    def _update(self, key: str, document: dict) -> bool:
+        with self.database.transaction() as connection:
+            # Stored under `key`, so the document must carry it too
+            document = {**document, self.key: key}
+            stmt = update(self.table).where(self.table.c.key == key).values(document=json.dumps(document))
+            if connection.execute(stmt).rowcount == 0:
+                return False
+            self._bump_version(connection)
+            return True
+
+    async def delete(self, key: str) -> bool:
+        return await self.database.run(self._delete, key)
+
+    def _delete(self, key: str) -> bool:
+        with self.database.transaction() as connection:
+            if connection.execute(delete(self.table).where(self.table.c.key == key)).rowcount == 0:
+                return False
+            self._bump_version(connection)
+            return True
+
+
+class SQLiteFeedIndicatorRepository(FeedIndicatorRepository):
+    def __init__(self, database: Database):
+        self.database = database
+
+    async def link(self, feed_id: str, records: List[IndicatorRecord]):
+        await self.database.run(self._link, feed_id, records)
+
+    def _link(self, feed_id: str, records: List[IndicatorRecord]):
+        if not records:
+            return
+        rows = [{"feed_id": feed_id, "indicator_id": r.id, "type": r.type} for r in records]
+        with self.database.transaction() as connection:
+            connection.execute(sqlite_insert(feed_indicators).on_conflict_do_nothing(), rows)
+
+    async def type_counts(self, feed_id: str) -> Dict[str, int]:
+        return await self.database.run(self._type_counts, feed_id)
+
+    def _type_counts(self, feed_id: str) -> Dict[str, int]:
+        c = feed_indicators.c
+        stmt = select(c.type, func.count()).where(c.feed_id == feed_id).group_by(c.type)
+        with self.database.connect() as connection:
+            return {type: count for type, count in connection.execute(stmt)}
+
+    async def page(self, feed_id: str, limit: Optional[int], after: Optional[int] = None) -> Page:
+        return await self.database.run(self._page, feed_id, limit, after)
+
+    def _page(self, feed_id: str, limit: Optional[int], after: Optional[int]) -> Page:
+        c = feed_indicators.c
+        stmt = select(c.seq, c.indicator_id).where(c.feed_id == feed_id).order_by(c.seq)
+        if after is not None:
+            stmt = stmt.where(c.seq > after)
+        if limit is not None:
+            stmt = stmt.limit(limit + 1)
+        with self.database.connect() as connection:
+            rows = connection.execute(stmt).all()
+        if limit is None or len(rows) <= limit:
+            return [row.indicator_id for row in rows], None
+        return [row.indicator_id for row in rows[:limit]], rows[limit - 1].seq
+
+    async def unlink_feed(self, feed_id: str):
+        await self.database.run(self._unlink_feed, feed_id)
+
+    def _unlink_feed(self, feed_id: str):
+        with self.database.transaction() as connection:
+            connection.execute(delete(feed_indicators).where(feed_indicators.c.feed_id == feed_id))
+
+
+class SQLiteRepositories(Repositories):
+    def __init__(self, url: str, pool_size: int = 5, max_overflow: int = 10):
+        self.database = Database(url, pool_size=pool_size, max_overflow=max_overflow)
+        self.indicators = SQLiteIndicatorRepository(self.database)
+        self.feeds = SQLiteDocumentRepository(self.database, feeds)
+        self.feed_indicators = SQLiteFeedIndicatorRepository(self.database)
+        self.reports = SQLiteDocumentRepository(self.database, reports)
+        self.users = SQLiteDocumentRepository(self.database, users, key="username")
+
+    async def open(self, users_file: Optional[str] = None):
+        await self.database.run(self.database.create_all, metadata)
+        await super().open(users_file)
+
+    async def close(self):
+        await super().close()
+        self.database.dispose()
@@ -0,0 +1,45 @@
+import threading
+from typing import Callable, Iterable, Optional, Tuple
+
+from app.store.bloom import BloomFilter
+
+
+class ValueFilter:
+    """Bloom filter over the stored indicator values, for backends where a lookup is a round trip.
+
+    It is caught up before each use from rows past the last sequence number
+    it has seen, so inserts by any worker are picked up and a value that is
+    not in the filter is certainly not stored. Deleted values linger as
+    false positives until the filter fills up and is rebuilt from scratch.
+    """
+
+    def __init__(self, min_capacity: int = 1 << 16, error_rate: float = 0.01):
+        self.min_capacity = min_capacity
+        self.error_rate = error_rate
+        self.bloom: Optional[BloomFilter] = None
+        self.position: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def sync(
+        self,
+        fetch: Callable[[Optional[int]], Iterable[Tuple[int, str]]],
+        count: Callable[[], int],
+        settled: Optional[int] = None,
+    ) -> BloomFilter:
+        """Add (seq, value) rows from `fetch(after)` and return the filter.
+
+        Positions past `settled` are fetched again on the next sync, for
+        backends whose newest writes may still become visible out of order.
+        """
+        with self._lock:
+            if self.bloom is None or self.bloom.full:
+                self.bloom = BloomFilter(max(self.min_capacity, 2 * count()), self.error_rate)
+                self.position = None
+            position = self.position
+            for seq, value in fetch(self.position):
+                self.bloom.add(value)
+                position = seq if position is None else max(position, seq)
+            if settled is not None and position is not None:
+                position = min(position, settled)
+            self.position = position
+            return self.bloom
@@ -0,0 +1,97 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+# Private: every cached route requires authentication. no-cache makes clients revalidate on each poll,
+# which a matching ETag answers with an empty 304.
+CACHE_CONTROL = "private, no-cache"
+
+
+class CachedResponse(NamedTuple):
+    versions: Tuple
+    body: bytes
+    etag: str
+    headers: Dict[str, str]
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so a W/ prefix is ignored
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+class ResponseCache:
+    """Serialized JSON responses with strong ETags, keyed by route and normalized parameters.
+
+    Each entry records the versions of the datasets it was rendered from and
+    is only served while they are unchanged. Versions come from the
+    repositories, so a write made by any worker invalidates every worker's
+    entries.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def lookup(self, key: Hashable, versions: Tuple) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.versions != versions:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(self, key: Hashable, versions: Tuple, body: bytes, headers: Dict[str, str]) -> CachedResponse:
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        entry = CachedResponse(versions, body, etag, headers)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    async def respond(
+        self,
+        request: Request,
+        key: Hashable,
+        versions: Tuple,
+        adapter: TypeAdapter,
+        render: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]],
+    ) -> Response:
+        """Serve `key` from the cache, rendering and serializing it through `adapter` on a miss.
+
+        `versions` must be read before rendering starts: a write that lands
+        mid-render then leaves the entry behind the current version instead
+        of caching stale data under it.
+        """
+        entry = self.lookup(key, versions)
+        if entry is None:
+            payload, headers = await render()
+            entry = self.store(key, versions, adapter.dump_json(adapter.validate_python(payload)), headers)
+
+        headers = {**entry.headers, "ETag": entry.etag, "Cache-Control": CACHE_CONTROL}
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and _etag_matches(if_none_match, entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type="application/json", headers=headers)
+
+
+response_cache = ResponseCache(int(os.getenv("TIP_RESPONSE_CACHE_ENTRIES", "1024")))
@@ -1,45 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Annotated
+from typing import Annotated, Dict, Hashable, Optional, Tuple
+import asyncio
+import os
+import time
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+from app.repositories import repositories
+from app.instrumentation import InstrumentedRoute, phase
 
 # This is a simple example. In a real app, you would store users in a database
 # and use proper authentication mechanisms.
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 # Secret key for JWT
 SECRET_KEY = "your-secret-key"  # In production, use a secure key and store it in environment variables
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Password verification runs on a bounded pool; at most this many hashes are computed at once.
+# A process pool also isolates the event loop from hash backends that hold the GIL.
+MAX_CONCURRENT_VERIFICATIONS = int(os.getenv("TIP_MAX_CONCURRENT_VERIFICATIONS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_VERIFY_POOL = os.getenv("TIP_PASSWORD_VERIFY_POOL", "process")
+# Failed logins allowed within the window before throttling, per username from one client address
+# and per client address; a username alone is never locked out, so others cannot lock out an account
+MAX_FAILED_LOGINS_PER_USER = 5
+MAX_FAILED_LOGINS_PER_CLIENT = 20
+FAILED_LOGIN_WINDOW_SECONDS = 300
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Mock user database
-fake_users_db = {
-    "admin": {
-        "username": "admin",
-        "full_name": "Admin User",
-        "email": "admin@example.com",
-        "hashed_password": pwd_context.hash("admin"),  # In a real app, never store passwords like this
-        "role": "admin",
-    },
-    "analyst": {
-        "username": "analyst",
-        "full_name": "Analyst User",
-        "email": "analyst@example.com",
-        "hashed_password": pwd_context.hash("analyst"),
-        "role": "analyst",
-    },
-}
-
 # Models
 class Token(BaseModel):
     access_token: str
@@ -49,6 +48,9 @@ class TokenData(BaseModel):
     username: str | None = None
 
 class User(BaseModel):
+    # Users are shared across requests, so they must not be mutated
+    model_config = ConfigDict(frozen=True)
+
     id: str
     username: str
     email: str
@@ -61,17 +63,135 @@ class UserInDB(User):
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_user(db, username: str):
-    if username in db:
-        user_dict = db[username]
-        user_dict["id"] = username  # Use username as ID for this example
-        return UserInDB(**user_dict)
+# Prebuilt user objects, one per username
+_user_objects: Dict[str, UserInDB] = {}
+
+_verify_pool: Optional[Executor] = None
+
+def get_verify_pool() -> Executor:
+    global _verify_pool
+    if _verify_pool is None:
+        pool_class = ThreadPoolExecutor if PASSWORD_VERIFY_POOL == "thread" else ProcessPoolExecutor
+        _verify_pool = pool_class(max_workers=MAX_CONCURRENT_VERIFICATIONS)
+    return _verify_pool
+
+def shutdown_verify_pool():
+    global _verify_pool
+    if _verify_pool is not None:
+        _verify_pool.shutdown(cancel_futures=True)
+        _verify_pool = None
+
+async def verify_password_async(plain_password, hashed_password):
+    # bcrypt is deliberately slow; keep it off the event loop so other requests keep flowing
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_verify_pool(), verify_password, plain_password, hashed_password)
+
+async def get_user(username: str):
+    document = await repositories.users.get(username)
+    if document is not None:
+        user = _user_objects.get(username)
+        if user is None:
+            # Use username as ID for this example
+            user = _user_objects[username] = UserInDB(id=username, **document)
+        return user
+
+class TokenCache:
+    """LRU cache of verified tokens.
+
+    An entry lives until the token's own `exp` or `max_ttl` seconds, whichever
+    comes first, so a cached token is never accepted past its expiry.
+    """
+
+    def __init__(self, maxsize: int = 10000, max_ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict[str, Tuple[UserInDB, float]] = OrderedDict()
+
+    def get(self, token: str) -> Optional[UserInDB]:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if time.time() >= expires_at:
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return user
+
+    def put(self, token: str, user: UserInDB, exp: float):
+        self._entries[token] = (user, min(exp, time.time() + self.max_ttl))
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+token_cache = TokenCache()
+
+class LoginThrottle:
+    """Sliding-window count of failed logins per key.
 
-def authenticate_user(fake_db, username: str, password: str):
-    user = get_user(fake_db, username)
+    At most `maxsize` keys are tracked. Keys are kept in order of their last
+    failure, so expired ones are swept from the front on every write and the
+    least recently failing key is dropped past the limit; a client cycling
+    through made-up usernames cannot grow it without bound.
+    """
+
+    def __init__(self, max_failures: int, window: float = FAILED_LOGIN_WINDOW_SECONDS, maxsize: int = 100000):
+        self.max_failures = max_failures
+        self.window = window
+        self.maxsize = maxsize
+        self._failures: OrderedDict[Hashable, deque] = OrderedDict()
+
+    def __len__(self):
+        return len(self._failures)
+
+    def _recent(self, key: Hashable) -> Optional[deque]:
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        cutoff = time.monotonic() - self.window
+        while failures and failures[0] < cutoff:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def retry_after(self, key: Hashable) -> float:
+        """Seconds until `key` is below the failure limit again (0 if it is not throttled)."""
+        failures = self._recent(key)
+        if failures is None or len(failures) < self.max_failures:
+            return 0.0
+        return failures[-self.max_failures] + self.window - time.monotonic()
+
+    def record_failure(self, key: Hashable):
+        now = time.monotonic()
+        failures = self._failures.setdefault(key, deque())
+        failures.append(now)
+        self._failures.move_to_end(key)
+        # Only the newest max_failures entries matter for the limit
+        while len(failures) > self.max_failures:
+            failures.popleft()
+        cutoff = now - self.window
+        while self._failures:
+            oldest_key, oldest = next(iter(self._failures.items()))
+            if oldest[-1] >= cutoff and len(self._failures) <= self.maxsize:
+                break
+            del self._failures[oldest_key]
+
+    def reset(self, key: Hashable):
+        self._failures.pop(key, None)
+
+user_login_throttle = LoginThrottle(MAX_FAILED_LOGINS_PER_USER)
+client_login_throttle = LoginThrottle(MAX_FAILED_LOGINS_PER_CLIENT)
+
+async def authenticate_user(username: str, password: str):
+    user = await get_user(username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -85,7 +205,7 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+async def verify_token(token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -99,9 +219,17 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = get_user(fake_users_db, username=token_data.username)
+    user = await get_user(token_data.username)
     if user is None:
         raise credentials_exception
+    return user, payload.get("exp", float("inf"))
+
+async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
+    with phase("auth"):
+        user = token_cache.get(token)
+        if user is None:
+            user, exp = await verify_token(token)
+            token_cache.put(token, user, exp)
     return user
 
 # Routes
@@ -110,14 +238,29 @@ class LoginRequest(BaseModel):
     password: str
 
 @router.post("/login", response_model=dict)
-async def login(login_data: LoginRequest):
-    user = authenticate_user(fake_users_db, login_data.username, login_data.password)
+async def login(login_data: LoginRequest, request: Request):
+    client = request.client.host if request.client else "unknown"
+    retry_after = max(
+        user_login_throttle.retry_after((login_data.username, client)),
+        client_login_throttle.retry_after(client),
+    )
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+    user = await authenticate_user(login_data.username, login_data.password)
     if not user:
+        user_login_throttle.record_failure((login_data.username, client))
+        client_login_throttle.record_failure(client)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    user_login_throttle.reset((login_data.username, client))
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, TypeAdapter
 from app.routes.auth import get_current_user, User
+from app.repositories import repositories
+from app.pagination import NDJSON_MEDIA_TYPE, cursor_headers, decode_cursor, ndjson_lines
+from app.response_cache import response_cache
+from app.store import IndicatorRecord
+from app.instrumentation import InstrumentedRoute, phase
+from app import serialization
+from app.serialization import json_response, records_json
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 # Models
 class ThreatIndicator(BaseModel):
@@ -23,8 +31,42 @@ class ThreatFeed(BaseModel):
     source: str
     description: str
     lastUpdated: str
+    url: Optional[str] = None
+    # Requests per second against `url` while ingesting; 0 or unset means no limit
+    rateLimit: Optional[float] = Field(None, ge=0)
+    # Accepted on create and update, then stored as indicators the feed references
     indicators: List[ThreatIndicator] = []
 
+class FeedSummary(BaseModel):
+    id: str
+    name: str
+    source: str
+    description: str
+    lastUpdated: str
+    url: Optional[str] = None
+    rateLimit: Optional[float] = None
+    indicatorCount: int = 0
+    typeCounts: Dict[str, int] = {}
+    lastIngested: Optional[str] = None
+
+class FeedIngestResult(BaseModel):
+    feedId: str
+    status: str
+    received: int
+    ingested: int
+    duplicates: int
+    rejected: int
+    batches: int
+    attempts: int
+    seconds: float
+    indicatorsPerSecond: float
+    error: Optional[str] = None
+
+_feed_list = TypeAdapter(List[FeedSummary])
+
+# Maintained by the server; a stored feed document is a FeedSummary
+_COUNTERS = {"indicatorCount": 0, "typeCounts": {}, "lastIngested": None}
+
 # Mock data
 mock_feeds = [
     {
@@ -64,49 +106,169 @@ mock_feeds = [
     }
 ]
 
+async def seed_feeds():
+    # Called from the application lifespan rather than at import time
+    if not await repositories.feeds.count():
+        for feed in mock_feeds:
+            await repositories.feeds.create(dict(feed))
+    # Feeds stored before they referenced their indicators (the mock ones included) still embed them
+    feeds, _ = await repositories.feeds.list_page()
+    for feed in feeds:
+        if "indicators" in feed:
+            indicators = feed.pop("indicators")
+            feed = {**_COUNTERS, **feed}
+            await repositories.feeds.update(feed["id"], feed)
+            if indicators:
+                await _link_indicators(feed, indicators)
+
+async def _refresh_counters(feed: dict, ingested_at: Optional[str] = None) -> dict:
+    type_counts = await repositories.feed_indicators.type_counts(feed["id"])
+    feed = {**feed, "indicatorCount": sum(type_counts.values()), "typeCounts": type_counts}
+    if ingested_at is not None:
+        feed["lastIngested"] = ingested_at
+    await repositories.feeds.update(feed["id"], feed)
+    return feed
+
+async def _link_indicators(feed: dict, indicators: List[dict]) -> dict:
+    records = [IndicatorRecord.from_dict(i) for i in indicators]
+    await repositories.indicators.add_many(records)
+    await repositories.feed_indicators.link(feed["id"], records)
+    return await _refresh_counters(feed, datetime.now().isoformat())
+
+_feed_ingestor = None
+
+def get_feed_ingestor():
+    # Built on first use so importing this router does not load the HTTP client stack
+    global _feed_ingestor
+    if _feed_ingestor is None:
+        from app.ingest.pipeline import FeedIngestor
+        _feed_ingestor = FeedIngestor(repositories.indicators, links=repositories.feed_indicators)
+    return _feed_ingestor
+
 # Routes
-@router.get("/", response_model=List[ThreatFeed])
-async def get_feeds(current_user: User = Depends(get_current_user)):
-    return mock_feeds
+@router.get("/", response_model=List[FeedSummary])
+async def get_feeds(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    format: str = Query("json", enum=["json", "ndjson"]),
+    current_user: User = Depends(get_current_user)
+):
+    after = decode_cursor(cursor)
+    if format == "ndjson":
+        page, next_position = await repositories.feeds.list_page(limit, after=after)
+        return StreamingResponse(ndjson_lines(page), media_type=NDJSON_MEDIA_TYPE, headers=cursor_headers(next_position))
+
+    async def render():
+        page, next_position = await repositories.feeds.list_page(limit, after=after)
+        return page, cursor_headers(next_position)
+
+    return await response_cache.respond(request, ("feeds", limit, after), (await repositories.feeds.version(),),
+                                        _feed_list, render)
+
+@router.post("/ingest", response_model=List[FeedIngestResult])
+async def ingest_feeds(feed_id: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to ingest feeds")
+
+    if feed_id is None:
+        feeds, _ = await repositories.feeds.list_page()
+    else:
+        feed = await repositories.feeds.get(feed_id)
+        feeds = [feed] if feed is not None else []
+    feeds = [f for f in feeds if f.get("url")]
+    if feed_id is not None and not feeds:
+        raise HTTPException(status_code=404, detail="Feed not found or has no URL")
+
+    from app.ingest.pipeline import FeedSource
+    results = await get_feed_ingestor().run([
+        FeedSource(f["id"], f["url"], f["source"], f.get("rateLimit") or 0.0) for f in feeds
+    ])
 
-@router.get("/{feed_id}", response_model=ThreatFeed)
+    now = datetime.now().isoformat()
+    for feed, stats in zip(feeds, results):
+        if stats.status == "updated":
+            await _refresh_counters({**feed, "lastUpdated": now}, ingested_at=now)
+
+    return [
+        {
+            "feedId": stats.feed_id,
+            "status": stats.status,
+            "received": stats.received,
+            "ingested": stats.ingested,
+            "duplicates": stats.duplicates,
+            "rejected": stats.rejected,
+            "batches": stats.batches,
+            "attempts": stats.attempts,
+            "seconds": stats.seconds,
+            "indicatorsPerSecond": stats.indicators_per_second,
+            "error": stats.error,
+        }
+        for stats in results
+    ]
+
+@router.get("/{feed_id}", response_model=FeedSummary)
 async def get_feed(feed_id: str, current_user: User = Depends(get_current_user)):
-    for feed in mock_feeds:
-        if feed["id"] == feed_id:
-            return feed
-    raise HTTPException(status_code=404, detail="Feed not found")
+    feed = await repositories.feeds.get(feed_id)
+    if feed is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    return feed
+
+@router.get("/{feed_id}/indicators", response_model=List[ThreatIndicator])
+async def get_feed_indicators(
+    feed_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    if await repositories.feeds.get(feed_id) is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    ids, next_position = await repositories.feed_indicators.page(feed_id, limit, after=decode_cursor(cursor))
+    records = await repositories.indicators.get_many(ids)
+    if serialization.FAST_JSON:
+        with phase("serialization"):
+            return json_response(records_json(records), cursor_headers(next_position))
+    response.headers.update(cursor_headers(next_position))
+    return [r.to_dict() for r in records]
 
-@router.post("/", response_model=ThreatFeed)
+@router.post("/", response_model=FeedSummary)
 async def create_feed(feed: ThreatFeed, current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to create feeds")
     
-    # In a real app, you would save to a database
-    mock_feeds.append(feed.dict())
-    return feed
+    document = {**feed.dict(exclude={"indicators"}), **_COUNTERS}
+    if not await repositories.feeds.create(document):
+        raise HTTPException(status_code=409, detail="Feed already exists")
+    if feed.indicators:
+        document = await _link_indicators(document, [i.dict() for i in feed.indicators])
+    return document
 
-@router.put("/{feed_id}", response_model=ThreatFeed)
+@router.put("/{feed_id}", response_model=FeedSummary)
 async def update_feed(feed_id: str, feed: ThreatFeed, current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to update feeds")
+    if feed.id != feed_id:
+        raise HTTPException(status_code=400, detail="Feed id does not match the URL")
     
-    for i, existing_feed in enumerate(mock_feeds):
-        if existing_feed["id"] == feed_id:
-            # Update feed
-            mock_feeds[i] = feed.dict()
-            return feed
-    
-    raise HTTPException(status_code=404, detail="Feed not found")
+    existing = await repositories.feeds.get(feed_id)
+    if existing is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+    document = {**feed.dict(exclude={"indicators"}), **{k: existing.get(k, v) for k, v in _COUNTERS.items()}}
+    if not await repositories.feeds.update(feed_id, document):
+        raise HTTPException(status_code=404, detail="Feed not found")
+    # PUT replaces the feed's indicator set: anything left out of the body is no longer linked to it
+    await repositories.feed_indicators.unlink_feed(feed_id)
+    if feed.indicators:
+        return await _link_indicators(document, [i.dict() for i in feed.indicators])
+    return await _refresh_counters(document)
 
 @router.delete("/{feed_id}")
 async def delete_feed(feed_id: str, current_user: User = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not authorized to delete feeds")
     
-    for i, feed in enumerate(mock_feeds):
-        if feed["id"] == feed_id:
-            # Delete feed
-            del mock_feeds[i]
-            return {"message": "Feed deleted successfully"}
-    
-    raise HTTPException(status_code=404, detail="Feed not found")
\ No newline at end of file
+    if not await repositories.feeds.delete(feed_id):
+        raise HTTPException(status_code=404, detail="Feed not found")
+    await repositories.feed_indicators.unlink_feed(feed_id)
+    return {"message": "Feed deleted successfully"}
\ No newline at end of file
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from typing import List, Optional
+import time
+import zlib
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, ValidationError
 from app.routes.auth import get_current_user, User
+from app.pagination import NDJSON_MEDIA_TYPE, cursor_headers, decode_cursor, ndjson_lines
+from app.ingest import iter_batches, iter_lines, normalize_indicator
+from app.repositories import IndicatorFilters, repositories
+from app.store import IndicatorRecord, parse_date_bound
+from app.instrumentation import InstrumentedRoute, phase
+from app import serialization
+from app.serialization import json_response, lookup_json, record_lines, records_json
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 # Models
 class ThreatIndicator(BaseModel):
@@ -26,6 +36,40 @@ class SearchFilters(BaseModel):
     tags: Optional[List[str]] = None
     searchTerm: Optional[str] = None
 
+class BulkBatchStats(BaseModel):
+    batch: int
+    received: int
+    accepted: int
+    rejected: int
+    seconds: float
+
+class BulkError(BaseModel):
+    line: int
+    error: str
+
+class BulkIngestResult(BaseModel):
+    received: int
+    accepted: int
+    rejected: int
+    batches: List[BulkBatchStats]
+    errors: List[BulkError]
+
+BULK_BATCH_SIZE = 5000
+BULK_MAX_ERRORS = 100
+LOOKUP_MAX_VALUES = 50000
+
+class LookupRequest(BaseModel):
+    values: List[str] = Field(..., max_length=LOOKUP_MAX_VALUES)
+
+class LookupMatch(BaseModel):
+    value: str
+    indicators: List[ThreatIndicator]
+
+class LookupResult(BaseModel):
+    received: int
+    matched: int
+    matches: List[LookupMatch]
+
 # Mock data
 mock_indicators = [
     {
@@ -60,62 +104,154 @@ mock_indicators = [
     }
 ]
 
+async def seed_indicators():
+    # Called from the application lifespan rather than at import time
+    if not await repositories.indicators.count():
+        await repositories.indicators.add_many([IndicatorRecord.from_dict(i) for i in mock_indicators])
+
 # Routes
 @router.post("/search", response_model=List[ThreatIndicator])
-async def search_indicators(filters: SearchFilters = Body(...), current_user: User = Depends(get_current_user)):
-    # In a real app, this would query a database with the provided filters
-    # For this example, we'll do a simple filtering on the mock data
-    
-    results = mock_indicators.copy()
-    
-    if filters.type:
-        results = [i for i in results if i["type"] == filters.type]
-    
-    if filters.source:
-        results = [i for i in results if i["source"] == filters.source]
-    
-    if filters.confidence:
-        results = [i for i in results if i["confidence"] >= filters.confidence]
-    
-    if filters.tags and len(filters.tags) > 0:
-        results = [i for i in results if any(tag in i["tags"] for tag in filters.tags)]
-    
-    if filters.searchTerm:
-        search_term = filters.searchTerm.lower()
-        results = [i for i in results if (
-            search_term in i["value"].lower() or 
-            search_term in i["description"].lower() if i["description"] else False
-        )]
-    
-    return results
+async def search_indicators(
+    response: Response,
+    filters: SearchFilters = Body(...),
+    limit: Optional[int] = Query(None, ge=1, le=10000),
+    cursor: Optional[str] = None,
+    format: str = Query("json", enum=["json", "ndjson"]),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        since = parse_date_bound(filters.fromDate) if filters.fromDate else None
+        until = parse_date_bound(filters.toDate, end=True) if filters.toDate else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="fromDate and toDate must be ISO 8601 dates")
+
+    query = IndicatorFilters(
+        type=filters.type,
+        source=filters.source,
+        min_confidence=filters.confidence,
+        tags=filters.tags,
+        search_term=filters.searchTerm,
+        since=since,
+        until=until,
+    )
+    after = decode_cursor(cursor)
+
+    # Without a limit, NDJSON streams straight from the repository
+    if format == "ndjson" and limit is None:
+        results = await repositories.indicators.search(query, after=after)
+        lines = record_lines(results) if serialization.FAST_JSON else ndjson_lines(r.to_dict() for r in results)
+        return StreamingResponse(lines, media_type=NDJSON_MEDIA_TYPE)
+
+    page, next_position = await repositories.indicators.search_page(query, limit, after=after)
+    headers = cursor_headers(next_position)
+    if serialization.FAST_JSON:
+        if format == "ndjson":
+            return StreamingResponse(record_lines(page), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+        with phase("serialization"):
+            return json_response(records_json(page), headers)
+    with phase("serialization"):
+        page = [r.to_dict() for r in page]
+    if format == "ndjson":
+        return StreamingResponse(ndjson_lines(page), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+    response.headers.update(headers)
+    return page
+
+def _bulk_error(result: dict, line_number: int, message: str):
+    if len(result["errors"]) < BULK_MAX_ERRORS:
+        result["errors"].append({"line": line_number, "error": message})
+
+@router.post("/bulk", response_model=BulkIngestResult)
+async def bulk_ingest_indicators(request: Request, current_user: User = Depends(get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to ingest indicators")
+
+    # NDJSON, one ThreatIndicator per line, optionally gzip-compressed
+    compressed = (
+        request.headers.get("content-encoding", "").lower() == "gzip"
+        or request.headers.get("content-type", "").split(";")[0].strip() in ("application/gzip", "application/x-gzip")
+    )
+    result = {"received": 0, "accepted": 0, "rejected": 0, "batches": [], "errors": []}
+    try:
+        async for batch in iter_batches(iter_lines(request.stream(), compressed), BULK_BATCH_SIZE):
+            started = time.perf_counter()
+            records = []
+            for line_number, line in batch:
+                try:
+                    indicator = ThreatIndicator.model_validate_json(line)
+                    # Same checks as feed ingestion: non-blank type and value, confidence within 0..1
+                    records.append(normalize_indicator(indicator.__dict__, indicator.source))
+                except ValidationError as exc:
+                    error = exc.errors()[0]
+                    location = ".".join(str(part) for part in error["loc"])
+                    _bulk_error(result, line_number, f"{location}: {error['msg']}" if location else error["msg"])
+                except ValueError as exc:
+                    _bulk_error(result, line_number, str(exc))
+            # One upsert per batch keeps every index update in a single pass
+            await repositories.indicators.add_many(records)
+            result["batches"].append({
+                "batch": len(result["batches"]) + 1,
+                "received": len(batch),
+                "accepted": len(records),
+                "rejected": len(batch) - len(records),
+                "seconds": time.perf_counter() - started,
+            })
+            result["received"] += len(batch)
+            result["accepted"] += len(records)
+            result["rejected"] += len(batch) - len(records)
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Request body is not valid gzip")
+
+    return result
+
+def _lookup_result(received: int, values: List[str], found: Dict[str, List[IndicatorRecord]]):
+    matches = [(value, found[value]) for value in values if value in found]
+    if serialization.FAST_JSON:
+        with phase("serialization"):
+            return json_response(lookup_json(received, matches))
+    return {
+        "received": received,
+        "matched": len(matches),
+        "matches": [{"value": value, "indicators": [r.to_dict() for r in records]} for value, records in matches],
+    }
+
+@router.post("/lookup", response_model=LookupResult)
+async def lookup_indicators(request: LookupRequest, current_user: User = Depends(get_current_user)):
+    # Raw observables (IPs, domains, hashes, ...) matched exactly against indicator values;
+    # repeated observables are looked up once
+    values = list(dict.fromkeys(value.strip() for value in request.values if value.strip()))
+    found = await repositories.indicators.lookup(values)
+    return _lookup_result(len(request.values), values, found)
+
+@router.post("/match", response_model=LookupResult)
+async def match_indicators(request: LookupRequest, current_user: User = Depends(get_current_user)):
+    # Addresses and CIDR blocks match IP indicators on any enclosing block; domain names match
+    # Domain indicators on the name or any parent of it. Other observables match nothing here.
+    values = list(dict.fromkeys(value.strip() for value in request.values if value.strip()))
+    found = await repositories.indicators.covering(values)
+    return _lookup_result(len(request.values), values, found)
 
 @router.get("/{indicator_id}", response_model=ThreatIndicator)
 async def get_indicator(indicator_id: str, current_user: User = Depends(get_current_user)):
-    for indicator in mock_indicators:
-        if indicator["id"] == indicator_id:
-            return indicator
-    raise HTTPException(status_code=404, detail="Indicator not found")
+    indicator = await repositories.indicators.get(indicator_id)
+    if indicator is None:
+        raise HTTPException(status_code=404, detail="Indicator not found")
+    if serialization.FAST_JSON:
+        return json_response(indicator.to_json())
+    return indicator.to_dict()
 
 @router.get("/{indicator_id}/related", response_model=List[ThreatIndicator])
-async def get_related_indicators(indicator_id: str, current_user: User = Depends(get_current_user)):
-    # In a real app, this would find related indicators based on some criteria
-    # For this example, we'll just return a couple of other indicators
-    
-    target_indicator = None
-    for indicator in mock_indicators:
-        if indicator["id"] == indicator_id:
-            target_indicator = indicator
-            break
-    
-    if not target_indicator:
+async def get_related_indicators(
+    indicator_id: str,
+    limit: int = Query(50, ge=1, le=1000),
+    depth: int = Query(1, ge=1, le=3),
+    current_user: User = Depends(get_current_user)
+):
+    if await repositories.indicators.get(indicator_id) is None:
         raise HTTPException(status_code=404, detail="Indicator not found")
-    
-    # Return indicators with the same tags
-    related = []
-    for indicator in mock_indicators:
-        if indicator["id"] != indicator_id:
-            # Check if any tags match
-            if any(tag in indicator["tags"] for tag in target_indicator["tags"]):
-                related.append(indicator)
-    
-    return related
\ No newline at end of file
+
+    # Indicators sharing tags, ranked by how many they share
+    related = await repositories.indicators.related(indicator_id, limit=limit, depth=depth)
+    if serialization.FAST_JSON:
+        with phase("serialization"):
+            return json_response(records_json(related))
+    return [indicator.to_dict() for indicator in related]
@@ -0,0 +1,64 @@
+import ipaddress
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+from fastapi.security import OAuth2PasswordBearer
+from app.routes.auth import get_current_user, User
+from app.instrumentation import CONTENT_TYPE, METRICS_LOOPBACK_SCRAPE, InstrumentedRoute, instrumentation, sample_lines
+from app.response_cache import response_cache
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+# Scrapers on the same host need no token when TIP_METRICS_LOOPBACK_SCRAPE is set
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+PROFILE_SORT_KEYS = ["cumulative", "tottime", "calls", "ncalls"]
+
+async def require_local_or_admin(request: Request, token: Optional[str] = Depends(optional_oauth2_scheme)):
+    if METRICS_LOOPBACK_SCRAPE:
+        try:
+            local = request.client is not None and ipaddress.ip_address(request.client.host).is_loopback
+        except ValueError:
+            local = False
+        if local:
+            return
+    user = await get_current_user(token) if token else None
+    if user is None or user.role != "admin":
+        raise HTTPException(status_code=403, detail="Not authorized to read metrics")
+
+def _require_admin(user: User, what: str):
+    if user.role != "admin":
+        raise HTTPException(status_code=403, detail=f"Not authorized to read {what}")
+
+# Routes
+@router.get("/", response_class=PlainTextResponse, dependencies=[Depends(require_local_or_admin)])
+async def get_metrics():
+    lines = list(sample_lines("tip_response_cache_hits_total", "counter", "Responses served from the response cache.",
+                              [((), response_cache.hits)]))
+    lines += sample_lines("tip_response_cache_misses_total", "counter", "Responses rendered for the response cache.",
+                          [((), response_cache.misses)])
+    lines += sample_lines("tip_response_cache_entries", "gauge", "Responses held in the response cache.",
+                          [((), len(response_cache))])
+    return PlainTextResponse(instrumentation.render() + "\n".join(lines) + "\n", media_type=CONTENT_TYPE)
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(
+    profile_id: str,
+    sort: str = Query("cumulative", enum=PROFILE_SORT_KEYS),
+    limit: int = Query(50, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    _require_admin(current_user, "profiles")
+    report = instrumentation.profile_report(profile_id, sort, limit)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+@router.get("/allocations", response_class=PlainTextResponse)
+async def get_allocations(limit: int = Query(25, ge=1, le=1000), current_user: User = Depends(get_current_user)):
+    _require_admin(current_user, "allocations")
+    report = instrumentation.allocation_report(limit)
+    if report is None:
+        raise HTTPException(status_code=409, detail="Allocation tracing is off; set TIP_TRACEMALLOC_SAMPLE_RATE")
+    return report
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
-from pydantic import BaseModel
+import os
+from pydantic import BaseModel, TypeAdapter
 from app.routes.auth import get_current_user, User
+from app.export import (
+    MEDIA_TYPES, ArtifactKey, artifact_cache, export_chunks, file_chunks, gzip_chunks, report_jobs,
+)
+from app.repositories import IndicatorFilters, repositories
+from app.response_cache import response_cache
+from app.instrumentation import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 
 # Models
 class Report(BaseModel):
@@ -16,6 +24,18 @@ class Report(BaseModel):
     content: str
     format: str
 
+class ReportJob(BaseModel):
+    id: str
+    reportId: str
+    format: str
+    status: str
+    dataVersion: Optional[str] = None
+    cached: bool
+    size: Optional[int] = None
+    error: Optional[str] = None
+    createdAt: str
+    finishedAt: Optional[str] = None
+
 class CreateReportRequest(BaseModel):
     name: str
     description: str
@@ -23,6 +43,8 @@ class CreateReportRequest(BaseModel):
     content: str
     createdBy: str
 
+_report_list = TypeAdapter(List[Report])
+
 # Mock data
 mock_reports = [
     {
@@ -54,23 +76,32 @@ mock_reports = [
     }
 ]
 
+async def seed_reports():
+    # Called from the application lifespan rather than at import time
+    if not await repositories.reports.count():
+        for report in mock_reports:
+            await repositories.reports.create(report)
+
 # Routes
 @router.get("/", response_model=List[Report])
-async def get_reports(current_user: User = Depends(get_current_user)):
-    return mock_reports
+async def get_reports(request: Request, current_user: User = Depends(get_current_user)):
+    async def render():
+        reports, _ = await repositories.reports.list_page()
+        return reports, {}
+
+    return await response_cache.respond(request, ("reports",), (await repositories.reports.version(),),
+                                        _report_list, render)
 
 @router.get("/{report_id}", response_model=Report)
 async def get_report(report_id: str, current_user: User = Depends(get_current_user)):
-    for report in mock_reports:
-        if report["id"] == report_id:
-            return report
-    raise HTTPException(status_code=404, detail="Report not found")
+    report = await repositories.reports.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report
 
 @router.post("/", response_model=Report)
 async def create_report(report: CreateReportRequest, current_user: User = Depends(get_current_user)):
-    # In a real app, you would save to a database
     new_report = {
-        "id": f"report-{len(mock_reports) + 1}",
         "name": report.name,
         "createdAt": datetime.now().isoformat(),
         "createdBy": report.createdBy,
@@ -78,66 +109,94 @@ async def create_report(report: CreateReportRequest, current_user: User = Depend
         "content": report.content,
         "format": report.format
     }
-    
-    mock_reports.append(new_report)
+    # Numbered after the existing reports; create() refuses a taken id, so a number still in
+    # use after deletes, or claimed by a concurrent create, moves on to the next one
+    number = await repositories.reports.count() + 1
+    while not await repositories.reports.create({"id": f"report-{number}", **new_report}):
+        number += 1
+    new_report = {"id": f"report-{number}", **new_report}
+    # Render the report in the background so the first download is served from the cache
+    if new_report["format"] in MEDIA_TYPES:
+        report_jobs.submit(new_report, new_report["format"], repositories.indicators)
     return new_report
 
 @router.put("/{report_id}", response_model=Report)
 async def update_report(report_id: str, report: Report, current_user: User = Depends(get_current_user)):
-    for i, existing_report in enumerate(mock_reports):
-        if existing_report["id"] == report_id:
-            # Check if the user is allowed to update this report
-            if current_user.role != "admin" and existing_report["createdBy"] != current_user.username:
-                raise HTTPException(status_code=403, detail="Not authorized to update this report")
-            
-            # Update report
-            mock_reports[i] = report.dict()
-            return report
-    
-    raise HTTPException(status_code=404, detail="Report not found")
+    existing_report = await repositories.reports.get(report_id)
+    if existing_report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    # Check if the user is allowed to update this report
+    if current_user.role != "admin" and existing_report["createdBy"] != current_user.username:
+        raise HTTPException(status_code=403, detail="Not authorized to update this report")
+    if report.id != report_id:
+        raise HTTPException(status_code=400, detail="Report id does not match the URL")
+
+    await repositories.reports.update(report_id, report.dict())
+    # Cached artifacts embed the old report details
+    artifact_cache.discard_report(report_id)
+    return report
 
 @router.delete("/{report_id}")
 async def delete_report(report_id: str, current_user: User = Depends(get_current_user)):
-    for i, report in enumerate(mock_reports):
-        if report["id"] == report_id:
-            # Check if the user is allowed to delete this report
-            if current_user.role != "admin" and report["createdBy"] != current_user.username:
-                raise HTTPException(status_code=403, detail="Not authorized to delete this report")
-            
-            # Delete report
-            del mock_reports[i]
-            return {"message": "Report deleted successfully"}
-    
-    raise HTTPException(status_code=404, detail="Report not found")
+    report = await repositories.reports.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    # Check if the user is allowed to delete this report
+    if current_user.role != "admin" and report["createdBy"] != current_user.username:
+        raise HTTPException(status_code=403, detail="Not authorized to delete this report")
+
+    await repositories.reports.delete(report_id)
+    artifact_cache.discard_report(report_id)
+    return {"message": "Report deleted successfully"}
+
+@router.post("/{report_id}/jobs", response_model=ReportJob, status_code=202)
+async def create_report_job(
+    report_id: str,
+    format: Optional[str] = Query(None, enum=["pdf", "csv", "json"]),
+    current_user: User = Depends(get_current_user)
+):
+    report = await repositories.reports.get(report_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report_jobs.submit(report, format or report["format"], repositories.indicators)
+
+@router.get("/jobs/{job_id}", response_model=ReportJob)
+async def get_report_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 @router.get("/{report_id}/export")
 async def export_report(
-    report_id: str, 
+    report_id: str,
     format: str = Query(..., enum=["pdf", "csv", "json"]),
+    compress: bool = Query(False, alias="gzip"),
     current_user: User = Depends(get_current_user)
 ):
     # Find the report
-    report = None
-    for r in mock_reports:
-        if r["id"] == report_id:
-            report = r
-            break
-    
+    report = await repositories.reports.get(report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
-    
-    # In a real app, you would generate the report in the requested format
-    # For this example, we'll just return a placeholder response
-    
-    content = f"This is the content of report {report_id} in {format} format"
-    
-    # Set the appropriate content type based on the format
-    if format == "pdf":
-        media_type = "application/pdf"
-    elif format == "csv":
-        media_type = "text/csv"
-    else:  # json
-        media_type = "application/json"
-        content = '{"report": "' + report["name"] + '", "content": "' + report["content"] + '"}'
-    
-    return Response(content=content, media_type=media_type)
\ No newline at end of file
+
+    headers = {"Content-Disposition": f'attachment; filename="{report_id}.{format}"'}
+    key = ArtifactKey(report_id, format, await repositories.indicators.version())
+    artifact = artifact_cache.get(key)
+    if artifact is not None:
+        headers["X-Cache"] = "HIT"
+        if not compress:
+            headers["Content-Length"] = str(os.fstat(artifact.fileno()).st_size)
+        chunks = file_chunks(artifact)
+    else:
+        # Indicators stream from the repository through the renderer chunk by chunk, and are written
+        # to the cache on the way out; the sync generator runs on a worker thread, off the event loop
+        headers["X-Cache"] = "MISS"
+        records = await repositories.indicators.search(IndicatorFilters())
+        chunks = artifact_cache.tee(key, export_chunks(format, report, records))
+    if compress:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format], headers=headers)
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, Body
+from fastapi import APIRouter, Depends, Body, HTTPException, Request
 from typing import List, Dict, Optional
-from datetime import datetime, timedelta
-from pydantic import BaseModel
+from datetime import datetime, timezone
+from pydantic import BaseModel, TypeAdapter
 from app.routes.auth import get_current_user, User
+from app.repositories import IndicatorFilters, repositories
+from app.response_cache import response_cache
+from app.store import format_timestamp, parse_date_bound
+from app.store.aggregates import DAY, day_of
+from app.instrumentation import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
+
+TIMELINE_DAYS = 7
+# The timeline has one point per day of the range, zero-filled, so the range is bounded
+TIMELINE_MAX_DAYS = 400
 
 # Models
 class TimelineDataPoint(BaseModel):
@@ -32,44 +41,62 @@ class SearchFilters(BaseModel):
     toDate: Optional[str] = None
     tags: Optional[List[str]] = None
 
+_visualization_data = TypeAdapter(VisualizationData)
+
 # Routes
 @router.post("/", response_model=VisualizationData)
-async def get_visualization_data(filters: SearchFilters = Body(...), current_user: User = Depends(get_current_user)):
-    # In a real app, this would query a database with the provided filters
-    # and generate visualization data based on the results
-    
-    # For this example, we'll generate some mock data
-    
-    # Generate timeline data for the last 7 days
-    timeline_data = []
-    for i in range(7):
-        date = (datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d")
-        count = 10 + i * 5  # Some random count
-        timeline_data.append({
-            "date": date,
-            "count": count
-        })
-    
-    # Generate source distribution data
-    source_distribution = [
-        {"source": "MISP", "count": 45},
-        {"source": "OTX", "count": 32},
-        {"source": "Recorded Future", "count": 28},
-        {"source": "VirusTotal", "count": 18},
-        {"source": "AbuseIPDB", "count": 12}
-    ]
-    
-    # Generate type distribution data
-    type_distribution = [
-        {"type": "IP", "count": 56},
-        {"type": "Domain", "count": 42},
-        {"type": "URL", "count": 35},
-        {"type": "Hash", "count": 28},
-        {"type": "Email", "count": 14}
-    ]
-    
-    return {
-        "timelineData": timeline_data,
-        "sourceDistribution": source_distribution,
-        "typeDistribution": type_distribution
-    }
\ No newline at end of file
+async def get_visualization_data(
+    request: Request,
+    filters: SearchFilters = Body(...),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        since = parse_date_bound(filters.fromDate) if filters.fromDate else None
+        until = parse_date_bound(filters.toDate, end=True) if filters.toDate else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="fromDate and toDate must be ISO 8601 dates")
+
+    # Tags match any of the given ones, so their order and repeats do not change the result
+    indicator_filters = IndicatorFilters(
+        type=filters.type,
+        source=filters.source,
+        min_confidence=filters.confidence,
+        tags=sorted(set(filters.tags)) if filters.tags else None,
+        since=since,
+        until=until,
+    )
+
+    # The timeline covers the requested range, or the last 7 days when none is given
+    last_day = day_of(until) if until is not None else day_of(datetime.now(timezone.utc).timestamp())
+    first_day = day_of(since) if since is not None else last_day - (TIMELINE_DAYS - 1)
+    if last_day - first_day + 1 > TIMELINE_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"The date range may cover at most {TIMELINE_MAX_DAYS} days")
+
+    async def render():
+        # Served from pre-aggregated counts; tag and confidence filters fall back to a scan
+        aggregates = await repositories.indicators.aggregate(indicator_filters)
+
+        timeline_data = [
+            {"date": format_timestamp(day * DAY)[:10], "count": aggregates.timeline.get(day, 0)}
+            for day in range(first_day, last_day + 1)
+        ]
+
+        source_distribution = [
+            {"source": source, "count": count} for source, count in aggregates.by_source.most_common()
+        ]
+        type_distribution = [
+            {"type": type, "count": count} for type, count in aggregates.by_type.most_common()
+        ]
+
+        return {
+            "timelineData": timeline_data,
+            "sourceDistribution": source_distribution,
+            "typeDistribution": type_distribution
+        }, {}
+
+    key = (
+        "visualization", filters.type, filters.source, filters.confidence,
+        tuple(indicator_filters.tags or ()), since, until, first_day, last_day,
+    )
+    return await response_cache.respond(request, key, (await repositories.indicators.version(),),
+                                        _visualization_data, render)
@@ -0,0 +1,42 @@
+import json
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fastapi import Response
+
+from app.store import IndicatorRecord
+
+# "1" sends indicator results as JSON assembled from each record's cached bytes, skipping FastAPI's
+# response_model validation and jsonable_encoder. Indicators are validated when they are ingested and
+# are only ever rebuilt from storage, so revalidating them per response buys nothing.
+FAST_JSON = os.getenv("TIP_FAST_JSON", "0") == "1"
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+def dumps(content) -> bytes:
+    """Encode like FastAPI's JSONResponse, so both paths produce the same bytes."""
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def records_json(records: Iterable[IndicatorRecord]) -> bytes:
+    """A JSON array of indicators in the ThreatIndicator shape."""
+    return b"[" + b",".join(record.to_json() for record in records) + b"]"
+
+
+def lookup_json(received: int, matches: List[Tuple[str, List[IndicatorRecord]]]) -> bytes:
+    """A LookupResult body: `matches` pairs each observable with the indicators it matched."""
+    parts = [
+        b'{"value":' + dumps(value) + b',"indicators":' + records_json(records) + b"}"
+        for value, records in matches
+    ]
+    return b'{"received":%d,"matched":%d,"matches":[' % (received, len(matches)) + b",".join(parts) + b"]}"
+
+
+def record_lines(records: Iterable[IndicatorRecord]) -> Iterator[bytes]:
+    for record in records:
+        yield record.to_json() + b"\n"
+
+
+def json_response(body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+    return Response(body, media_type=JSON_MEDIA_TYPE, headers=headers)
@@ -0,0 +1,13 @@
+import os
+
+from app.store.graph import RelationGraph
+from app.store.indicators import IndicatorStore, parse_date_bound
+from app.store.records import IndicatorRecord, format_timestamp, parse_timestamp
+from app.store.segments import SegmentReader, SegmentStorage, SegmentWriter
+
+# Process-wide indicator store shared by the routers
+indicator_store = IndicatorStore(relation_graph=os.getenv("TIP_RELATION_GRAPH", "0") == "1")
+
+# Shared memory-mapped segments; opened in the application lifespan when TIP_SEGMENT_DIR is set
+SEGMENT_DIR = os.getenv("TIP_SEGMENT_DIR")
+segment_storage = SegmentStorage()
@@ -0,0 +1,86 @@
+from collections import Counter
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from app.store.records import IndicatorRecord
+
+DAY = 86400
+
+
+def day_of(timestamp: float) -> int:
+    return int(timestamp // DAY)
+
+
+def whole_days(since: Optional[float], until: Optional[float]) -> Optional[Tuple[Optional[int], Optional[int]]]:
+    """Day range covered exactly by [since, until], or None if a bound falls inside a day."""
+    first_day = last_day = None
+    if since is not None:
+        if since % DAY:
+            return None
+        first_day = day_of(since)
+    if until is not None:
+        last_day = day_of(until)
+        # Inclusive upper bounds end a hair before midnight
+        if (last_day + 1) * DAY - until > 1e-3:
+            return None
+    return first_day, last_day
+
+
+class Aggregates(NamedTuple):
+    timeline: Counter
+    by_source: Counter
+    by_type: Counter
+
+
+class AggregateCube:
+    """Indicator counts per (day, source, type) cell.
+
+    Kept up to date on every insert and removal, so dashboard queries that
+    filter on type, source and whole days cost O(cells) rather than
+    O(indicators).
+    """
+
+    def __init__(self):
+        self._cells: Counter = Counter()
+
+    def __len__(self):
+        return len(self._cells)
+
+    def add(self, record: IndicatorRecord):
+        self._cells[(day_of(record.timestamp), record.source, record.type)] += 1
+
+    def remove(self, record: IndicatorRecord):
+        cell = (day_of(record.timestamp), record.source, record.type)
+        self._cells[cell] -= 1
+        if self._cells[cell] <= 0:
+            del self._cells[cell]
+
+    def query(
+        self,
+        type: Optional[str] = None,
+        source: Optional[str] = None,
+        first_day: Optional[int] = None,
+        last_day: Optional[int] = None,
+    ) -> Aggregates:
+        result = Aggregates(Counter(), Counter(), Counter())
+        for (day, cell_source, cell_type), count in self._cells.items():
+            if type and cell_type != type:
+                continue
+            if source and cell_source != source:
+                continue
+            if first_day is not None and day < first_day:
+                continue
+            if last_day is not None and day > last_day:
+                continue
+            result.timeline[day] += count
+            result.by_source[cell_source] += count
+            result.by_type[cell_type] += count
+        return result
+
+
+def aggregate_records(records: Iterable[IndicatorRecord]) -> Aggregates:
+    result = Aggregates(Counter(), Counter(), Counter())
+    for record in records:
+        result.timeline[day_of(record.timestamp)] += 1
+        result.by_source[record.source] += 1
+        result.by_type[record.type] += 1
+    return result
@@ -0,0 +1,60 @@
+import hashlib
+import math
+from typing import Iterable, Tuple
+
+
+class BloomFilter:
+    """Set membership with no false negatives and about `error_rate` false positives.
+
+    Sized for `capacity` items; past that the false positive rate climbs, so
+    owners rebuild it larger (see `full`). Bit positions come from one
+    128-bit blake2b digest split into two halves and combined as
+    h1 + i * h2 (Kirsch-Mitzenmacher), so a probe hashes the value once.
+    Items cannot be removed.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.bits = max(64, int(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / self.capacity * math.log(2)))
+        self._array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+    def _hashes(self, value: str) -> Tuple[int, int]:
+        digest = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=16).digest(), "little")
+        return digest & 0xFFFFFFFFFFFFFFFF, (digest >> 64) | 1
+
+    def add(self, value: str):
+        # Only counted if it set a new bit, so re-adding a value does not use up capacity
+        h1, h2 = self._hashes(value)
+        array, bits = self._array, self.bits
+        added = False
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % bits
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not array[byte] & bit:
+                array[byte] |= bit
+                added = True
+        self.count += added
+
+    def update(self, values: Iterable[str]):
+        for value in values:
+            self.add(value)
+
+    def __contains__(self, value: str) -> bool:
+        # Most absent values fail on the first or second probe
+        h1, h2 = self._hashes(value)
+        array, bits = self._array, self.bits
+        for i in range(self.hashes):
+            position = (h1 + i * h2) % bits
+            if not array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
@@ -0,0 +1,93 @@
+import heapq
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Hashable, Iterable, List, Set, Tuple
+
+
+class RelationGraph:
+    """Precomputed shared-tag adjacency between indicators.
+
+    Each edge weight is the number of tags two indicators share. Edges are
+    added and removed incrementally as indicators come and go, at a cost
+    proportional to the size of the touched tag postings. A tag whose posting
+    reaches `max_fanout` members becomes a hub: its edges are taken back out
+    and later members are not linked through it, which keeps common tags from
+    turning the graph quadratic. Callers count hub tags from their postings
+    at query time, so results do not depend on insertion order.
+    """
+
+    def __init__(self, max_fanout: int = 1000):
+        self.max_fanout = max_fanout
+        self._adjacency: Dict[str, Counter] = defaultdict(Counter)
+        self._hubs: Set[str] = set()
+
+    def is_hub(self, tag: str) -> bool:
+        return tag in self._hubs
+
+    def add(self, item_id: str, tag_postings: Iterable[Tuple[str, Set[str]]]):
+        """Link `item_id` to the current members of its tags' postings (which must not yet include it)."""
+        neighbours = self._adjacency[item_id]
+        for tag, posting in tag_postings:
+            if tag in self._hubs:
+                continue
+            if len(posting) >= self.max_fanout:
+                self._unlink(posting)
+                self._hubs.add(tag)
+                continue
+            for other in posting:
+                neighbours[other] += 1
+                self._adjacency[other][item_id] += 1
+
+    def _unlink(self, members: Iterable[str]):
+        # Takes one shared tag out of every edge between `members`
+        members = list(members)
+        for item_id in members:
+            edges = self._adjacency[item_id]
+            for other in members:
+                weight = edges.get(other)
+                if weight is None:
+                    continue
+                if weight > 1:
+                    edges[other] = weight - 1
+                else:
+                    del edges[other]
+
+    def remove(self, item_id: str):
+        for other in self._adjacency.pop(item_id, ()):
+            edges = self._adjacency.get(other)
+            if edges is not None:
+                edges.pop(item_id, None)
+
+    def neighbours(self, item_id: str) -> Counter:
+        """Shared-tag counts over non-hub tags only."""
+        return self._adjacency.get(item_id, Counter())
+
+
+def expand_related(
+    item_id: str,
+    neighbours: Callable[[List[str]], Counter],
+    order_key: Callable[[str], Hashable],
+    limit: int,
+    depth: int,
+) -> List[str]:
+    """Ids up to `depth` hops from `item_id`, nearest hop first, then by shared-tag count.
+
+    `neighbours` maps a frontier to shared-tag counts summed over its members;
+    ties are broken by `order_key`.
+    """
+    seen = {item_id}
+    related: List[str] = []
+    frontier = [item_id]
+    for _ in range(depth):
+        scores = Counter()
+        for other, shared in neighbours(frontier).items():
+            if other not in seen:
+                scores[other] = shared
+        if not scores:
+            break
+        seen.update(scores)
+        # Only the best-ranked nodes of a hop are expanded further
+        frontier = heapq.nsmallest(limit - len(related), scores, key=lambda i: (-scores[i], order_key(i)))
+        related.extend(frontier)
+        if len(related) >= limit:
+            break
+    return related
@@ -0,0 +1,365 @@
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from app.store.aggregates import AggregateCube, Aggregates, aggregate_records, whole_days
+from app.store.graph import RelationGraph, expand_related
+from app.store.matching import DomainIndex, NetworkIndex, domain_labels, parse_prefix
+from app.store.ngram import NgramIndex
+from app.store.records import IndicatorRecord, parse_timestamp
+from app.store.sorted_index import SortedIndex
+
+_EMPTY: Set[str] = frozenset()
+# Candidate sets above 1/_SORT_FACTOR of the corpus are ordered by a scan rather than a sort
+_SORT_FACTOR = 16
+
+
+def parse_date_bound(value: str, end: bool = False) -> float:
+    # A bare date as the upper bound covers the whole day
+    timestamp = parse_timestamp(value)
+    if end and len(value) == 10:
+        timestamp += 86400 - 1e-6
+    return timestamp
+
+
+class IndicatorStore:
+    """In-memory indicator store with secondary indexes.
+
+    Equality filters (type, source, tags) are answered from hash posting sets,
+    confidence and timestamp from sorted indexes, and the free-text term from
+    a trigram index over value and description. A search intersects the
+    smallest candidate sets first and only evaluates the remaining predicates
+    against the survivors. Indicators are held as IndicatorRecord objects;
+    callers convert them with `to_dict()` at the API edge.
+
+    With `relation_graph` enabled, shared-tag adjacency is precomputed on
+    insert so related-indicator lookups only touch the postings of hub tags
+    (those too common to keep edges for).
+    Per-day/source/type counts are maintained the same way for aggregations.
+    IP indicators (addresses or CIDR blocks) sit in a prefix trie and Domain
+    indicators in a label trie, for matching observables they cover.
+    """
+
+    def __init__(self, relation_graph: bool = False, graph_fanout: int = 1000):
+        self._records: Dict[str, IndicatorRecord] = {}
+        self._seq: Dict[str, int] = {}
+        self._next_seq = 0
+        self._by_type: Dict[str, Set[str]] = defaultdict(set)
+        self._by_source: Dict[str, Set[str]] = defaultdict(set)
+        self._by_tag: Dict[str, Set[str]] = defaultdict(set)
+        # Several indicators may share a value; their ids are kept in insertion order
+        self._by_value: Dict[Tuple[str, str], Tuple[str, ...]] = {}
+        self._confidence = SortedIndex()
+        self._timestamp = SortedIndex()
+        self._text = NgramIndex()
+        self._order = SortedIndex()
+        self._graph = RelationGraph(graph_fanout) if relation_graph else None
+        self._cube = AggregateCube()
+        self._networks = NetworkIndex()
+        self._domains = DomainIndex()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, indicator_id: str):
+        return indicator_id in self._records
+
+    def __iter__(self) -> Iterator[IndicatorRecord]:
+        return iter(self._records.values())
+
+    def get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        return self._records.get(indicator_id)
+
+    def find(self, type: str, value: str) -> Optional[IndicatorRecord]:
+        """The newest indicator with this type and value."""
+        ids = self._by_value.get((type, value))
+        return None if ids is None else self._records[ids[-1]]
+
+    def lookup(self, values: Iterable[str]) -> Dict[str, List[IndicatorRecord]]:
+        """Indicators with exactly these values, of any type, from the (type, value) hash index.
+
+        One dict probe per type and value, so a miss costs a few hash lookups
+        whatever the size of the store. Each value's matches are in insertion order.
+        """
+        types = [type for type, posting in self._by_type.items() if posting]
+        by_value, records, seq = self._by_value, self._records, self._seq
+        found: Dict[str, List[IndicatorRecord]] = {}
+        for value in values:
+            matched: List[str] = []
+            for type in types:
+                matched.extend(by_value.get((type, value), ()))
+            if matched:
+                if len(matched) > 1:
+                    matched.sort(key=seq.__getitem__)
+                found[value] = [records[indicator_id] for indicator_id in matched]
+        return found
+
+    def covering(self, observables: Iterable[str]) -> Dict[str, List[IndicatorRecord]]:
+        """IP indicators whose block contains each address or block, and Domain indicators on each
+        name or one of its parents, broadest first; observables nothing covers are left out.
+
+        Each observable walks a trie once, so the cost grows with its length
+        (bits or labels), not with the number of indicators.
+        """
+        found: Dict[str, List[IndicatorRecord]] = {}
+        for observable in observables:
+            prefix = parse_prefix(observable)
+            if prefix is not None:
+                ids = self._networks.covering(prefix)
+            else:
+                labels = domain_labels(observable)
+                ids = self._domains.covering(labels) if labels is not None else ()
+            if ids:
+                found[observable] = [self._records[indicator_id] for indicator_id in ids]
+        return found
+
+    def add(self, indicator: Union[IndicatorRecord, dict]) -> IndicatorRecord:
+        record = IndicatorRecord.coerce(indicator)
+        if record.id in self._records:
+            self.remove(record.id)
+        self._index(record)
+        self._confidence.add(record.confidence, record.id)
+        self._timestamp.add(record.timestamp, record.id)
+        return record
+
+    def add_many(self, indicators: Iterable[Union[IndicatorRecord, dict]]):
+        # Sorted indexes are rebuilt once per batch instead of once per record. A repeated id
+        # replaces its earlier copy in the batch too, so only the last one reaches them.
+        pending: Dict[str, IndicatorRecord] = {}
+        for indicator in indicators:
+            record = IndicatorRecord.coerce(indicator)
+            if record.id in self._records:
+                self.remove(record.id)
+            pending.pop(record.id, None)
+            self._index(record)
+            pending[record.id] = record
+        self._confidence.bulk_load([(record.confidence, record.id) for record in pending.values()])
+        self._timestamp.bulk_load([(record.timestamp, record.id) for record in pending.values()])
+
+    def remove(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        record = self._records.pop(indicator_id, None)
+        if record is None:
+            return None
+        self._order.remove(self._seq.pop(indicator_id), indicator_id)
+        self._discard(self._by_type, record.type, indicator_id)
+        self._discard(self._by_source, record.source, indicator_id)
+        key = (record.type, record.value)
+        ids = tuple(i for i in self._by_value[key] if i != indicator_id)
+        if ids:
+            self._by_value[key] = ids
+        else:
+            del self._by_value[key]
+        for tag in record.tags:
+            self._discard(self._by_tag, tag, indicator_id)
+        self._text.remove(indicator_id)
+        self._cube.remove(record)
+        self._index_match(record, self._networks.remove, self._domains.remove)
+        if self._graph is not None:
+            self._graph.remove(indicator_id)
+        self._confidence.remove(record.confidence, indicator_id)
+        self._timestamp.remove(record.timestamp, indicator_id)
+        return record
+
+    @property
+    def version(self) -> str:
+        """Changes on every insert and removal: the next sequence number only grows, and removals shrink the count."""
+        return f"{self._next_seq}-{len(self._records)}"
+
+    def position(self, indicator_id: str) -> int:
+        """Insertion position of an indicator; search results are ordered by it."""
+        return self._seq[indicator_id]
+
+    def search(self, **filters) -> List[IndicatorRecord]:
+        return list(self.iter_search(**filters))
+
+    def iter_search(
+        self,
+        type: Optional[str] = None,
+        source: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        search_term: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        after: Optional[int] = None,
+    ) -> Iterator[IndicatorRecord]:
+        """Matching indicators in insertion order, starting past position `after`.
+
+        Candidate selection runs eagerly (an unfiltered scan walks the insertion order
+        a block at a time instead of copying it); only the final per-record checks are
+        lazy, so the returned iterator is safe to drain after the store has changed.
+        """
+        postings = []
+        if type:
+            postings.append(self._by_type.get(type, _EMPTY))
+        if source:
+            postings.append(self._by_source.get(source, _EMPTY))
+        if tags:
+            if len(tags) == 1:
+                postings.append(self._by_tag.get(tags[0], _EMPTY))
+            else:
+                postings.append(set().union(*(self._by_tag.get(tag, _EMPTY) for tag in tags)))
+        term = search_term.lower() if search_term else None
+        if term:
+            term_candidates = self._text.candidates(term)
+            if term_candidates is not None:
+                postings.append(term_candidates)
+
+        candidates: Optional[Set[str]] = None
+        for posting in sorted(postings, key=len):
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return iter(())
+
+        # Range filters narrow the candidates when the range is the more selective side,
+        # otherwise they are checked per survivor
+        ranges: List[Tuple[str, SortedIndex, Optional[float], Optional[float]]] = []
+        if min_confidence is not None:
+            ranges.append(("confidence", self._confidence, min_confidence, None))
+        if since is not None or until is not None:
+            ranges.append(("timestamp", self._timestamp, since, until))
+        residual = set()
+        for name, index, low, high in sorted(ranges, key=lambda r: r[1].count(r[2], r[3])):
+            if candidates is None or index.count(low, high) < len(candidates):
+                in_range = index.range(low, high)
+                candidates = set(in_range) if candidates is None else candidates.intersection(in_range)
+                if not candidates:
+                    return iter(())
+            else:
+                residual.add(name)
+
+        # Ids are taken from the indexes up front, or block by block for a full scan,
+        # so the store may change while results stream out
+        start = None if after is None else after + 1
+        if candidates is None:
+            ordered: Iterable[str] = self._order.scan(start)
+        elif len(candidates) * _SORT_FACTOR > len(self._records):
+            # Large candidate sets: a membership pass in insertion order beats sorting them
+            ordered = [i for i in self._order.range(start) if i in candidates]
+        else:
+            seq = self._seq
+            if start is not None:
+                candidates = {i for i in candidates if seq[i] >= start}
+            ordered = sorted(candidates, key=seq.__getitem__)
+
+        if not residual and not term:
+            # Records removed since the snapshot map to None and are dropped
+            return filter(None, map(self._records.get, ordered))
+        return self._filter_records(
+            ordered,
+            min_confidence if "confidence" in residual else None,
+            (since, until) if "timestamp" in residual else None,
+            term,
+        )
+
+    def _filter_records(
+        self,
+        ordered: Iterable[str],
+        min_confidence: Optional[float],
+        window: Optional[Tuple[Optional[float], Optional[float]]],
+        term: Optional[str],
+    ) -> Iterator[IndicatorRecord]:
+        records = self._records
+        low = float("-inf") if window is None or window[0] is None else window[0]
+        high = float("inf") if window is None or window[1] is None else window[1]
+        contains = self._text.contains
+        for indicator_id in ordered:
+            record = records.get(indicator_id)
+            if record is None:
+                continue
+            if min_confidence is not None and record.confidence < min_confidence:
+                continue
+            if window is not None and not low <= record.timestamp <= high:
+                continue
+            if term and not contains(indicator_id, term):
+                continue
+            yield record
+
+    def neighbours(self, indicator_id: str) -> Counter:
+        """Indicators sharing at least one tag with `indicator_id`, mapped to the number shared."""
+        record = self._records.get(indicator_id)
+        if record is None:
+            return Counter()
+        tags = set(record.tags)
+        if self._graph is not None:
+            # The graph holds edges for ordinary tags; hub tags are counted from their postings
+            tags = {tag for tag in tags if self._graph.is_hub(tag)}
+            if not tags:
+                return self._graph.neighbours(indicator_id)
+            counts = Counter(self._graph.neighbours(indicator_id))
+        else:
+            counts = Counter()
+        for tag in tags:
+            counts.update(self._by_tag.get(tag, _EMPTY))
+        del counts[indicator_id]
+        return counts
+
+    def related(self, indicator_id: str, limit: int = 50, depth: int = 1) -> List[IndicatorRecord]:
+        """Indicators up to `depth` hops away, nearest hop first, then by shared-tag count."""
+        def neighbours(frontier: List[str]) -> Counter:
+            if len(frontier) == 1:
+                return self.neighbours(frontier[0])
+            counts = Counter()
+            for node in frontier:
+                counts.update(self.neighbours(node))
+            return counts
+
+        related = expand_related(indicator_id, neighbours, self._seq.__getitem__, limit, depth)
+        return [self._records[i] for i in related]
+
+    def aggregate(
+        self,
+        type: Optional[str] = None,
+        source: Optional[str] = None,
+        min_confidence: Optional[float] = None,
+        tags: Optional[List[str]] = None,
+        search_term: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Aggregates:
+        """Counts per day, source and type of the matching indicators."""
+        days = whole_days(since, until)
+        if days is not None and min_confidence is None and not tags and not search_term:
+            return self._cube.query(type=type, source=source, first_day=days[0], last_day=days[1])
+        # Ad-hoc filters the cube has no dimension for fall back to the indexed search
+        return aggregate_records(self.iter_search(
+            type=type, source=source, min_confidence=min_confidence, tags=tags, search_term=search_term,
+            since=since, until=until,
+        ))
+
+    def _index(self, record: IndicatorRecord):
+        indicator_id = record.id
+        self._records[indicator_id] = record
+        self._seq[indicator_id] = self._next_seq
+        self._order.add(self._next_seq, indicator_id)
+        self._next_seq += 1
+        self._by_type[record.type].add(indicator_id)
+        self._by_source[record.source].add(indicator_id)
+        key = (record.type, record.value)
+        self._by_value[key] = self._by_value.get(key, ()) + (indicator_id,)
+        if self._graph is not None:
+            self._graph.add(indicator_id, [(tag, self._by_tag.get(tag, _EMPTY)) for tag in set(record.tags)])
+        for tag in record.tags:
+            self._by_tag[tag].add(indicator_id)
+        self._text.add(indicator_id, (record.value, record.description))
+        self._cube.add(record)
+        self._index_match(record, self._networks.add, self._domains.add)
+
+    @staticmethod
+    def _index_match(record: IndicatorRecord, networks, domains):
+        if record.type == "IP":
+            prefix = parse_prefix(record.value)
+            if prefix is not None:
+                networks(prefix, record.id)
+        elif record.type == "Domain":
+            labels = domain_labels(record.value)
+            if labels is not None:
+                domains(labels, record.id)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, indicator_id: str):
+        posting = index.get(key)
+        if posting is None:
+            return
+        posting.discard(indicator_id)
+        if not posting:
+            del index[key]
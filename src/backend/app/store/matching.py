@@ -0,0 +1,270 @@
+import ipaddress
+import socket
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from app.store.records import IndicatorRecord
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+# (address family width, network address as an int with host bits clear, prefix length)
+Prefix = Tuple[int, int, int]
+
+_NO_IDS: Tuple[str, ...] = ()
+
+
+def parse_network(value: str) -> Optional[Network]:
+    """An address or CIDR block as a network (a bare address is a /32 or /128); None if it is neither."""
+    try:
+        return ipaddress.ip_network(value.strip(), strict=False)
+    except ValueError:
+        return None
+
+
+def parse_prefix(value: str) -> Optional[Prefix]:
+    """Like parse_network, but through inet_pton: several times faster, for indexing every IP indicator."""
+    address, slash, length = value.strip().partition("/")
+    for family, width in ((socket.AF_INET, 32), (socket.AF_INET6, 128)):
+        try:
+            key = int.from_bytes(socket.inet_pton(family, address), "big")
+        except OSError:
+            continue
+        if not slash:
+            return width, key, width
+        if not length.isdigit() or int(length) > width:
+            return None
+        length = int(length)
+        return width, key >> (width - length) << (width - length), length
+    return None
+
+
+def domain_labels(value: str) -> Optional[List[str]]:
+    """Labels of a domain name from the top level down, e.g. ["com", "example", "www"].
+
+    Case and a trailing dot are ignored, and a leading "*." wildcard means
+    the domain itself. None for addresses, URLs, emails and empty labels.
+    """
+    name = value.strip().lower().rstrip(".")
+    if name.startswith("*."):
+        name = name[2:]
+    if not name or any(c in name for c in "/:@ "):
+        return None
+    labels = name.split(".")
+    # Dotted quads are addresses, not names
+    if not all(labels) or all(label.isdigit() for label in labels):
+        return None
+    labels.reverse()
+    return labels
+
+
+class _Node:
+    __slots__ = ("key", "length", "children", "ids")
+
+    def __init__(self, key: int, length: int, ids: Tuple[str, ...] = _NO_IDS):
+        self.key = key
+        self.length = length
+        self.children: List[Optional["_Node"]] = [None, None]
+        # A tuple rather than a set: nearly every prefix carries a single indicator
+        self.ids = ids
+
+
+class PrefixTrie:
+    """Path-compressed binary (Patricia) trie of network prefixes of one address width.
+
+    A node holds a prefix as (key, length), key being the network address
+    with host bits clear; children extend it by at least one bit, and chains
+    of single-child nodes are collapsed, so an insert adds at most two nodes.
+    Finding every prefix that contains an address visits at most one node
+    per bit of the address.
+    """
+
+    def __init__(self, width: int):
+        self.width = width
+        self._root = _Node(0, 0)
+
+    def _bit(self, key: int, position: int) -> int:
+        return (key >> (self.width - 1 - position)) & 1
+
+    def _common(self, a: int, b: int, limit: int) -> int:
+        """Length of the common leading bits of `a` and `b`, at most `limit`."""
+        return min(limit, self.width - (a ^ b).bit_length())
+
+    def add(self, key: int, length: int, item_id: str):
+        node = self._root
+        while True:
+            if node.length == length:
+                if item_id not in node.ids:
+                    node.ids += (item_id,)
+                return
+            bit = self._bit(key, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(key, length, (item_id,))
+                return
+            common = self._common(child.key, key, min(child.length, length))
+            if common == child.length:
+                node = child
+                continue
+            # The new prefix branches off (or ends) inside the child's edge: split it
+            middle = _Node(key >> (self.width - common) << (self.width - common), common)
+            middle.children[self._bit(child.key, common)] = child
+            if common == length:
+                middle.ids = (item_id,)
+            else:
+                middle.children[self._bit(key, common)] = _Node(key, length, (item_id,))
+            node.children[bit] = middle
+            return
+
+    def remove(self, key: int, length: int, item_id: str):
+        path = [self._root]
+        node = self._root
+        while node.length < length:
+            node = node.children[self._bit(key, node.length)]
+            if node is None or node.length > length or self._common(node.key, key, node.length) < node.length:
+                return
+            path.append(node)
+        if node.length != length or item_id not in node.ids:
+            return
+        node.ids = tuple(i for i in node.ids if i != item_id)
+        # Drop nodes left with no ids and fewer than two children, keeping the trie compressed
+        while len(path) > 1 and not node.ids:
+            parent = path[-2]
+            children = [c for c in node.children if c is not None]
+            if len(children) == 2:
+                break
+            slot = parent.children.index(node)
+            parent.children[slot] = children[0] if children else None
+            path.pop()
+            node = parent
+
+    def covering(self, key: int, length: int) -> List[str]:
+        """Ids on every prefix that contains the `length`-bit prefix `key` (itself included)."""
+        node = self._root
+        found = list(node.ids)
+        while node.length < length:
+            node = node.children[self._bit(key, node.length)]
+            if node is None or node.length > length or self._common(node.key, key, node.length) < node.length:
+                break
+            found.extend(node.ids)
+        return found
+
+
+class NetworkIndex:
+    """IPv4 and IPv6 prefixes in one Patricia trie per address family."""
+
+    def __init__(self):
+        self._tries: Dict[int, PrefixTrie] = {32: PrefixTrie(32), 128: PrefixTrie(128)}
+
+    def add(self, prefix: Prefix, item_id: str):
+        width, key, length = prefix
+        self._tries[width].add(key, length, item_id)
+
+    def remove(self, prefix: Prefix, item_id: str):
+        width, key, length = prefix
+        self._tries[width].remove(key, length, item_id)
+
+    def covering(self, prefix: Prefix) -> List[str]:
+        """Ids of every stored prefix containing `prefix`."""
+        width, key, length = prefix
+        return self._tries[width].covering(key, length)
+
+
+class _LabelNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_LabelNode"] = {}
+        self.ids: Tuple[str, ...] = _NO_IDS
+
+
+class DomainIndex:
+    """Domain names in a trie keyed by label from the top level down.
+
+    The parents of a.b.example.com lie on the path com -> example -> b -> a,
+    so finding every indicator on the name or one of its parents costs one
+    dict probe per label.
+    """
+
+    def __init__(self):
+        self._root = _LabelNode()
+
+    def add(self, labels: List[str], item_id: str):
+        node = self._root
+        for label in labels:
+            child = node.children.get(label)
+            if child is None:
+                child = node.children[label] = _LabelNode()
+            node = child
+        if item_id not in node.ids:
+            node.ids += (item_id,)
+
+    def remove(self, labels: List[str], item_id: str):
+        path = [self._root]
+        for label in labels:
+            node = path[-1].children.get(label)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].ids = tuple(i for i in path[-1].ids if i != item_id)
+        # Prune the labels left with neither ids nor children, bottom up
+        for depth in range(len(labels), 0, -1):
+            if path[depth].ids or path[depth].children:
+                break
+            del path[depth - 1].children[labels[depth - 1]]
+
+    def covering(self, labels: List[str]) -> List[str]:
+        """Ids on the name itself and on each of its parent domains."""
+        found = []
+        node = self._root
+        for label in labels:
+            node = node.children.get(label)
+            if node is None:
+                break
+            found.extend(node.ids)
+        return found
+
+
+def covering_values(observable: str) -> Optional[Tuple[str, List[str]]]:
+    """Indicator type and the canonical values of every indicator that would cover `observable`.
+
+    For an address that is each enclosing CIDR block (plus the bare address),
+    for a domain the name and each parent domain, broadest first: O(key
+    length) exact values, for backends that can only look values up.
+    """
+    network = parse_network(observable)
+    if network is not None:
+        values = [str(network.supernet(new_prefix=length)) for length in range(network.prefixlen + 1)]
+        if network.prefixlen == network.max_prefixlen:
+            values.append(str(network.network_address))
+        return "IP", values
+    labels = domain_labels(observable)
+    if labels is not None:
+        return "Domain", [".".join(reversed(labels[:depth])) for depth in range(1, len(labels) + 1)]
+    return None
+
+
+def covering_keys(observables: Iterable[str]) -> Dict[Tuple[str, str], List[Tuple[str, int]]]:
+    """(type, value) of every indicator that would cover one of `observables`.
+
+    Each key maps to the observables it covers and its rank among their
+    covering values (0 is the broadest).
+    """
+    keys: Dict[Tuple[str, str], List[Tuple[str, int]]] = {}
+    for observable in observables:
+        expanded = covering_values(observable)
+        if expanded is None:
+            continue
+        type, values = expanded
+        for rank, value in enumerate(values):
+            keys.setdefault((type, value), []).append((observable, rank))
+    return keys
+
+
+def group_covering(
+    keys: Dict[Tuple[str, str], List[Tuple[str, int]]], records: Iterable[IndicatorRecord]
+) -> Dict[str, List[IndicatorRecord]]:
+    """Match `records` (in insertion order) back to the observables they cover, broadest first."""
+    ranked: Dict[str, List[Tuple[int, int, IndicatorRecord]]] = {}
+    for position, record in enumerate(records):
+        for observable, rank in keys.get((record.type, record.value), ()):
+            ranked.setdefault(observable, []).append((rank, position, record))
+    return {observable: [record for _, _, record in sorted(matches, key=lambda m: m[:2])]
+            for observable, matches in ranked.items()}
@@ -0,0 +1,64 @@
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+# Separates indexed fields so no n-gram spans two of them
+_FIELD_SEPARATOR = "\x00"
+
+
+class NgramIndex:
+    """Inverted n-gram index for case-insensitive substring search.
+
+    Each item's searchable fields are lowercased once on insert. A query
+    intersects the posting sets of its n-grams, smallest first; survivors are
+    confirmed with a plain substring test against the stored text, so results
+    are exact.
+    """
+
+    def __init__(self, n: int = 3):
+        self._n = n
+        self._postings: Dict[str, Set[str]] = defaultdict(set)
+        self._texts: Dict[str, str] = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def _grams(self, text: str) -> Set[str]:
+        n = self._n
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def add(self, item_id: str, fields: Iterable[Optional[str]]):
+        if item_id in self._texts:
+            self.remove(item_id)
+        text = _FIELD_SEPARATOR.join(field.lower() for field in fields if field)
+        self._texts[item_id] = text
+        for gram in self._grams(text):
+            self._postings[gram].add(item_id)
+
+    def remove(self, item_id: str):
+        text = self._texts.pop(item_id, None)
+        if text is None:
+            return
+        for gram in self._grams(text):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(item_id)
+            if not posting:
+                del self._postings[gram]
+
+    def candidates(self, term: str) -> Optional[Set[str]]:
+        """Ids that contain every n-gram of `term`, or None if `term` is too short to use the index."""
+        grams = self._grams(term.lower())
+        if not grams:
+            return None
+        postings = sorted((self._postings.get(gram, ()) for gram in grams), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result.intersection_update(posting)
+        return result
+
+    def contains(self, item_id: str, term: str) -> bool:
+        # `term` must already be lowercased
+        return term in self._texts.get(item_id, "")
@@ -0,0 +1,93 @@
+import json
+import sys
+from datetime import datetime, timezone
+from typing import Optional, Tuple, Union
+
+
+def parse_timestamp(value: str) -> float:
+    # Naive timestamps are treated as UTC so stored values and query bounds compare consistently
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def format_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+class IndicatorRecord:
+    """Compact internal form of a threat indicator.
+
+    Slots instead of a per-instance dict, interned type/source/tag strings
+    (a handful of distinct values shared by millions of records), an epoch
+    float in place of the ISO timestamp string and a tuple for tags. Records
+    are converted back to the API shape only when a response is built.
+
+    Records are not modified once stored, so `to_json` encodes each one at
+    most once and keeps the bytes; a changed indicator is a new record.
+    """
+
+    __slots__ = ("id", "type", "value", "source", "confidence", "timestamp", "tags", "description", "_json")
+
+    def __init__(
+        self,
+        id: str,
+        type: str,
+        value: str,
+        source: str,
+        confidence: float,
+        timestamp: float,
+        tags: Tuple[str, ...],
+        description: Optional[str] = None,
+    ):
+        self.id = id
+        self.type = sys.intern(type)
+        self.value = value
+        self.source = sys.intern(source)
+        self.confidence = float(confidence)
+        self.timestamp = timestamp
+        self.tags = tuple(sys.intern(tag) for tag in tags)
+        self.description = description
+        self._json: Optional[bytes] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "IndicatorRecord":
+        timestamp = data["timestamp"]
+        return cls(
+            data["id"],
+            data["type"],
+            data["value"],
+            data["source"],
+            data["confidence"],
+            parse_timestamp(timestamp) if isinstance(timestamp, str) else timestamp,
+            data["tags"],
+            data.get("description"),
+        )
+
+    @classmethod
+    def coerce(cls, indicator: Union["IndicatorRecord", dict]) -> "IndicatorRecord":
+        return indicator if isinstance(indicator, cls) else cls.from_dict(indicator)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "type": self.type,
+            "value": self.value,
+            "source": self.source,
+            "confidence": self.confidence,
+            "timestamp": format_timestamp(self.timestamp),
+            "tags": list(self.tags),
+            "description": self.description,
+        }
+
+    def to_json(self) -> bytes:
+        """`to_dict()` as compact UTF-8 JSON, byte for byte what FastAPI's JSONResponse would send."""
+        if self._json is None:
+            self._json = json.dumps(
+                self.to_dict(), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            ).encode()
+        return self._json
+
+    def __repr__(self):
+        return f"IndicatorRecord(id={self.id!r}, type={self.type!r}, value={self.value!r})"
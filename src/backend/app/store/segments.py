@@ -0,0 +1,456 @@
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from app.store.records import IndicatorRecord
+
+# Segment layout (all integers little-endian):
+#   header   magic(8) | format version u32 | record count u32 | index offset u64
+#   records  length u32 | sequence u64 | compact JSON payload, one per record
+#   index    (id hash u64, record offset u64) pairs sorted by hash
+# A payload with only "id" and "deleted" is a tombstone. An id appears at most once per segment.
+# The manifest lists the live segments oldest first with the sequence number each was published
+# under; a compacted segment takes the highest sequence number of the segments it replaced.
+# A record's sequence is 0 in an appended segment (it was published under the segment's own
+# number); a compacted segment keeps the number each record was first published under, so a
+# worker behind the compaction applies only the records newer than what it has seen.
+# Version 1 segments have no per-record sequence and are still read.
+MAGIC = b"TIPSEG01"
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<8sIIQ")
+_LENGTH = struct.Struct("<I")
+_RECORD = struct.Struct("<IQ")
+_ENTRY = struct.Struct("<QQ")
+MANIFEST = "MANIFEST.json"
+WRITER_LOCK = "WRITER.lock"
+COMPACTOR_LOCK = "COMPACTOR.lock"
+
+
+def _id_hash(indicator_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(indicator_id.encode(), digest_size=8).digest(), "little")
+
+
+def _encode(record: IndicatorRecord) -> bytes:
+    return json.dumps([
+        record.id, record.type, record.value, record.source,
+        record.confidence, record.timestamp, list(record.tags), record.description,
+    ], separators=(",", ":")).encode()
+
+
+def _tombstone(indicator_id: str) -> bytes:
+    return json.dumps({"id": indicator_id, "deleted": True}, separators=(",", ":")).encode()
+
+
+def write_segment(path: str, records: Iterable[IndicatorRecord], deleted: Iterable[str] = ()):
+    """Write a segment to `path` atomically (via a temporary file and rename).
+
+    An id repeated in `records` keeps its last copy, at the last copy's place
+    (as IndicatorStore.add_many orders it), and an id in `deleted` is written
+    as a tombstone only.
+    """
+    deleted = list(dict.fromkeys(deleted))
+    tombstoned = set(deleted)
+    latest: Dict[str, IndicatorRecord] = {}
+    for record in records:
+        if record.id not in tombstoned:
+            latest.pop(record.id, None)
+            latest[record.id] = record
+    _write_entries(path, [(r.id, r, 0) for r in latest.values()] + [(i, None, 0) for i in deleted])
+
+
+def _write_entries(path: str, entries: Iterable[Tuple[str, Optional[IndicatorRecord], int]]):
+    # `entries` are (id, record or None for a tombstone, sequence) with distinct ids
+    index: List[Tuple[int, int]] = []
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        for indicator_id, record, sequence in entries:
+            payload = _tombstone(indicator_id) if record is None else _encode(record)
+            index.append((_id_hash(indicator_id), f.tell()))
+            f.write(_RECORD.pack(len(payload), sequence))
+            f.write(payload)
+        index_offset = f.tell()
+        index.sort()
+        for entry in index:
+            f.write(_ENTRY.pack(*entry))
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(index), index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Segment:
+    """A read-only memory-mapped segment.
+
+    Lookups binary-search the on-disk hash index directly in the mapping; only
+    the matching payload is decoded, so a mapped segment costs page cache, not
+    per-worker heap.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, self._index_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version not in (1, FORMAT_VERSION):
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} indicator segment")
+        self._sequenced = version >= 2
+
+    def close(self):
+        self._map.close()
+
+    def _record(self, offset: int) -> Tuple[int, int, int]:
+        """(payload start, payload length, sequence) of the record at `offset`."""
+        if self._sequenced:
+            length, sequence = _RECORD.unpack_from(self._map, offset)
+            return offset + _RECORD.size, length, sequence
+        (length,) = _LENGTH.unpack_from(self._map, offset)
+        return offset + _LENGTH.size, length, 0
+
+    def _payload(self, offset: int) -> bytes:
+        start, length, _ = self._record(offset)
+        return self._map[start:start + length]
+
+    def _entry(self, position: int) -> Tuple[int, int]:
+        return _ENTRY.unpack_from(self._map, self._index_offset + position * _ENTRY.size)
+
+    def lookup(self, indicator_id: str) -> Tuple[bool, Optional[IndicatorRecord]]:
+        """(found, record); a tombstone is found with record None."""
+        target = _id_hash(indicator_id)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Walk the run of equal hashes; collisions are resolved by the stored id. Entries with
+        # equal hashes are in write order, so the last match is the newest copy (segments
+        # written before ids were deduplicated may hold several).
+        found: Tuple[bool, Optional[IndicatorRecord]] = (False, None)
+        while lo < self.count:
+            id_hash, offset = self._entry(lo)
+            if id_hash != target:
+                break
+            fields = json.loads(self._payload(offset))
+            stored_id = fields["id"] if isinstance(fields, dict) else fields[0]
+            if stored_id == indicator_id:
+                found = (True, None if isinstance(fields, dict) else IndicatorRecord(*fields))
+            lo += 1
+        return found
+
+    def _decode(self, offset: int) -> Tuple[str, Optional[IndicatorRecord]]:
+        fields = json.loads(self._payload(offset))
+        if isinstance(fields, dict):
+            return fields["id"], None
+        return fields[0], IndicatorRecord(*fields)
+
+    def _shadowed(self) -> Set[int]:
+        """Offsets of entries a later copy of the same id overrides.
+
+        Copies of an id share a hash, so only runs of equal hashes in the index
+        are decoded; segments written since ids are deduplicated have none.
+        """
+        shadowed: Set[int] = set()
+        index = self._map[self._index_offset:self._index_offset + self.count * _ENTRY.size]
+        run: List[int] = []
+        previous = None
+        for id_hash, offset in _ENTRY.iter_unpack(index):
+            if id_hash != previous:
+                if len(run) > 1:
+                    shadowed.update(self._shadowed_in(run))
+                run = []
+                previous = id_hash
+            run.append(offset)
+        if len(run) > 1:
+            shadowed.update(self._shadowed_in(run))
+        return shadowed
+
+    def _shadowed_in(self, offsets: List[int]) -> Iterator[int]:
+        # `offsets` share a hash and are in write order
+        newest: Dict[str, int] = {}
+        for offset in offsets:
+            indicator_id = self._decode(offset)[0]
+            if indicator_id in newest:
+                yield newest[indicator_id]
+            newest[indicator_id] = offset
+
+    def entries(self, after: int = 0) -> Iterator[Tuple[int, str, Optional[IndicatorRecord]]]:
+        """(sequence, id, record or None for tombstones) in write order, newest copy of each id only.
+
+        The sequence is 0 for records published under the segment's own number.
+        Records with a sequence up to `after` are skipped without being decoded.
+        """
+        shadowed = self._shadowed()
+        offset = _HEADER.size
+        while offset < self._index_offset:
+            start, length, sequence = self._record(offset)
+            if offset not in shadowed and not 0 < sequence <= after:
+                yield (sequence, *self._decode(offset))
+            offset = start + length
+
+    def __iter__(self) -> Iterator[Tuple[str, Optional[IndicatorRecord]]]:
+        """(id, record or None for tombstones) in write order, newest copy of each id only."""
+        return ((indicator_id, record) for _, indicator_id, record in self.entries())
+
+    def read(self, after: int = 0) -> Tuple[List[IndicatorRecord], List[str]]:
+        """Every record and every tombstoned id published after sequence `after`."""
+        records, deleted = [], []
+        for _, indicator_id, record in self.entries(after):
+            if record is None:
+                deleted.append(indicator_id)
+            else:
+                records.append(record)
+        return records, deleted
+
+
+def _read_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"generation": 0, "segments": [], "sequences": []}
+
+
+def _sequences(manifest: dict) -> List[int]:
+    return manifest.get("sequences") or list(range(1, len(manifest["segments"]) + 1))
+
+
+def _latest(segments: List[Segment], sequences: List[int]) -> Iterator[Tuple[str, Optional[IndicatorRecord], int]]:
+    """The newest version of every id across `segments`, tombstones included, in write order,
+    with the sequence number it was published under (`sequences` are the segments' own)."""
+    # First pass: the newest segment holding each id; second pass: yield each id from that one
+    newest: Dict[str, int] = {}
+    for position in range(len(segments) - 1, -1, -1):
+        for indicator_id, _ in segments[position]:
+            newest.setdefault(indicator_id, position)
+    for position, segment in enumerate(segments):
+        for sequence, indicator_id, record in segment.entries():
+            if newest[indicator_id] == position:
+                yield indicator_id, record, sequence or sequences[position]
+
+
+def _live_records(segments: List[Segment], sequences: List[int]) -> Iterator[IndicatorRecord]:
+    """Records across `segments`; the newest version wins and tombstoned ids are skipped."""
+    return (record for _, record, _ in _latest(segments, sequences) if record is not None)
+
+
+class SegmentReader:
+    """Read-only view over the segments listed in a directory's manifest.
+
+    Any number of worker processes can hold a reader on the same directory.
+    The manifest is re-checked at most every `refresh_interval` seconds, and
+    newer segments shadow older ones.
+    """
+
+    def __init__(self, directory: str, refresh_interval: float = 1.0):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self.generation = -1
+        self._segments: List[Segment] = []
+        self._sequences: List[int] = []
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_interval:
+            return
+        with self._lock:
+            self._checked = now
+            for _ in range(3):
+                manifest = _read_manifest(self.directory)
+                if manifest["generation"] == self.generation:
+                    return
+                current: Dict[str, Segment] = {s.path: s for s in self._segments}
+                try:
+                    segments = [
+                        current.get(path) or Segment(path)
+                        for path in (os.path.join(self.directory, name) for name in manifest["segments"])
+                    ]
+                except FileNotFoundError:
+                    # A compaction replaced the manifest between reading it and mapping its files
+                    continue
+                # Segments dropped by a compaction stay valid for lookups already in flight;
+                # the mapping is released when the last reference goes away
+                self._segments = segments
+                self._sequences = _sequences(manifest)
+                self.generation = manifest["generation"]
+                return
+
+    def since(self, sequence: int, force: bool = False) -> List[Tuple[int, Segment]]:
+        """(sequence, segment) for the segments published after `sequence`, oldest first."""
+        self.refresh(force)
+        with self._lock:
+            return [(n, s) for n, s in zip(self._sequences, self._segments) if n > sequence]
+
+    def __len__(self):
+        return sum(s.count for s in self._segments)
+
+    def get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        self.refresh()
+        for segment in reversed(self._segments):
+            found, record = segment.lookup(indicator_id)
+            if found:
+                return record
+        return None
+
+    def __iter__(self) -> Iterator[IndicatorRecord]:
+        self.refresh()
+        with self._lock:
+            segments, sequences = list(self._segments), list(self._sequences)
+        return _live_records(segments, sequences)
+
+
+class SegmentWriter:
+    """Appends segments to a directory shared by several worker processes.
+
+    Each append writes a new segment and publishes it by atomically replacing
+    the manifest, under an exclusive lock file so concurrent writers in other
+    processes serialize. `compact` folds the current segments into one,
+    dropping shadowed versions; each surviving record keeps the sequence it
+    was published under, and tombstones are kept so that workers which have
+    not caught up yet still apply the deletions. The merge runs outside the
+    lock and only the manifest swap holds it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self._thread_lock, open(os.path.join(self.directory, WRITER_LOCK), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _publish(self, segments: List[str], sequences: List[int], generation: int):
+        path = os.path.join(self.directory, MANIFEST)
+        with open(path + ".tmp", "w") as f:
+            json.dump({"generation": generation, "segments": segments, "sequences": sequences}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def _new_segment_name(self) -> str:
+        return f"seg-{time.time_ns():020d}-{os.getpid()}.tip"
+
+    def append(self, records: Iterable[IndicatorRecord], deleted: Iterable[str] = ()) -> Tuple[str, int]:
+        """Write and publish one segment; returns its file name and sequence number."""
+        name = self._new_segment_name()
+        write_segment(os.path.join(self.directory, name), records, deleted)
+        with self._locked():
+            manifest = _read_manifest(self.directory)
+            # Generations only grow, so the new one also orders the segment after every other
+            sequence = manifest["generation"] + 1
+            self._publish(manifest["segments"] + [name], _sequences(manifest) + [sequence], sequence)
+        return name, sequence
+
+    def compact(self) -> bool:
+        snapshot = _read_manifest(self.directory)
+        if len(snapshot["segments"]) < 2:
+            return False
+        name = self._new_segment_name()
+        segments = [Segment(os.path.join(self.directory, n)) for n in snapshot["segments"]]
+        _write_entries(os.path.join(self.directory, name), _latest(segments, _sequences(snapshot)))
+        with self._locked():
+            manifest = _read_manifest(self.directory)
+            # Segments appended while the merge ran stay on top of the compacted one
+            newer = [(n, s) for n, s in zip(manifest["segments"], _sequences(manifest)) if n not in snapshot["segments"]]
+            self._publish(
+                [name] + [n for n, _ in newer],
+                [max(_sequences(snapshot))] + [s for _, s in newer],
+                manifest["generation"] + 1,
+            )
+        # Readers that still map the old files keep them alive until they refresh
+        for old in snapshot["segments"]:
+            os.remove(os.path.join(self.directory, old))
+        return True
+
+
+class SegmentCompactor:
+    """Background compaction, run by exactly one process per directory.
+
+    The process that wins the compactor lock file keeps it for its lifetime;
+    every other process gets None from `try_start`.
+    """
+
+    def __init__(self, writer: SegmentWriter, lock_file, interval: float, min_segments: int):
+        self.writer = writer
+        self.interval = interval
+        self.min_segments = min_segments
+        self._lock_file = lock_file
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="segment-compactor", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def try_start(cls, writer: SegmentWriter, interval: float = 60.0, min_segments: int = 4) -> Optional["SegmentCompactor"]:
+        lock_file = open(os.path.join(writer.directory, COMPACTOR_LOCK), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return None
+        return cls(writer, lock_file, interval, min_segments)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if len(_read_manifest(self.writer.directory)["segments"]) >= self.min_segments:
+                self.writer.compact()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._lock_file.close()
+
+
+class SegmentStorage:
+    """Per-process handle on the shared segment directory, if one is configured."""
+
+    def __init__(self):
+        self.reader: Optional[SegmentReader] = None
+        self.writer: Optional[SegmentWriter] = None
+        self.compactor: Optional[SegmentCompactor] = None
+
+    def open(self, directory: str, compaction_interval: float = 60.0):
+        self.writer = SegmentWriter(directory)
+        self.reader = SegmentReader(directory)
+        self.compactor = SegmentCompactor.try_start(self.writer, interval=compaction_interval)
+
+    def close(self):
+        if self.compactor is not None:
+            self.compactor.stop()
+        self.reader = self.writer = self.compactor = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.writer is not None
+
+    def get(self, indicator_id: str) -> Optional[IndicatorRecord]:
+        return self.reader.get(indicator_id) if self.reader is not None else None
+
+    def since(self, sequence: int, force: bool = False) -> List[Tuple[int, Segment]]:
+        return self.reader.since(sequence, force) if self.reader is not None else []
+
+    def append(self, records: Iterable[IndicatorRecord], deleted: Iterable[str] = ()) -> Optional[Tuple[str, int]]:
+        """Publish a segment (blocking: it is written and fsynced); None if nothing was written."""
+        if self.writer is None:
+            return None
+        records, deleted = list(records), list(deleted)
+        if not records and not deleted:
+            return None
+        return self.writer.append(records, deleted)
@@ -0,0 +1,74 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+
+class SortedIndex:
+    """Numeric key -> id index kept in two parallel sorted lists.
+
+    Range lookups cost O(log N + k). Inserting in key order (e.g. monotonic
+    timestamps or sequence numbers) is an append; anything else pays a memmove.
+    """
+
+    def __init__(self):
+        self._keys: List[float] = []
+        self._ids: List[str] = []
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key: float, item_id: str):
+        if not self._keys or key >= self._keys[-1]:
+            self._keys.append(key)
+            self._ids.append(item_id)
+            return
+        pos = bisect_right(self._keys, key)
+        self._keys.insert(pos, key)
+        self._ids.insert(pos, item_id)
+
+    def bulk_load(self, pairs: List[Tuple[float, str]]):
+        pairs = sorted(list(zip(self._keys, self._ids)) + list(pairs))
+        self._keys = [k for k, _ in pairs]
+        self._ids = [i for _, i in pairs]
+
+    def remove(self, key: float, item_id: str):
+        lo = bisect_left(self._keys, key)
+        hi = bisect_right(self._keys, key, lo)
+        for pos in range(lo, hi):
+            if self._ids[pos] == item_id:
+                del self._keys[pos]
+                del self._ids[pos]
+                return
+
+    def _bounds(self, low: Optional[float], high: Optional[float]) -> Tuple[int, int]:
+        lo = 0 if low is None else bisect_left(self._keys, low)
+        hi = len(self._keys) if high is None else bisect_right(self._keys, high)
+        return lo, max(lo, hi)
+
+    def count(self, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        lo, hi = self._bounds(low, high)
+        return hi - lo
+
+    def range(self, low: Optional[float] = None, high: Optional[float] = None) -> List[str]:
+        lo, hi = self._bounds(low, high)
+        return self._ids[lo:hi]
+
+    def iter_range(self, low: Optional[float] = None, high: Optional[float] = None) -> Iterator[str]:
+        lo, hi = self._bounds(low, high)
+        ids = self._ids
+        for pos in range(lo, hi):
+            yield ids[pos]
+
+    def scan(self, low: Optional[float] = None, block: int = 4096) -> Iterator[str]:
+        """Ids from `low` upwards, copied out a block at a time.
+
+        Each block is located by key, so the index may change between blocks;
+        only valid for indexes whose keys are unique.
+        """
+        lo = 0 if low is None else bisect_left(self._keys, low)
+        while True:
+            ids = self._ids[lo:lo + block]
+            if not ids:
+                return
+            last = self._keys[lo + len(ids) - 1]
+            yield from ids
+            lo = bisect_right(self._keys, last)
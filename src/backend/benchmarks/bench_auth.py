@@ -0,0 +1,40 @@
+"""Per-request cost of the get_current_user dependency, uncached versus cached.
+
+    python -m benchmarks.bench_auth --iterations 20000
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+
+from app.repositories import USERS_FILE, repositories
+from app.routes.auth import create_access_token, get_current_user, token_cache, verify_token
+
+
+async def _measure(iterations: int, token: str, cached: bool) -> float:
+    await repositories.open(USERS_FILE)
+    token_cache.clear()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if cached:
+            await get_current_user(token)
+        else:
+            await verify_token(token)
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+    token = create_access_token({"sub": "analyst"}, expires_delta=timedelta(minutes=30))
+
+    uncached = asyncio.run(_measure(args.iterations, token, cached=False))
+    cached = asyncio.run(_measure(args.iterations, token, cached=True))
+    print(f"uncached (decode + verify + user lookup): {uncached * 1e6:8.2f} us/request")
+    print(f"cached:                                   {cached * 1e6:8.2f} us/request")
+    print(f"speedup:                                  {uncached / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
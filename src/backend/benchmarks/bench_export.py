@@ -0,0 +1,79 @@
+"""Measure report export throughput and peak memory per format, with and without gzip.
+
+    python -m benchmarks.bench_export --sizes 10000 100000 1000000
+
+Exports stream straight out of an in-memory IndicatorStore, so the numbers are
+rendering (and compression) cost alone. Peak memory is what tracemalloc sees
+allocated during the export on top of the loaded store; it should stay flat
+as the size grows. The "cached" rows serve the same export from the
+ArtifactCache, i.e. a repeated download of an unchanged report.
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+from app.export import ArtifactCache, ArtifactKey, export_chunks, file_chunks, gzip_chunks
+from app.store import IndicatorStore
+from benchmarks.corpus import generate_indicators
+
+REPORT = {
+    "id": "report-1",
+    "name": "Benchmark export",
+    "description": "Every indicator in the store",
+    "createdAt": "2024-01-01T00:00:00Z",
+    "createdBy": "admin",
+    "indicators": [],
+}
+
+
+def export(store: IndicatorStore, format: str, compress: bool, cache: ArtifactCache = None) -> int:
+    """Drain one export and return its size in bytes."""
+    if cache is not None:
+        chunks = file_chunks(cache.get(ArtifactKey(REPORT["id"], format, store.version)))
+    else:
+        chunks = export_chunks(format, REPORT, store.iter_search())
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return sum(len(chunk) for chunk in chunks)
+
+
+def run(size: int, formats, repeat: int, directory: str):
+    store = IndicatorStore()
+    store.add_many(generate_indicators(size))
+    cache = ArtifactCache(directory, max_bytes=1 << 40)
+    cache.open()
+
+    print(f"\n{size:,} indicators")
+    print(f"{'format':<12} {'gzip':<5} {'output MB':>10} {'MB/s':>10} {'indicators/s':>14} {'peak KiB':>10}")
+    for format in formats:
+        cache.put(ArtifactKey(REPORT["id"], format, store.version), export_chunks(format, REPORT, store.iter_search()))
+        for label, source in ((format, None), (f"{format} cached", cache)):
+            for compress in (False, True):
+                # tracemalloc slows allocation-heavy code down, so time without it and take the peak separately
+                best = float("inf")
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    output = export(store, format, compress, source)
+                    best = min(best, time.perf_counter() - start)
+                tracemalloc.start()
+                export(store, format, compress, source)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{label:<12} {'yes' if compress else 'no':<5} {output / 1e6:>10.1f} "
+                      f"{output / 1e6 / best:>10.1f} {size / best:>14,.0f} {peak / 1024:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", choices=["csv", "json", "pdf"], default=["csv", "json", "pdf"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            run(size, args.formats, args.repeat, directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Bytes per indicator: API-shaped dicts versus IndicatorRecord.
+
+    python -m benchmarks.bench_indicator_memory --count 200000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from app.store import IndicatorRecord
+from benchmarks.corpus import generate_indicators
+
+
+def _retained(build):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    held = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return held, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    # Decoded from the wire, the way feeds and API clients deliver indicators
+    lines = [json.dumps(i) for i in generate_indicators(args.count)]
+
+    dicts, dict_bytes = _retained(lambda: [json.loads(line) for line in lines])
+    del dicts
+    records, record_bytes = _retained(
+        lambda: [IndicatorRecord.from_dict(json.loads(line)) for line in lines]
+    )
+    del records
+
+    print(f"{args.count:,} indicators")
+    print(f"dict representation:   {dict_bytes / args.count:8.1f} bytes/indicator")
+    print(f"IndicatorRecord:       {record_bytes / args.count:8.1f} bytes/indicator")
+    print(f"saving:                {1 - record_bytes / dict_bytes:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
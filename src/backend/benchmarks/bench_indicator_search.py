@@ -0,0 +1,94 @@
+"""Compare IndicatorStore.search with the original list-comprehension chain.
+
+    python -m benchmarks.bench_indicator_search --sizes 10000 1000000 5000000
+"""
+import argparse
+import time
+
+from app.store import IndicatorStore, parse_date_bound
+from benchmarks.corpus import generate_indicators
+
+QUERIES = [
+    {"type": "IP"},
+    {"type": "Domain", "source": "OTX"},
+    {"source": "MISP", "confidence": 0.9},
+    {"tags": ["ransomware"]},
+    {"type": "Hash", "tags": ["apt", "c2"], "confidence": 0.5},
+    {"confidence": 0.99},
+    {"fromDate": "2023-12-31T00:00:00", "toDate": "2024-01-01T00:00:00"},
+    {"type": "URL", "fromDate": "2023-12-01", "toDate": "2023-12-07"},
+    {"searchTerm": "host4242."},
+    {"searchTerm": "example77"},
+    {"type": "IP", "searchTerm": "10.2"},
+    {"searchTerm": "dropper payload"},
+]
+
+
+def legacy_search(indicators, type=None, source=None, confidence=None, tags=None, fromDate=None, toDate=None,
+                  searchTerm=None):
+    results = indicators.copy()
+    if type:
+        results = [i for i in results if i["type"] == type]
+    if source:
+        results = [i for i in results if i["source"] == source]
+    if confidence:
+        results = [i for i in results if i["confidence"] >= confidence]
+    if tags and len(tags) > 0:
+        results = [i for i in results if any(tag in i["tags"] for tag in tags)]
+    # The client-side equivalent of a date window: per-record parsing and comparison
+    if fromDate:
+        since = parse_date_bound(fromDate)
+        results = [i for i in results if parse_date_bound(i["timestamp"]) >= since]
+    if toDate:
+        until = parse_date_bound(toDate, end=True)
+        results = [i for i in results if parse_date_bound(i["timestamp"]) <= until]
+    if searchTerm:
+        term = searchTerm.lower()
+        results = [i for i in results if term in i["value"].lower() or (
+            i["description"] and term in i["description"].lower()
+        )]
+    return results
+
+
+def _timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, len(result)
+
+
+def run(size: int, repeat: int):
+    indicators = list(generate_indicators(size))
+    store = IndicatorStore()
+    start = time.perf_counter()
+    store.add_many(indicators)
+    print(f"\n{size:,} indicators (store build {time.perf_counter() - start:.2f}s)")
+    print(f"{'query':<90} {'legacy ms':>10} {'store ms':>10} {'speedup':>8} {'hits':>9}")
+    for query in QUERIES:
+        legacy, hits = _timed(lambda: legacy_search(indicators, **query), repeat)
+        indexed, store_hits = _timed(lambda: store.search(
+            type=query.get("type"),
+            source=query.get("source"),
+            min_confidence=query.get("confidence"),
+            tags=query.get("tags"),
+            search_term=query.get("searchTerm"),
+            since=parse_date_bound(query["fromDate"]) if "fromDate" in query else None,
+            until=parse_date_bound(query["toDate"], end=True) if "toDate" in query else None,
+        ), repeat)
+        assert hits == store_hits, (query, hits, store_hits)
+        print(f"{str(query):<90} {legacy * 1000:>10.2f} {indexed * 1000:>10.2f} {legacy / indexed:>7.1f}x {hits:>9,}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Search latency while a burst of concurrent logins is being verified.
+
+    python -m benchmarks.bench_login_load --logins 100
+
+Runs in-process through httpx's ASGI transport, so every request shares one
+event loop exactly as on a single uvicorn worker. `--inline` verifies
+passwords on the event loop the way login used to.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+import main
+from app.routes import auth
+from app.repositories import USERS_FILE, repositories
+from app.store import IndicatorRecord
+from benchmarks.corpus import generate_indicators
+
+
+async def _inline_verify(plain_password, hashed_password):
+    return auth.verify_password(plain_password, hashed_password)
+
+
+async def _search_latencies(client: httpx.AsyncClient, headers: dict, stop: asyncio.Event):
+    latencies = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post("/api/indicators/search", json={"type": "Domain", "source": "OTX"}, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+def _summary(latencies):
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return f"n={len(ordered):<5} p50={statistics.median(ordered) * 1000:8.2f}ms p99={p99 * 1000:8.2f}ms max={ordered[-1] * 1000:8.2f}ms"
+
+
+async def _run(args):
+    if args.inline:
+        auth.verify_password_async = _inline_verify
+    await repositories.open(USERS_FILE)
+    await repositories.indicators.add_many([IndicatorRecord.from_dict(i) for i in generate_indicators(args.corpus)])
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        login = await client.post("/api/auth/login", json={"username": "analyst", "password": "analyst"})
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+        stop = asyncio.Event()
+        idle = asyncio.create_task(_search_latencies(client, headers, stop))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        print("search, idle:           ", _summary(await idle))
+
+        stop = asyncio.Event()
+        searches = asyncio.create_task(_search_latencies(client, headers, stop))
+        started = time.perf_counter()
+        logins = await asyncio.gather(*(
+            client.post("/api/auth/login", json={"username": "analyst", "password": "analyst"})
+            for _ in range(args.logins)
+        ))
+        login_seconds = time.perf_counter() - started
+        stop.set()
+        print(f"search, {args.logins} logins:", _summary(await searches))
+        ok = sum(r.status_code == 200 for r in logins)
+        print(f"logins: {ok}/{args.logins} succeeded in {login_seconds:.2f}s")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--corpus", type=int, default=20000)
+    parser.add_argument("--idle-seconds", type=float, default=2.0)
+    parser.add_argument("--inline", action="store_true", help="verify passwords on the event loop (old behaviour)")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,96 @@
+"""Batch observable lookup throughput per backend, by hit rate, against one lookup per observable.
+
+    python -m benchmarks.bench_lookup --size 100000 --values 10000 --hit-rates 0.01 0.1 0.5
+
+Values are a mix of stored indicator values and fresh ones of the same
+shapes. For SQLite and Elasticsearch the first batch also builds the Bloom
+filter over stored values; it is timed separately as "warm-up". Without a
+real cluster the elasticsearch column runs against FakeElasticsearch, whose
+term lookups are a linear scan.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from app.repositories import MemoryIndicatorRepository
+from app.repositories.elastic import ElasticsearchIndicatorRepository
+from app.repositories.fake_elastic import FakeElasticsearch
+from app.repositories.sqlite import SQLiteRepositories
+from app.store import IndicatorRecord, IndicatorStore
+from benchmarks.corpus import generate_indicators
+
+
+def _values(records, count: int, hit_rate: float, rng: random.Random):
+    hits = int(count * hit_rate)
+    # Fresh values come from further along the same generator, so they look like stored ones
+    fresh = [r["value"] for r in generate_indicators(count - hits, seed=rng.randrange(1 << 30))]
+    values = [r.value for r in rng.sample(records, hits)] + [f"{value}.unseen" for value in fresh]
+    rng.shuffle(values)
+    return values
+
+
+async def _open(name: str, directory: str, records):
+    if name == "memory":
+        repository = MemoryIndicatorRepository(IndicatorStore())
+    elif name == "sqlite":
+        repository = SQLiteRepositories(f"sqlite:///{os.path.join(directory, 'bench.db')}").indicators
+    else:
+        # The only writer, loading before it looks anything up: nothing can become visible late
+        repository = ElasticsearchIndicatorRepository(
+            FakeElasticsearch(), "bench-indicators", refresh="false", settle_seconds=0,
+        )
+    await repository.open()
+    for start in range(0, len(records), 5000):
+        await repository.add_many(records[start:start + 5000])
+    if isinstance(repository, ElasticsearchIndicatorRepository):
+        repository.client.indices.refresh(index=repository.index)
+    return repository
+
+
+async def run(args):
+    rng = random.Random(7)
+    records = [IndicatorRecord.from_dict(i) for i in generate_indicators(args.size)]
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{args.size:,} indicators, {args.values:,} values per batch")
+        print(f"{'backend':<15} {'hit rate':>8} {'warm-up ms':>11} {'batch ms':>10} {'values/s':>12} "
+              f"{'matched':>8} {'one-by-one ms':>14}")
+        for name in args.backends:
+            repository = await _open(name, directory, records)
+            start = time.perf_counter()
+            await repository.lookup(["warm-up"])
+            warm_up = time.perf_counter() - start
+            for hit_rate in args.hit_rates:
+                values = _values(records, args.values, hit_rate, rng)
+                best = float("inf")
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    found = await repository.lookup(values)
+                    best = min(best, time.perf_counter() - start)
+                # The enrichment pattern this replaces: a request per observable
+                sample = values[:args.one_by_one]
+                start = time.perf_counter()
+                for value in sample:
+                    await repository.lookup([value])
+                one_by_one = (time.perf_counter() - start) / len(sample) * len(values)
+                print(f"{name:<15} {hit_rate:>8.2f} {warm_up * 1000:>11.1f} {best * 1000:>10.1f} "
+                      f"{len(values) / best:>12,.0f} {len(found):>8,} {one_by_one * 1000:>14.1f}")
+            await repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--values", type=int, default=10_000)
+    parser.add_argument("--hit-rates", type=float, nargs="+", default=[0.01, 0.1, 0.5])
+    parser.add_argument("--backends", nargs="+", choices=["memory", "sqlite", "elasticsearch"],
+                        default=["memory", "sqlite", "elasticsearch"])
+    parser.add_argument("--one-by-one", type=int, default=200, help="values timed one at a time, extrapolated")
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
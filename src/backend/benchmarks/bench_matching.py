@@ -0,0 +1,122 @@
+"""Compare CIDR/domain-suffix matching through the tries with a linear scan over the indicators.
+
+    python -m benchmarks.bench_matching --sizes 10000 100000 1000000
+
+The corpus mixes addresses and CIDR blocks of assorted prefix lengths with
+domains at several depths. Every backend's answers are checked against the
+scan on a sample of observables.
+"""
+import argparse
+import asyncio
+import ipaddress
+import os
+import random
+import tempfile
+import time
+
+from app.repositories import MemoryIndicatorRepository
+from app.repositories.sqlite import SQLiteRepositories
+from app.store import IndicatorRecord, IndicatorStore
+from app.store.matching import domain_labels, parse_network
+
+PREFIX_LENGTHS = [8, 12, 16, 20, 24, 28, 32, 32, 32, 32]
+WORDS = ["cdn", "mail", "api", "login", "secure", "update", "files", "static"]
+
+
+def generate(count: int, rng: random.Random):
+    for n in range(count):
+        if n % 2:
+            length = rng.choice(PREFIX_LENGTHS)
+            network = ipaddress.ip_network((rng.getrandbits(32) >> (32 - length) << (32 - length), length))
+            value = str(network.network_address) if length == 32 else str(network)
+            indicator_type = "IP"
+        else:
+            labels = [rng.choice(WORDS) for _ in range(rng.randrange(3))] + [f"site{rng.randrange(count)}", "com"]
+            value = ".".join(labels)
+            indicator_type = "Domain"
+        yield IndicatorRecord(f"indicator-{n}", indicator_type, value, "MISP", 0.5, 0.0, ("bench",))
+
+
+def observables(records, count: int, rng: random.Random):
+    values = []
+    for _ in range(count):
+        record = rng.choice(records)
+        if record.type == "IP":
+            network = parse_network(record.value)
+            # An address inside a stored block half the time, an unrelated one otherwise
+            address = network.network_address + rng.randrange(network.num_addresses)
+            values.append(str(address if rng.random() < 0.5 else ipaddress.ip_address(rng.getrandbits(32))))
+        else:
+            values.append(f"{rng.choice(WORDS)}.{record.value}" if rng.random() < 0.5 else f"x{record.value}")
+    return values
+
+
+def parse_all(records):
+    """Stored values parsed once up front, so the scan times only the comparisons."""
+    networks = [(r.id, parse_network(r.value)) for r in records if r.type == "IP"]
+    domains = [(r.id, domain_labels(r.value)) for r in records if r.type == "Domain"]
+    return networks, domains
+
+
+def scan(parsed, observable: str):
+    """The baseline: test every indicator."""
+    networks, domains = parsed
+    network = parse_network(observable)
+    labels = domain_labels(observable)
+    found = []
+    if network is not None:
+        found = [i for i, stored in networks if stored.version == network.version and network.subnet_of(stored)]
+    elif labels is not None:
+        found = [i for i, stored in domains if labels[:len(stored)] == stored]
+    return sorted(found)
+
+
+async def run(size: int, args):
+    rng = random.Random(7)
+    records = list(generate(size, rng))
+    values = observables(records, args.observables, rng)
+    sample = values[:args.check]
+    parsed = parse_all(records)
+
+    start = time.perf_counter()
+    expected = {value: scan(parsed, value) for value in sample}
+    scan_seconds = (time.perf_counter() - start) / len(sample)
+
+    print(f"\n{size:,} indicators, {len(values):,} observables")
+    print(f"{'matcher':<16} {'per observable us':>18} {'observables/s':>14} {'matched':>8}")
+    print(f"{'linear scan':<16} {scan_seconds * 1e6:>18.1f} {1 / scan_seconds:>14,.0f} {'':>8}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.backends:
+            if name == "memory":
+                repository = MemoryIndicatorRepository(IndicatorStore())
+            else:
+                repository = SQLiteRepositories(f"sqlite:///{os.path.join(directory, 'bench.db')}").indicators
+            await repository.open()
+            for offset in range(0, len(records), 5000):
+                await repository.add_many(records[offset:offset + 5000])
+            await repository.covering(["warm.up"])
+            checked = await repository.covering(sample)
+            for value in sample:
+                assert sorted(r.id for r in checked.get(value, [])) == expected[value], (name, value)
+            start = time.perf_counter()
+            found = await repository.covering(values)
+            seconds = (time.perf_counter() - start) / len(values)
+            print(f"{name + ' trie' if name == 'memory' else name:<16} {seconds * 1e6:>18.1f} "
+                  f"{1 / seconds:>14,.0f} {len(found):>8,}")
+            await repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--observables", type=int, default=20_000)
+    parser.add_argument("--check", type=int, default=50, help="observables verified against (and timed by) the scan")
+    parser.add_argument("--backends", nargs="+", choices=["memory", "sqlite"], default=["memory", "sqlite"])
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(size, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Dashboard poll latency for feeds, reports and visualization: uncached, cached, and revalidated with If-None-Match.
+
+    python -m benchmarks.bench_response_cache --corpus 100000 --documents 500
+
+Runs in-process through httpx's ASGI transport. "uncached" clears the
+cache before every request, i.e. the cost of each poll before responses
+were cached; "cached" replays the stored body; "304" sends the ETag back.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import datetime
+
+import httpx
+
+import main
+from app.repositories import USERS_FILE, repositories
+from app.response_cache import response_cache
+from app.store import IndicatorRecord
+from benchmarks.corpus import generate_indicators
+
+ENDPOINTS = [
+    ("GET /api/feeds", "get", "/api/feeds/", None),
+    ("GET /api/reports", "get", "/api/reports/", None),
+    ("POST /api/visualization", "post", "/api/visualization/", {"fromDate": "2023-10-01", "toDate": "2023-12-31"}),
+    ("POST /api/visualization tags", "post", "/api/visualization/", {"tags": ["ransomware", "apt"]}),
+]
+
+
+async def _seed(args):
+    await repositories.open(USERS_FILE)
+    await repositories.indicators.add_many([IndicatorRecord.from_dict(i) for i in generate_indicators(args.corpus)])
+    now = datetime.now().isoformat()
+    for n in range(args.documents):
+        await repositories.feeds.create({
+            "id": f"feed-{n}", "name": f"Feed {n}", "source": "MISP", "description": "Benchmark feed",
+            "lastUpdated": now, "indicators": [],
+        })
+        await repositories.reports.create({
+            "id": f"report-{n}", "name": f"Report {n}", "createdAt": now, "createdBy": "admin",
+            "description": "Benchmark report", "content": "", "format": "csv",
+        })
+
+
+async def _poll(client, method: str, path: str, body, headers: dict, requests: int, mode: str):
+    latencies = []
+    etag = None
+    for _ in range(requests):
+        request_headers = dict(headers)
+        if mode == "uncached":
+            response_cache.clear()
+        elif mode == "304" and etag is not None:
+            request_headers["If-None-Match"] = etag
+        start = time.perf_counter()
+        response = await client.request(method, path, json=body, headers=request_headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == (304 if mode == "304" and etag is not None else 200), response.status_code
+        etag = response.headers["etag"]
+    return latencies
+
+
+async def _run(args):
+    await _seed(args)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+        login = await client.post("/api/auth/login", json={"username": "analyst", "password": "analyst"})
+        headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+        print(f"{'endpoint':<32} {'mode':<9} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9}")
+        for label, method, path, body in ENDPOINTS:
+            for mode in ("uncached", "cached", "304"):
+                latencies = sorted(await _poll(client, method, path, body, headers, args.requests, mode))
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                print(f"{label:<32} {mode:<9} {statistics.median(latencies) * 1000:>9.3f} {p99 * 1000:>9.3f} "
+                      f"{len(latencies) / sum(latencies):>9,.0f}")
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=int, default=100_000)
+    parser.add_argument("--documents", type=int, default=500, help="feeds and reports each")
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_()
@@ -0,0 +1,62 @@
+"""Per-process memory of mapped segments versus an in-heap IndicatorStore.
+
+    python -m benchmarks.bench_segments --sizes 100000 1000000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.store import IndicatorRecord
+from app.store.segments import SegmentWriter
+from benchmarks.corpus import generate_indicators
+
+_CHILD = """
+import random, sys, time
+sys.path.insert(0, {root!r})
+from app.store import IndicatorStore, SegmentReader
+from benchmarks.corpus import generate_indicators
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+
+mode, size, directory = sys.argv[1], int(sys.argv[2]), sys.argv[3]
+base = rss_kb()
+if mode == "segments":
+    source = SegmentReader(directory)
+else:
+    source = IndicatorStore()
+    source.add_many(generate_indicators(size))
+ids = [f"indicator-{{random.randrange(size)}}" for _ in range(10000)]
+start = time.perf_counter()
+for indicator_id in ids:
+    source.get(indicator_id)
+print(rss_kb() - base, (time.perf_counter() - start) / len(ids) * 1e6)
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    child = _CHILD.format(root=root)
+    print(f"{'indicators':>10} {'mode':>9} {'RSS growth MB':>14} {'get us':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            start = time.perf_counter()
+            SegmentWriter(directory).append(IndicatorRecord.from_dict(i) for i in generate_indicators(size))
+            print(f"{'':>10} (segment written in {time.perf_counter() - start:.1f}s)")
+            for mode in ("heap", "segments"):
+                out = subprocess.check_output([sys.executable, "-c", child, mode, str(size), directory], text=True)
+                rss_kb, get_us = out.split()
+                print(f"{size:>10,} {mode:>9} {int(rss_kb) / 1024:>14.1f} {float(get_us):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Share of indicator search time spent serializing: validated responses against TIP_FAST_JSON, cold and warm.
+
+    python -m benchmarks.bench_serialization --corpus 100000 --page-sizes 100 1000 10000
+
+Runs in-process through httpx's ASGI transport on the memory backend and
+walks the whole search result set page by page for each page size.
+"validated" is the response_model path (to_dict, validation, encoding);
+"fast cold" serializes with the record byte cache empty, "fast warm"
+repeats the walk with every record's bytes already cached. Serialization
+time comes from the instrumentation's "serialization" phase for the search
+route; the share is against the mean request latency the client saw.
+Bodies from the validated and fast paths are checked to be byte-identical.
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+import httpx
+
+import main
+from app import serialization
+from app.instrumentation import instrumentation
+from app.store import IndicatorRecord
+from benchmarks.corpus import generate_indicators
+
+SEARCH_PATH = "/api/indicators/search"
+SERIALIZATION_LABELS = (("method", "POST"), ("route", SEARCH_PATH), ("phase", "serialization"))
+
+
+def _serialization_totals() -> Tuple[float, int]:
+    return instrumentation.phases.totals().get(SERIALIZATION_LABELS, (0.0, 0))
+
+
+async def _walk(client: httpx.AsyncClient, headers: dict, limit: int, filters: dict) -> Tuple[List[float], List[bytes]]:
+    latencies, bodies = [], []
+    cursor = None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        start = time.perf_counter()
+        response = await client.post(SEARCH_PATH, params=params, json=filters, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.text
+        bodies.append(response.content)
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            return latencies, bodies
+
+
+async def _run(args):
+    if not main.METRICS_ENABLED:
+        raise SystemExit("TIP_METRICS=0 removes the instrumentation this benchmark reads")
+    records = [IndicatorRecord.from_dict(i) for i in generate_indicators(args.corpus)]
+    filters = {"confidence": args.confidence}
+    async with main.app.router.lifespan_context(main.app):
+        await main.repositories.indicators.add_many(records)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=None) as client:
+            login = await client.post("/api/auth/login", json={"username": "analyst", "password": "analyst"})
+            headers = {"Authorization": f"Bearer {login.json()['token']}"}
+
+            print(f"{'page':>6} {'mode':<10} {'pages':>6} {'mean ms':>9} {'serialize ms':>13} {'share':>7}")
+            for limit in args.page_sizes:
+                expected = None
+                for mode in ("validated", "fast cold", "fast warm"):
+                    serialization.FAST_JSON = mode != "validated"
+                    if mode == "fast cold":
+                        for record in records:
+                            record._json = None
+                    before_seconds, before_count = _serialization_totals()
+                    latencies, bodies = await _walk(client, headers, limit, filters)
+                    after_seconds, after_count = _serialization_totals()
+                    if expected is None:
+                        expected = bodies
+                    elif bodies != expected:
+                        raise SystemExit(f"{mode} bodies differ from the validated ones at page size {limit}")
+                    mean = sum(latencies) / len(latencies)
+                    serialize = (after_seconds - before_seconds) / max(1, after_count - before_count)
+                    print(f"{limit:>6} {mode:<10} {len(latencies):>6} {mean * 1000:>9.2f} {serialize * 1000:>13.2f} "
+                          f"{serialize / mean:>7.1%}")
+    serialization.FAST_JSON = False
+
+
+def main_():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", type=int, default=100_000)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--confidence", type=float, default=0.5, help="search filter; lower walks more pages")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_()
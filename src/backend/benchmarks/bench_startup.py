@@ -0,0 +1,72 @@
+"""Time from process start to first request served, per uvicorn worker count.
+
+    python -m benchmarks.bench_startup --workers 1 4 16
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure(workers: int, timeout: float = 120.0):
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers)],
+        cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    ready = []
+
+    def watch():
+        for line in process.stderr:
+            if "Application startup complete" in line:
+                ready.append(time.perf_counter() - started)
+
+    threading.Thread(target=watch, daemon=True).start()
+    first_request = None
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        first_request = time.perf_counter() - started
+                        break
+            except OSError:
+                time.sleep(0.01)
+        while len(ready) < workers and time.perf_counter() - started < timeout:
+            time.sleep(0.01)
+    finally:
+        process.terminate()
+        process.wait()
+    all_ready = ready[workers - 1] if len(ready) >= workers else None
+    return first_request, all_ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    print(f"{'workers':>7} {'first request s':>16} {'all workers ready s':>20}")
+    for workers in args.workers:
+        first_request, all_ready = measure(workers)
+        fmt = lambda v: f"{v:.2f}" if v is not None else "timeout"
+        print(f"{workers:>7} {fmt(first_request):>16} {fmt(all_ready):>20}")
+
+
+if __name__ == "__main__":
+    main()
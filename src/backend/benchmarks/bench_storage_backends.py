@@ -0,0 +1,147 @@
+"""Compare indicator repository backends on bulk insert, get-by-id, search, related and aggregation.
+
+    python -m benchmarks.bench_storage_backends --sizes 10000 100000 1000000
+    python -m benchmarks.bench_storage_backends --backends memory elasticsearch --elasticsearch-url http://localhost:9200
+
+The SQLite database is a temporary file (WAL mode, pooled connections), so
+numbers include the thread hop and page cache but not network latency.
+Without --elasticsearch-url the elasticsearch column runs against the
+in-process FakeElasticsearch: it checks the query translation end to end,
+but its timings are a linear scan, not a cluster.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from app.repositories import IndicatorFilters, MemoryIndicatorRepository
+from app.repositories.elastic import ElasticsearchIndicatorRepository
+from app.repositories.fake_elastic import FakeElasticsearch
+from app.repositories.sqlite import SQLiteRepositories
+from app.store import IndicatorRecord, IndicatorStore, parse_date_bound
+from benchmarks.corpus import generate_indicators
+
+QUERIES = [
+    IndicatorFilters(type="IP"),
+    IndicatorFilters(type="Domain", source="OTX"),
+    IndicatorFilters(source="MISP", min_confidence=0.9),
+    IndicatorFilters(tags=["ransomware"]),
+    IndicatorFilters(type="Hash", tags=["apt", "c2"], min_confidence=0.5),
+    IndicatorFilters(since=parse_date_bound("2023-12-31T00:00:00"), until=parse_date_bound("2024-01-01T00:00:00")),
+    IndicatorFilters(search_term="host4242."),
+]
+
+
+async def _timed(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+async def _bulk_insert(repository, records, batch_size: int) -> float:
+    start = time.perf_counter()
+    for offset in range(0, len(records), batch_size):
+        await repository.add_many(records[offset:offset + batch_size])
+    return time.perf_counter() - start
+
+
+async def _get_by_id(repository, ids) -> float:
+    start = time.perf_counter()
+    for indicator_id in ids:
+        assert await repository.get(indicator_id) is not None
+    return (time.perf_counter() - start) / len(ids)
+
+
+async def _open_backends(names, directory: str, args):
+    backends = []
+    for name in names:
+        if name == "memory":
+            repository = MemoryIndicatorRepository(IndicatorStore())
+        elif name == "sqlite":
+            repository = SQLiteRepositories(f"sqlite:///{os.path.join(directory, 'bench.db')}").indicators
+        else:
+            if args.elasticsearch_url:
+                from elasticsearch import Elasticsearch
+                client = Elasticsearch(args.elasticsearch_url)
+                client.options(ignore_status=404).indices.delete(index="bench-indicators")
+            else:
+                client = FakeElasticsearch()
+            # Refresh once after loading rather than on every batch
+            repository = ElasticsearchIndicatorRepository(client, "bench-indicators", refresh="false")
+        await repository.open()
+        backends.append((name, repository))
+    return backends
+
+
+def _row(label: str, values, scale: float = 1000, digits: int = 2):
+    print(f"{label:<90}" + "".join(f" {value * scale:>14.{digits}f}" for value in values))
+
+
+async def run(size: int, args):
+    records = [IndicatorRecord.from_dict(i) for i in generate_indicators(size)]
+    ids = random.Random(7).sample([r.id for r in records], min(args.lookups, size))
+    with tempfile.TemporaryDirectory() as directory:
+        backends = await _open_backends(args.backends, directory, args)
+
+        print(f"\n{size:,} indicators")
+        print(f"{'operation':<90}" + "".join(f" {name + ' ms':>14}" for name, _ in backends))
+        inserts = [await _bulk_insert(repository, records, args.batch_size) for _, repository in backends]
+        for _, repository in backends:
+            if isinstance(repository, ElasticsearchIndicatorRepository):
+                repository.client.indices.refresh(index=repository.index)
+        _row(f"bulk insert ({args.batch_size:,} per batch)", inserts, digits=1)
+        _row("get by id (per lookup)", [await _get_by_id(repository, ids) for _, repository in backends], digits=3)
+
+        for query in QUERIES:
+            label = {k: v for k, v in vars(query).items() if v is not None}
+            timings, pages = [], []
+            for _, repository in backends:
+                seconds, (page, _) = await _timed(lambda: repository.search_page(query, args.limit), args.repeat)
+                timings.append(seconds)
+                pages.append([r.id for r in page])
+            # Every backend must return the same first page in the same order
+            assert all(page == pages[0] for page in pages), label
+            _row(f"search limit={args.limit} {label}", timings)
+
+            timings, results = [], []
+            for _, repository in backends:
+                seconds, aggregates = await _timed(lambda: repository.aggregate(query), args.repeat)
+                timings.append(seconds)
+                results.append(aggregates)
+            assert all(result == results[0] for result in results), label
+            _row(f"aggregate {label}", timings)
+
+        timings, related = [], []
+        for _, repository in backends:
+            seconds, result = await _timed(lambda: repository.related(ids[0], limit=50, depth=2), args.repeat)
+            timings.append(seconds)
+            related.append([r.id for r in result])
+        assert all(result == related[0] for result in related)
+        _row("related limit=50 depth=2", timings)
+
+        for _, repository in backends:
+            await repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--backends", nargs="+", choices=["memory", "sqlite", "elasticsearch"],
+                        default=["memory", "sqlite", "elasticsearch"])
+    parser.add_argument("--elasticsearch-url", help="a real cluster; the in-process fake is used otherwise")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    for size in args.sizes:
+        asyncio.run(run(size, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import random
+from datetime import datetime, timedelta
+
+TYPES = ["IP", "Domain", "URL", "Hash", "Email"]
+TYPE_WEIGHTS = [35, 25, 20, 15, 5]
+SOURCES = ["MISP", "OTX", "Recorded Future", "VirusTotal", "AbuseIPDB"]
+SOURCE_WEIGHTS = [30, 25, 20, 15, 10]
+TAGS = [
+    "malware", "c2", "phishing", "ransomware", "botnet", "apt", "spam",
+    "scanner", "tor", "exploit", "credential-theft", "cryptominer",
+]
+WORDS = ["command", "control", "server", "phishing", "domain", "ransomware", "hash", "dropper", "payload", "campaign"]
+
+
+def _value(rng: random.Random, indicator_type: str, n: int) -> str:
+    if indicator_type == "IP":
+        return f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+    if indicator_type == "Domain":
+        return f"host{n}.example{rng.randint(0, 9999)}.com"
+    if indicator_type == "URL":
+        return f"http://site{rng.randint(0, 99999)}.net/path/{n}"
+    if indicator_type == "Email":
+        return f"user{n}@mail{rng.randint(0, 999)}.org"
+    return "%040x" % rng.getrandbits(160)
+
+
+def generate_indicators(count: int, seed: int = 1337, days: int = 90):
+    """Yield `count` synthetic indicators with skewed type/source/tag distributions."""
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1)
+    span = days * 86400
+    for n in range(count):
+        indicator_type = rng.choices(TYPES, TYPE_WEIGHTS)[0]
+        yield {
+            "id": f"indicator-{n}",
+            "type": indicator_type,
+            "value": _value(rng, indicator_type, n),
+            "source": rng.choices(SOURCES, SOURCE_WEIGHTS)[0],
+            "confidence": round(rng.random(), 2),
+            "timestamp": (now - timedelta(seconds=rng.randrange(span))).isoformat(),
+            "tags": rng.sample(TAGS, rng.randint(1, 3)),
+            "description": " ".join(rng.sample(WORDS, 3)),
+        }
@@ -0,0 +1,68 @@
+"""Local stand-in for threat feed HTTP endpoints.
+
+Serves /feeds/<name> as NDJSON with a strong ETag and answers If-None-Match
+with 304. `?fail=N` makes the first N requests for that path return 503.
+"""
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable
+from urllib.parse import parse_qs, urlparse
+
+
+class StubFeedServer:
+    def __init__(self, feeds: Dict[str, Iterable[dict]], host: str = "127.0.0.1", port: int = 0):
+        self.payloads = {
+            name: "".join(json.dumps(item) + "\n" for item in items).encode()
+            for name, items in feeds.items()
+        }
+        self.requests: Dict[str, int] = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                name = url.path.rsplit("/", 1)[-1]
+                count = server.requests[url.path] = server.requests.get(url.path, 0) + 1
+                fail = int(parse_qs(url.query).get("fail", ["0"])[0])
+                payload = server.payloads.get(name)
+                if payload is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                if count <= fail:
+                    self.send_response(503)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                etag = '"%s"' % hashlib.sha1(payload).hexdigest()
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
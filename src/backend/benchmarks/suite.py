@@ -0,0 +1,414 @@
+"""Reproducible API load suite: throughput, latency percentiles and RSS per scenario and corpus size, as JSON.
+
+    python -m benchmarks.suite --sizes 1000 100000 1000000 --output results.json
+    python -m benchmarks.suite --mode uvicorn --workers 4 --backend sqlite --output results.json
+    python -m benchmarks.suite --sizes 100000 --baseline baseline.json --tolerance 0.2
+
+Each scenario (login, search, related, visualization, export) sends a
+seeded, repeatable sequence of requests from `--concurrency` clients after
+`--warmup` unrecorded ones. Corpora come from benchmarks.corpus and are
+prefix-stable, so sizes are loaded in ascending order by appending to the
+previous one.
+
+"asgi" mode drives the app in this process through httpx's ASGI transport
+(one event loop, like a single worker); its RSS includes the client, which
+buffers each response whole, so large exports inflate it. "uvicorn" mode starts real workers
+per size and needs the sqlite backend, since each worker would otherwise
+hold its own empty memory store; the database is loaded before they start.
+
+A baseline is any earlier --output file; results on the same machine and
+settings are compared per scenario and size, and the exit status is 1 if
+throughput dropped, p50/p99 latency rose or RSS grew past the tolerances.
+Baselines from another machine or mode compare nothing meaningful.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from dataclasses import dataclass
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.corpus import SOURCES, TAGS, TYPES, generate_indicators
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCENARIOS = ["login", "search", "related", "visualization", "export"]
+# bcrypt makes every login cost ~100ms of CPU, so the scenario sends fewer of them
+LOGIN_REQUEST_FRACTION = 0.1
+# The corpus covers the 90 days before this date
+CORPUS_END = datetime(2024, 1, 1)
+USERNAME = PASSWORD = "analyst"
+LOAD_BATCH = 10_000
+
+Request = Tuple[str, str, Optional[dict]]
+
+
+@dataclass
+class Target:
+    size: int
+    report_id: str
+
+
+def _date(days_before_end: int) -> str:
+    return (CORPUS_END - timedelta(days=days_before_end)).date().isoformat()
+
+
+def search_request(rng: random.Random, target: Target) -> Request:
+    filters = rng.choice([
+        {"type": rng.choice(TYPES)},
+        {"type": rng.choice(TYPES), "source": rng.choice(SOURCES)},
+        {"tags": rng.sample(TAGS, 2)},
+        {"confidence": round(rng.uniform(0.5, 0.95), 2), "source": rng.choice(SOURCES)},
+        {"searchTerm": rng.choice(["ransomware", "payload", "example1", "site42"])},
+        {"fromDate": _date(rng.randint(8, 90)), "toDate": _date(rng.randint(0, 7))},
+    ])
+    return "POST", "/api/indicators/search?limit=100", filters
+
+
+def related_request(rng: random.Random, target: Target) -> Request:
+    return "GET", f"/api/indicators/indicator-{rng.randrange(target.size)}/related", None
+
+
+def visualization_request(rng: random.Random, target: Target) -> Request:
+    filters = {"fromDate": _date(rng.randint(7, 90)), "toDate": _date(rng.randint(0, 6))}
+    if rng.random() < 0.5:
+        filters["tags"] = rng.sample(TAGS, rng.randint(1, 2))
+    return "POST", "/api/visualization/", filters
+
+
+def export_request(rng: random.Random, target: Target) -> Request:
+    return "GET", f"/api/reports/{target.report_id}/export?format=csv", None
+
+
+def login_request(rng: random.Random, target: Target) -> Request:
+    return "POST", "/api/auth/login", {"username": USERNAME, "password": PASSWORD}
+
+
+REQUESTS: Dict[str, Callable[[random.Random, Target], Request]] = {
+    "login": login_request,
+    "search": search_request,
+    "related": related_request,
+    "visualization": visualization_request,
+    "export": export_request,
+}
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered) + 0.5)) - 1))]
+
+
+def rss_bytes(pid: int, children: bool = False) -> Optional[int]:
+    """Resident set size of a process (plus its children) from /proc; None where that is unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration):
+        return None
+    if children:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            try:
+                with open(f"/proc/{pid}/task/{task}/children") as f:
+                    rss += sum(rss_bytes(int(child)) or 0 for child in f.read().split())
+            except OSError:
+                pass
+    return rss
+
+
+async def drive(client: httpx.AsyncClient, requests: List[Request], headers: dict, concurrency: int) -> dict:
+    """Send `requests` from `concurrency` closed-loop clients; latency stats plus throughput and errors."""
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(requests)
+
+    async def worker():
+        nonlocal errors
+        for method, path, body in queue:
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                # Drain streamed bodies so exports are timed in full
+                await response.aread()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    seconds = time.perf_counter() - started
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "seconds": seconds,
+        "throughput": len(ordered) / seconds if seconds else 0.0,
+        "latency_ms": {
+            "mean": sum(ordered) / len(ordered) * 1000,
+            "p50": percentile(ordered, 0.50) * 1000,
+            "p90": percentile(ordered, 0.90) * 1000,
+            "p99": percentile(ordered, 0.99) * 1000,
+            "max": ordered[-1] * 1000,
+        },
+    }
+
+
+async def run_scenarios(
+    client: httpx.AsyncClient, target: Target, args, rss: Callable[[], Optional[int]]
+) -> List[dict]:
+    size = target.size
+    login = await client.post("/api/auth/login", json={"username": USERNAME, "password": PASSWORD})
+    login.raise_for_status()
+    headers = {"Authorization": f"Bearer {login.json()['token']}"}
+    results = []
+    for scenario in args.scenarios:
+        # Seeded per scenario and size, so a rerun replays exactly the same requests
+        rng = random.Random(f"{args.seed}-{scenario}-{size}")
+        fraction = LOGIN_REQUEST_FRACTION if scenario == "login" else 1.0
+        count = max(1, int(args.requests * fraction))
+        warmup = int(args.warmup * fraction)
+        requests = [REQUESTS[scenario](rng, target) for _ in range(warmup + count)]
+        if warmup:
+            await drive(client, requests[:warmup], headers, args.concurrency)
+        result = await drive(client, requests[warmup:], headers, args.concurrency)
+        results.append({"scenario": scenario, "size": size, **result, "rss_bytes": rss()})
+        print_result(results[-1])
+    return results
+
+
+async def create_report(client: httpx.AsyncClient) -> str:
+    login = await client.post("/api/auth/login", json={"username": "admin", "password": "admin"})
+    headers = {"Authorization": f"Bearer {login.json()['token']}"}
+    report = {"name": "Benchmark report", "createdBy": "admin", "description": "All indicators", "content": "",
+              "format": "csv"}
+    response = await client.post("/api/reports/", json=report, headers=headers)
+    response.raise_for_status()
+    return response.json()["id"]
+
+
+async def load_sqlite(database_url: str, records) -> float:
+    from app.repositories import USERS_FILE
+    from app.repositories.sqlite import SQLiteRepositories
+    from app.store import IndicatorRecord
+    repositories = SQLiteRepositories(database_url)
+    await repositories.open(USERS_FILE)
+    started = time.perf_counter()
+    batch = []
+    for record in records:
+        batch.append(IndicatorRecord.from_dict(record))
+        if len(batch) == LOAD_BATCH:
+            await repositories.indicators.add_many(batch)
+            batch = []
+    if batch:
+        await repositories.indicators.add_many(batch)
+    await repositories.close()
+    return time.perf_counter() - started
+
+
+async def run_asgi(args, environment: Dict[str, str]) -> List[dict]:
+    os.environ.update(environment)
+    # Imported only now: the app reads its configuration from the environment at import time
+    import main
+    from app.repositories import repositories
+    from app.store import IndicatorRecord
+
+    corpus = generate_indicators(max(args.sizes), seed=args.seed)
+    results = []
+    loaded = 0
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            report_id = await create_report(client)
+            for size in args.sizes:
+                records = islice(corpus, size - loaded)
+                if args.backend == "sqlite":
+                    load_seconds = await load_sqlite(environment["TIP_DATABASE_URL"], records)
+                else:
+                    started = time.perf_counter()
+                    for batch in iter(lambda: list(islice(records, LOAD_BATCH)), []):
+                        await repositories.indicators.add_many([IndicatorRecord.from_dict(r) for r in batch])
+                    load_seconds = time.perf_counter() - started
+                loaded = size
+                print(f"\n{size:,} indicators loaded in {load_seconds:.1f}s")
+                results += await run_scenarios(client, Target(size, report_id), args, lambda: rss_bytes(os.getpid()))
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(workers: int, environment: Dict[str, str], timeout: float = 300.0) -> Tuple[subprocess.Popen, int]:
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers),
+         "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **environment},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    ready = []
+
+    def watch():
+        for line in process.stderr:
+            if "Application startup complete" in line:
+                ready.append(line)
+
+    threading.Thread(target=watch, daemon=True).start()
+    # Every worker must be up before the clock starts, or the first requests queue behind startup
+    started = time.perf_counter()
+    while len(ready) < workers and time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+        time.sleep(0.05)
+    if len(ready) < workers:
+        process.terminate()
+        raise RuntimeError("uvicorn workers did not start in time")
+    return process, port
+
+
+async def run_uvicorn(args, environment: Dict[str, str]) -> List[dict]:
+    corpus = generate_indicators(max(args.sizes), seed=args.seed)
+    results = []
+    loaded = 0
+    for size in args.sizes:
+        load_seconds = await load_sqlite(environment["TIP_DATABASE_URL"], islice(corpus, size - loaded))
+        loaded = size
+        print(f"\n{size:,} indicators loaded in {load_seconds:.1f}s")
+        process, port = start_uvicorn(args.workers, environment)
+        try:
+            limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None, limits=limits) as client:
+                target = Target(size, await create_report(client))
+                results += await run_scenarios(client, target, args, lambda: rss_bytes(process.pid, children=True))
+        finally:
+            process.terminate()
+            process.wait()
+    return results
+
+
+def print_result(result: dict):
+    latency = result["latency_ms"]
+    rss = result["rss_bytes"]
+    print(f"{result['scenario']:<14} {result['requests']:>7,} {result['errors']:>6} {result['throughput']:>10,.1f} "
+          f"{latency['p50']:>9.2f} {latency['p90']:>9.2f} {latency['p99']:>9.2f} "
+          f"{(rss / 2 ** 20 if rss else float('nan')):>9.1f}")
+
+
+def compare(results: List[dict], baseline: dict, tolerance: float, memory_tolerance: float) -> List[str]:
+    """Regressions of `results` against the results in a baseline file."""
+    previous = {(r["scenario"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["scenario"], result["size"]))
+        if before is None:
+            continue
+        name = f"{result['scenario']} @ {result['size']:,}"
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput']:,.1f} -> {result['throughput']:,.1f} req/s")
+        for key in ("p50", "p99"):
+            was, now = before["latency_ms"][key], result["latency_ms"][key]
+            if now > was * (1 + tolerance):
+                regressions.append(f"{name}: {key} {was:.2f} -> {now:.2f} ms")
+        was, now = before.get("rss_bytes"), result["rss_bytes"]
+        if was and now and now > was * (1 + memory_tolerance):
+            regressions.append(f"{name}: RSS {was / 2 ** 20:.1f} -> {now / 2 ** 20:.1f} MiB")
+        if result["errors"] > before["errors"]:
+            regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default=None,
+                        help="default: memory for asgi, sqlite for uvicorn")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn workers")
+    parser.add_argument("--requests", type=int, default=500, help="recorded requests per scenario")
+    parser.add_argument("--warmup", type=int, default=20, help="unrecorded requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=1337)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier --output to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput/latency change")
+    parser.add_argument("--memory-tolerance", type=float, default=0.25, help="allowed RSS growth")
+    args = parser.parse_args()
+    args.sizes = sorted(set(args.sizes))
+    args.backend = args.backend or ("sqlite" if args.mode == "uvicorn" else "memory")
+    if args.mode == "uvicorn" and args.backend != "sqlite":
+        parser.error("uvicorn mode needs --backend sqlite: memory stores are per worker")
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="tip-bench-") as directory:
+        environment = {
+            "TIP_STORAGE_BACKEND": args.backend,
+            "TIP_INDICATOR_BACKEND": args.backend,
+            "TIP_DATABASE_URL": f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            "TIP_REPORT_CACHE_DIR": os.path.join(directory, "reports"),
+        }
+        print(f"{'scenario':<14} {'requests':>7} {'errors':>6} {'req/s':>10} {'p50 ms':>9} {'p90 ms':>9} "
+              f"{'p99 ms':>9} {'RSS MiB':>9}")
+        run = run_uvicorn if args.mode == "uvicorn" else run_asgi
+        results = asyncio.run(run(args, environment))
+
+    report = {
+        "meta": {
+            "createdAt": datetime.now(timezone.utc).isoformat(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            **{key: getattr(args, key) for key in
+               ("mode", "backend", "workers", "sizes", "scenarios", "requests", "warmup", "concurrency", "seed")},
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if baseline is not None:
+        settings = ("mode", "backend", "workers", "concurrency", "requests")
+        mismatched = [key for key in settings if baseline["meta"].get(key) != report["meta"][key]]
+        if mismatched:
+            print(f"\nwarning: baseline differs in {', '.join(mismatched)}")
+        regressions = compare(results, baseline, args.tolerance, args.memory_tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("\nno regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
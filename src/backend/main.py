@@ -1,11 +1,36 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, feeds, indicators, reports, visualization
+from app.routes import auth, feeds, indicators, metrics, reports, visualization
+from app.export import artifact_cache, report_jobs
+from app.instrumentation import METRICS_ENABLED, InstrumentationMiddleware, instrumentation
+from app.repositories import USERS_FILE, repositories
+from app.store import SEGMENT_DIR, segment_storage
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Deferred initialization: runs once per worker before it accepts requests
+    if SEGMENT_DIR:
+        # Opened first so the indicator repository loads the segments and seeds only an empty directory
+        segment_storage.open(SEGMENT_DIR)
+    await repositories.open(USERS_FILE)
+    await indicators.seed_indicators()
+    await feeds.seed_feeds()
+    await reports.seed_reports()
+    artifact_cache.open()
+    instrumentation.start()
+    yield
+    instrumentation.stop()
+    await report_jobs.shutdown()
+    segment_storage.close()
+    await repositories.close()
+    auth.shutdown_verify_pool()
 
 app = FastAPI(
     title="Threat Intelligence Platform API",
     description="API for the Threat Intelligence Platform",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -15,7 +40,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Profile-Id"],
 )
+# Added last so it is outermost and times the whole stack
+if METRICS_ENABLED:
+    app.add_middleware(InstrumentationMiddleware, instrumentation=instrumentation)
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
@@ -23,6 +52,7 @@ app.include_router(feeds.router, prefix="/api/feeds", tags=["Threat Feeds"])
 app.include_router(indicators.router, prefix="/api/indicators", tags=["Threat Indicators"])
 app.include_router(reports.router, prefix="/api/reports", tags=["Reports"])
 app.include_router(visualization.router, prefix="/api/visualization", tags=["Visualization"])
+app.include_router(metrics.router, prefix="/api/metrics", tags=["Metrics"])
 
 @app.get("/", tags=["Root"])
 async def root():
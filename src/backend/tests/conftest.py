@@ -0,0 +1,50 @@
+import os
+import sys
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Tests import the backend the way main.py does: `app` as a top-level package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def client():
+    # One application per test session: the repositories are process-wide
+    import main
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    token = client.post("/api/auth/login", json={"username": "admin", "password": "admin"}).json()["token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture(params=["memory", "sqlite", "elasticsearch"])
+def open_repositories(request, tmp_path):
+    """An async context manager opening a fresh set of repositories on each backend.
+
+    Elasticsearch runs against the in-process fake, with the other repositories in memory.
+    """
+    from app.repositories import MemoryRepositories, create_elasticsearch_repository
+    from app.store import IndicatorStore
+
+    @asynccontextmanager
+    async def open_repositories():
+        if request.param == "sqlite":
+            from app.repositories.sqlite import SQLiteRepositories
+            repositories = SQLiteRepositories(f"sqlite:///{tmp_path}/tip.db")
+        else:
+            repositories = MemoryRepositories(IndicatorStore())
+            if request.param == "elasticsearch":
+                repositories.indicators = create_elasticsearch_repository("fake://", "test-indicators")
+        await repositories.open()
+        try:
+            yield repositories
+        finally:
+            await repositories.close()
+
+    return open_repositories
@@ -0,0 +1,104 @@
+from datetime import timedelta
+
+from app.routes import auth
+from app.routes.auth import LoginThrottle
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_throttle_forgets_expired_keys_and_stays_bounded(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth.time, "monotonic", clock)
+    throttle = LoginThrottle(max_failures=2, window=60, maxsize=100)
+
+    for n in range(50):
+        throttle.record_failure(f"user-{n}")
+    assert len(throttle) == 50
+    clock.now += 61
+    throttle.record_failure("fresh")
+    assert len(throttle) == 1
+
+    for n in range(1000):
+        throttle.record_failure(f"user-{n}")
+    assert len(throttle) == 100
+
+
+def test_throttle_limits_within_the_window(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth.time, "monotonic", clock)
+    throttle = LoginThrottle(max_failures=2, window=60)
+
+    throttle.record_failure("key")
+    assert throttle.retry_after("key") == 0
+    clock.now += 10
+    throttle.record_failure("key")
+    assert throttle.retry_after("key") == 50
+    clock.now += 51
+    assert throttle.retry_after("key") == 0
+
+
+def test_failed_logins_do_not_lock_out_the_account_for_other_clients(client):
+    credentials = {"username": "admin", "password": "wrong"}
+    try:
+        statuses = [client.post("/api/auth/login", json=credentials).status_code
+                    for _ in range(auth.MAX_FAILED_LOGINS_PER_USER + 1)]
+        assert statuses[-1] == 429 and set(statuses[:-1]) == {401}
+
+        # The same username from another address is not throttled
+        assert auth.user_login_throttle.retry_after(("admin", "203.0.113.9")) == 0
+    finally:
+        auth.user_login_throttle.reset(("admin", "testclient"))
+        auth.client_login_throttle.reset("testclient")
+    assert client.post("/api/auth/login", json={"username": "admin", "password": "admin"}).status_code == 200
+
+
+def test_token_cache_honours_expiry_ttl_and_size(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(auth.time, "time", clock)
+    cache = auth.TokenCache(maxsize=2, max_ttl=300)
+    user = object()
+
+    cache.put("short", user, exp=clock.now + 10)
+    cache.put("long", user, exp=clock.now + 3600)
+    clock.now += 11
+    assert cache.get("short") is None
+    assert cache.get("long") is user
+    clock.now += 300
+    # Re-verified after max_ttl even though the token itself is still valid
+    assert cache.get("long") is None
+
+    for token in ("a", "b", "c"):
+        cache.put(token, user, exp=clock.now + 60)
+    assert cache.get("a") is None and cache.get("b") is user and cache.get("c") is user
+
+
+def test_tokens_are_verified_once_until_they_leave_the_cache(client, admin_headers, monkeypatch):
+    calls = []
+    verify_token = auth.verify_token
+
+    async def counting_verify_token(token):
+        calls.append(token)
+        return await verify_token(token)
+
+    monkeypatch.setattr(auth, "verify_token", counting_verify_token)
+    auth.token_cache.clear()
+    for _ in range(3):
+        assert client.get("/api/auth/profile", headers=admin_headers).json()["username"] == "admin"
+    assert len(calls) == 1
+
+    auth.token_cache.clear()
+    assert client.get("/api/auth/profile", headers=admin_headers).status_code == 200
+    assert len(calls) == 2
+
+
+def test_invalid_and_expired_tokens_are_rejected(client):
+    expired = auth.create_access_token({"sub": "admin"}, expires_delta=timedelta(seconds=-1))
+    for token in ("garbage", expired):
+        response = client.get("/api/auth/profile", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 401
@@ -0,0 +1,147 @@
+import asyncio
+
+
+def feed(feed_id: str, **fields) -> dict:
+    return {"id": feed_id, "name": feed_id, "source": "Test", "description": "Test feed",
+            "lastUpdated": "2024-01-01T00:00:00", **fields}
+
+
+def test_document_repository_round_trip(open_repositories):
+    async def scenario():
+        async with open_repositories() as repositories:
+            documents = repositories.feeds
+            for n in range(5):
+                assert await documents.create(feed(f"feed-{n}"))
+            assert not await documents.create(feed("feed-0"))
+            assert await documents.count() == 5
+
+            # An update keeps the position and the storage key, whatever id the document claims
+            assert await documents.update("feed-2", feed("feed-x", name="renamed"))
+            assert not await documents.update("missing", feed("missing"))
+            assert (await documents.get("feed-2"))["name"] == "renamed"
+            assert (await documents.get("feed-2"))["id"] == "feed-2"
+            assert await documents.get("feed-x") is None
+
+            assert await documents.delete("feed-1")
+            assert not await documents.delete("feed-1")
+
+            seen, after = [], None
+            while True:
+                page, after = await documents.list_page(2, after=after)
+                seen += [d["id"] for d in page]
+                if after is None:
+                    break
+            assert seen == ["feed-0", "feed-2", "feed-3", "feed-4"]
+            assert [d["id"] for d in (await documents.list_page())[0]] == seen
+
+    asyncio.run(scenario())
+
+
+def test_put_rejects_a_body_id_that_differs_from_the_url(client, admin_headers):
+    response = client.put("/api/feeds/feed-2", json=feed("feed-x"), headers=admin_headers)
+    assert response.status_code == 400
+    assert client.get("/api/feeds/feed-x", headers=admin_headers).status_code == 404
+    assert client.get("/api/feeds/", params={"limit": 1}, headers=admin_headers).status_code == 200
+
+    report = client.get("/api/reports/report-1", headers=admin_headers).json()
+    response = client.put("/api/reports/report-1", json={**report, "id": "report-zz"}, headers=admin_headers)
+    assert response.status_code == 400
+    assert client.get("/api/reports/report-1", headers=admin_headers).json()["id"] == "report-1"
+    assert [r["id"] for r in client.get("/api/reports/", headers=admin_headers).json()].count("report-zz") == 0
+
+
+def test_document_version_moves_on_every_write(open_repositories):
+    async def scenario():
+        async with open_repositories() as repositories:
+            documents = repositories.reports
+            versions = [await documents.version()]
+            for write in (
+                documents.create(feed("report-a")),
+                documents.update("report-a", feed("report-a", name="renamed")),
+                documents.delete("report-a"),
+            ):
+                assert await write
+                versions.append(await documents.version())
+            assert len(set(versions)) == 4
+
+            # Writes that change nothing keep it
+            await documents.create(feed("report-b"))
+            before = await documents.version()
+            assert not await documents.create(feed("report-b"))
+            assert not await documents.update("missing", feed("missing"))
+            assert not await documents.delete("missing")
+            assert await documents.version() == before
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_document_version_is_shared_between_workers(tmp_path):
+    from app.repositories.sqlite import SQLiteRepositories
+
+    async def scenario():
+        url = f"sqlite:///{tmp_path}/shared.db"
+        first, second = SQLiteRepositories(url), SQLiteRepositories(url)
+        await first.open()
+        await second.open()
+        try:
+            before = await second.feeds.version()
+            assert await first.feeds.create(feed("feed-new"))
+            assert await second.feeds.version() != before
+        finally:
+            await first.close()
+            await second.close()
+
+    asyncio.run(scenario())
+
+
+def test_cached_feed_list_follows_writes_made_elsewhere(client, admin_headers):
+    from app.repositories import repositories
+
+    listed = client.get("/api/feeds/", headers=admin_headers)
+    assert client.get("/api/feeds/", headers=admin_headers).headers["etag"] == listed.headers["etag"]
+    # As another worker would: straight to the repository, not through this worker's handlers
+    asyncio.run(repositories.feeds.create(feed("feed-elsewhere")))
+    try:
+        relisted = client.get("/api/feeds/", headers=admin_headers)
+        assert relisted.headers["etag"] != listed.headers["etag"]
+        assert "feed-elsewhere" in [f["id"] for f in relisted.json()]
+    finally:
+        asyncio.run(repositories.feeds.delete("feed-elsewhere"))
+
+
+def test_feed_list_pages_add_up_to_the_whole_list(client, admin_headers):
+    everything = client.get("/api/feeds/", headers=admin_headers).json()
+    assert len(everything) > 2
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/api/feeds/", params=params, headers=admin_headers)
+        seen += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert [f["id"] for f in seen] == [f["id"] for f in everything]
+
+
+def test_report_create_moves_past_an_id_taken_in_the_meantime(client, admin_headers, monkeypatch):
+    from app.repositories import repositories
+
+    async def stale_count():
+        return 0
+
+    async def not_there_yet(key):
+        return None
+
+    # As if another create stored its report between this one's probe and its write
+    monkeypatch.setattr(repositories.reports, "count", stale_count)
+    monkeypatch.setattr(repositories.reports, "get", not_there_yet)
+    body = {"name": "Race", "description": "d", "format": "text", "content": "c", "createdBy": "admin"}
+    created = [client.post("/api/reports/", json=body, headers=admin_headers).json()["id"] for _ in range(2)]
+    monkeypatch.undo()
+    try:
+        assert len(set(created)) == 2
+        for report_id in created:
+            assert client.get(f"/api/reports/{report_id}", headers=admin_headers).json()["name"] == "Race"
+    finally:
+        for report_id in created:
+            client.delete(f"/api/reports/{report_id}", headers=admin_headers)
@@ -0,0 +1,135 @@
+import csv
+import gzip
+import io
+import json
+import re
+import time
+
+import pytest
+
+from app.export import CSV_COLUMNS, csv_chunks, export_chunks, gzip_chunks, json_chunks, pdf_chunks
+from app.store import IndicatorRecord
+
+REPORT = {"id": "report-x", "name": "Export (test)", "description": "All indicators", "createdAt": "2024-01-01",
+          "createdBy": "admin", "format": "csv", "content": ""}
+
+
+def records(count: int):
+    return [
+        IndicatorRecord(f"i-{n}", "Domain", f"host-{n}.example, \"quoted\"", "OTX", 0.5, 86400.0 * n,
+                        ("apt", "c2") if n % 2 else (), "line\nbreak" if n % 3 == 0 else None)
+        for n in range(count)
+    ]
+
+
+def test_csv_rows_survive_small_chunks():
+    chunks = list(csv_chunks(records(200), chunk_size=256))
+    assert len(chunks) > 10
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == CSV_COLUMNS
+    assert [row[0] for row in rows[1:]] == [f"i-{n}" for n in range(200)]
+    assert rows[2][2] == 'host-1.example, "quoted"' and rows[2][6] == "apt;c2"
+
+
+def test_json_document_parses_whole_across_chunks():
+    chunks = list(json_chunks(REPORT, records(200), chunk_size=256))
+    assert len(chunks) > 10
+    document = json.loads(b"".join(chunks))
+    assert document["report"] == REPORT
+    assert document["indicators"] == [r.to_dict() for r in records(200)]
+    assert json.loads(b"".join(json_chunks(REPORT, [])))["indicators"] == []
+
+
+def test_pdf_cross_reference_table_points_at_its_objects():
+    pdf = b"".join(pdf_chunks(REPORT, records(300)))
+    assert pdf.startswith(b"%PDF-") and pdf.rstrip().endswith(b"%%EOF")
+    startxref = int(re.search(rb"startxref\s+(\d+)", pdf).group(1))
+    assert pdf[startxref:].startswith(b"xref")
+    offsets = [int(entry) for entry in re.findall(rb"(\d{10}) 00000 n", pdf[startxref:])]
+    for number, offset in enumerate(offsets, start=1):
+        assert pdf[offset:].startswith(f"{number} 0 obj".encode())
+    # 300 rows do not fit on one page
+    assert len(re.findall(rb"/Type /Page\b", pdf)) > 1
+
+
+def test_gzip_stream_decompresses_to_the_export():
+    plain = b"".join(export_chunks("csv", REPORT, records(50)))
+    assert gzip.decompress(b"".join(gzip_chunks(export_chunks("csv", REPORT, records(50))))) == plain
+    with pytest.raises(ValueError):
+        export_chunks("xml", REPORT, [])
+
+
+def test_artifact_cache_hits_misses_and_evicts(tmp_path):
+    from app.export import ArtifactCache, ArtifactKey
+
+    cache = ArtifactCache(str(tmp_path), max_bytes=250)
+    cache.open()
+    first, second, third = (ArtifactKey(f"report-{n}", "csv", "1-1") for n in range(3))
+    assert cache.get(first) is None
+    assert cache.put(first, [b"a" * 100]) == 100
+    cache.put(second, [b"b" * 100])
+    with cache.get(first) as file:
+        assert file.read() == b"a" * 100
+    # `first` was used last, so `second` goes
+    cache.put(third, [b"c" * 100])
+    assert cache.get(second) is None and cache.size == 200
+
+    # A download abandoned part-way stores nothing
+    stream = cache.tee(ArtifactKey("report-9", "csv", "1-1"), iter([b"x" * 10, b"y" * 10]))
+    next(stream)
+    stream.close()
+    assert cache.size_of(ArtifactKey("report-9", "csv", "1-1")) is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([first.filename, third.filename])
+
+    # Another worker's index is rebuilt from the directory
+    reopened = ArtifactCache(str(tmp_path), max_bytes=250)
+    reopened.open()
+    assert reopened.size_of(third) == 100
+    reopened.discard_report("report-0")
+    assert cache.get(first) is None
+
+
+@pytest.fixture
+def report_cache(tmp_path, monkeypatch):
+    from app.export import artifact_cache
+
+    monkeypatch.setattr(artifact_cache, "directory", str(tmp_path))
+    artifact_cache.open()
+    yield artifact_cache
+    monkeypatch.undo()
+    artifact_cache.open()
+
+
+def test_export_is_served_from_the_cache_until_the_data_changes(client, admin_headers, report_cache):
+    def export(**params):
+        return client.get("/api/reports/report-1/export", params={"format": "csv", **params}, headers=admin_headers)
+
+    miss, hit = export(), export()
+    assert (miss.headers["x-cache"], hit.headers["x-cache"]) == ("MISS", "HIT")
+    assert hit.content == miss.content and hit.headers["content-length"] == str(len(miss.content))
+    compressed = export(gzip="true")
+    assert compressed.headers["content-encoding"] == "gzip" and compressed.content == miss.content
+
+    indicator = {"id": "export-new", "type": "IP", "value": "203.0.113.77", "source": "Test", "confidence": 0.5,
+                 "timestamp": "2024-01-01T00:00:00", "tags": []}
+    client.post("/api/indicators/bulk", content=json.dumps(indicator), headers=admin_headers)
+    fresh = export()
+    assert fresh.headers["x-cache"] == "MISS" and b"export-new" in fresh.content
+
+
+def test_report_job_renders_once_then_completes_from_the_cache(client, admin_headers, report_cache):
+    def run_job():
+        job = client.post("/api/reports/report-1/jobs", params={"format": "json"}, headers=admin_headers).json()
+        for _ in range(200):
+            job = client.get(f"/api/reports/jobs/{job['id']}", headers=admin_headers).json()
+            if job["status"] in ("completed", "failed"):
+                return job
+            time.sleep(0.01)
+        raise AssertionError("the job did not finish")
+
+    rendered, reused = run_job(), run_job()
+    assert rendered["status"] == reused["status"] == "completed"
+    assert (rendered["cached"], reused["cached"]) == (False, True)
+    assert rendered["size"] == reused["size"] > 0
+    export = client.get("/api/reports/report-1/export", params={"format": "json"}, headers=admin_headers)
+    assert export.headers["x-cache"] == "HIT" and len(export.content) == rendered["size"]
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.ingest.pipeline import FeedIngestor
+from app.repositories import repositories
+from app.routes import feeds
+
+
+def feed_document(feed_id: str, **fields) -> dict:
+    return {
+        "id": feed_id, "name": feed_id, "source": "Test", "description": "Test feed",
+        "lastUpdated": "2024-01-01T00:00:00", **fields,
+    }
+
+
+@pytest.fixture
+def feed_server(monkeypatch):
+    """Installs an ingestor whose feeds are served in-process; yields the times each was requested."""
+    requested = []
+
+    def handler(request):
+        requested.append(time.monotonic())
+        items = [{"type": "IP", "value": f"10.9.0.{n}", "timestamp": "2024-01-01T00:00:00", "tags": []} for n in range(5)]
+        return httpx.Response(200, json=items)
+
+    ingestor = FeedIngestor(
+        repositories.indicators, links=repositories.feed_indicators,
+        client_factory=lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(feeds, "_feed_ingestor", ingestor)
+    yield requested
+
+
+def test_feed_rate_limit_applies_to_ingestion(client, admin_headers, feed_server):
+    document = feed_document("feed-rate", url="http://feeds.test/rate", rateLimit=2)
+    assert client.post("/api/feeds/", json=document, headers=admin_headers).json()["rateLimit"] == 2
+    try:
+        for _ in range(2):
+            response = client.post("/api/feeds/ingest", params={"feed_id": "feed-rate"}, headers=admin_headers)
+            assert response.status_code == 200
+            assert response.json()[0]["status"] in ("updated", "not_modified")
+        assert len(feed_server) == 2
+        assert feed_server[1] - feed_server[0] >= 0.45
+    finally:
+        client.delete("/api/feeds/feed-rate", headers=admin_headers)
+
+
+def test_feed_rate_limit_must_not_be_negative(client, admin_headers):
+    response = client.post("/api/feeds/", json=feed_document("feed-bad", rateLimit=-1), headers=admin_headers)
+    assert response.status_code == 422
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    """An NDJSON body that drops the connection after `fail_after` lines."""
+
+    def __init__(self, lines, fail_after=None):
+        self.lines, self.fail_after = lines, fail_after
+
+    async def __aiter__(self):
+        for n, line in enumerate(self.lines):
+            if n == self.fail_after:
+                raise httpx.ReadError("connection reset")
+            yield line
+
+
+def test_retry_after_a_broken_stream_stores_every_indicator():
+    from app.repositories import MemoryIndicatorRepository
+    from app.ingest.pipeline import FeedSource
+    from app.store import IndicatorStore
+
+    lines = [json.dumps({"type": "IP", "value": f"10.8.0.{n}"}).encode() + b"\n" for n in range(10)]
+    lines.append(lines[0])
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        stream = BrokenStream(lines, fail_after=5 if len(attempts) == 1 else None)
+        return httpx.Response(200, headers={"Content-Type": "application/x-ndjson"}, stream=stream)
+
+    async def scenario():
+        repository = MemoryIndicatorRepository(IndicatorStore())
+        ingestor = FeedIngestor(repository, batch_size=3, backoff_base=0,
+                                client_factory=lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+        [stats] = await ingestor.run([FeedSource("feed-broken", "http://feeds.test/broken", "Test")])
+        assert (stats.status, stats.attempts) == ("updated", 2)
+        assert (stats.received, stats.ingested, stats.duplicates) == (11, 10, 1)
+        assert await repository.count() == 10
+
+    asyncio.run(scenario())
+
+
+def test_retry_after_is_capped():
+    ingestor = FeedIngestor(repositories.indicators, backoff_base=1, max_backoff=5)
+    assert ingestor._backoff(0, "86400") == 5
+    assert ingestor._backoff(10, None) <= 7.5
+
+
+def test_put_replaces_the_feeds_indicator_set(client, admin_headers):
+    def embedded(indicator_id: str, value: str) -> dict:
+        return {"id": indicator_id, "type": "IP", "value": value, "source": "Test", "confidence": 0.5,
+                "timestamp": "2024-01-01T00:00:00", "tags": []}
+
+    def linked() -> list:
+        return [i["id"] for i in client.get("/api/feeds/feed-put/indicators", headers=admin_headers).json()]
+
+    document = feed_document("feed-put", indicators=[embedded("put-1", "10.7.0.1"), embedded("put-2", "10.7.0.2")])
+    assert client.post("/api/feeds/", json=document, headers=admin_headers).json()["indicatorCount"] == 2
+    try:
+        document["indicators"] = [embedded("put-2", "10.7.0.2"), embedded("put-3", "10.7.0.3")]
+        updated = client.put("/api/feeds/feed-put", json=document, headers=admin_headers).json()
+        assert (updated["indicatorCount"], updated["typeCounts"]) == (2, {"IP": 2})
+        assert linked() == ["put-2", "put-3"]
+        # Summaries carry the counts, not the indicators
+        [summary] = [f for f in client.get("/api/feeds/", headers=admin_headers).json() if f["id"] == "feed-put"]
+        assert "indicators" not in summary and summary["indicatorCount"] == 2
+
+        document["indicators"] = []
+        assert client.put("/api/feeds/feed-put", json=document, headers=admin_headers).json()["indicatorCount"] == 0
+        assert linked() == []
+        # The indicators themselves are kept; only the feed's links go
+        assert client.get("/api/indicators/put-1", headers=admin_headers).status_code == 200
+    finally:
+        client.delete("/api/feeds/feed-put", headers=admin_headers)
@@ -0,0 +1,114 @@
+import asyncio
+import random
+
+from app.repositories.base import IndicatorFilters
+from app.store import IndicatorRecord, IndicatorStore
+from test_indicator_store import make_record, random_filters
+
+
+def make_corpus(rng: random.Random):
+    records = [make_record(rng, f"i-{n}") for n in range(300)]
+    # Values the matching indexes pick up
+    records += [
+        IndicatorRecord("net-8", "IP", "10.0.0.0/8", "MISP", 0.9, 10.0, ("c2",)),
+        IndicatorRecord("net-24", "IP", "10.1.2.0/24", "OTX", 0.8, 20.0, ("c2",)),
+        IndicatorRecord("host", "IP", "10.1.2.3", "OTX", 0.7, 30.0, ("c2", "apt")),
+        IndicatorRecord("dom", "Domain", "evil.com", "Internal", 0.6, 40.0, ("apt",)),
+        IndicatorRecord("sub", "Domain", "www.evil.com", "Internal", 0.5, 50.0, ("apt",)),
+    ]
+    return records
+
+
+async def walk(repository, filters: IndicatorFilters, limit: int):
+    seen, after = [], None
+    while True:
+        page, after = await repository.search_page(filters, limit, after=after)
+        seen += page
+        if after is None:
+            return seen
+
+
+def test_indicator_repository_matches_the_store(open_repositories):
+    rng = random.Random(7)
+    records = make_corpus(rng)
+    reference = IndicatorStore()
+    reference.add_many(records)
+
+    async def scenario():
+        async with open_repositories() as repositories:
+            indicators = repositories.indicators
+            empty = await indicators.version()
+            await indicators.add_many(records)
+            assert await indicators.version() != empty
+            assert await indicators.count() == len(reference)
+
+            for _ in range(30):
+                filters = random_filters(rng)
+                expected = [r.id for r in reference.search(**filters)]
+                assert [r.id for r in await indicators.search(IndicatorFilters(**filters))] == expected
+                assert [r.id for r in await walk(indicators, IndicatorFilters(**filters), 17)] == expected
+                aggregates = await indicators.aggregate(IndicatorFilters(**filters))
+                assert aggregates == reference.aggregate(**filters)
+
+            assert (await indicators.get("i-5")).to_dict() == reference.get("i-5").to_dict()
+            assert await indicators.get("missing") is None
+            assert {r.id for r in await indicators.get_many(["i-1", "missing", "host"])} == {"i-1", "host"}
+            assert await indicators.find_ids([("IP", "10.1.2.3"), ("Domain", "10.1.2.3")]) == {("IP", "10.1.2.3"): "host"}
+
+            looked_up = await indicators.lookup(["evil.com", "nothing.example"])
+            assert {v: [r.id for r in rs] for v, rs in looked_up.items()} == {"evil.com": ["dom"]}
+            covered = await indicators.covering(["10.1.2.3", "10.9.0.1", "a.www.evil.com", "192.0.2.1"])
+            assert {v: [r.id for r in rs] for v, rs in covered.items()} == {
+                "10.1.2.3": ["net-8", "net-24", "host"],
+                "10.9.0.1": ["net-8"],
+                "a.www.evil.com": ["dom", "sub"],
+            }
+
+            for indicator_id in ("host", "i-3", "i-42"):
+                assert {r.id for r in await indicators.related(indicator_id, limit=1000)} == \
+                    {r.id for r in reference.related(indicator_id, limit=1000)}
+
+            before = await indicators.version()
+            assert await indicators.delete("net-24")
+            assert not await indicators.delete("net-24")
+            assert await indicators.version() != before
+            covered = await indicators.covering(["10.1.2.3"])
+            assert [r.id for r in covered["10.1.2.3"]] == ["net-8", "host"]
+            reference.remove("net-24")
+            assert [r.id for r in await indicators.search(IndicatorFilters())] == [r.id for r in reference.search()]
+
+    asyncio.run(scenario())
+
+
+def test_indicators_sharing_a_value_are_all_found(open_repositories):
+    shared = [
+        IndicatorRecord("a", "IP", "192.0.2.10", "MISP", 0.5, 10.0, ()),
+        IndicatorRecord("b", "IP", "192.0.2.10", "OTX", 0.6, 20.0, ()),
+        IndicatorRecord("c", "URL", "192.0.2.10", "OTX", 0.7, 30.0, ()),
+        IndicatorRecord("d", "IP", "192.0.2.11", "OTX", 0.7, 30.0, ()),
+    ]
+
+    async def scenario():
+        async with open_repositories() as repositories:
+            indicators = repositories.indicators
+            await indicators.add_many(shared)
+
+            async def ids(method, values):
+                return {v: [r.id for r in rs] for v, rs in (await method(values)).items()}
+
+            assert await ids(indicators.lookup, ["192.0.2.10"]) == {"192.0.2.10": ["a", "b", "c"]}
+            assert await indicators.find_ids([("IP", "192.0.2.10")]) == {("IP", "192.0.2.10"): "b"}
+
+            assert await indicators.delete("b")
+            assert await ids(indicators.lookup, ["192.0.2.10"]) == {"192.0.2.10": ["a", "c"]}
+            assert await ids(indicators.covering, ["192.0.2.10"]) == {"192.0.2.10": ["a"]}
+            assert await indicators.find_ids([("IP", "192.0.2.10")]) == {("IP", "192.0.2.10"): "a"}
+
+            # Re-adding moves an id to the end
+            await indicators.add_many([shared[0]])
+            assert await ids(indicators.lookup, ["192.0.2.10"]) == {"192.0.2.10": ["c", "a"]}
+            assert await indicators.delete("a") and await indicators.delete("c")
+            assert await indicators.lookup(["192.0.2.10"]) == {}
+            assert await indicators.find_ids([("IP", "192.0.2.10")]) == {}
+
+    asyncio.run(scenario())
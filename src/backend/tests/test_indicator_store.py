@@ -0,0 +1,143 @@
+import random
+
+import pytest
+
+from app.store import IndicatorRecord, IndicatorStore
+
+TYPES = ["IP", "Domain", "URL", "Hash"]
+SOURCES = ["MISP", "OTX", "Internal"]
+TAGS = ["apt", "ransomware", "phishing", "botnet", "c2"]
+WORDS = ["payload", "beacon", "dropper", "loader", None]
+
+
+def make_record(rng: random.Random, indicator_id: str) -> IndicatorRecord:
+    return IndicatorRecord(
+        indicator_id,
+        rng.choice(TYPES),
+        f"value-{rng.randrange(50)}.example",
+        rng.choice(SOURCES),
+        round(rng.random(), 2),
+        float(rng.randrange(1000)),
+        tuple(rng.sample(TAGS, rng.randrange(3))),
+        rng.choice(WORDS),
+    )
+
+
+def linear_search(records, type=None, source=None, min_confidence=None, tags=None, search_term=None,
+                  since=None, until=None):
+    term = search_term.lower() if search_term else None
+    return [
+        r for r in records
+        if (not type or r.type == type)
+        and (not source or r.source == source)
+        and (min_confidence is None or r.confidence >= min_confidence)
+        and (not tags or set(tags) & set(r.tags))
+        and (not term or term in r.value.lower() or term in (r.description or "").lower())
+        and (since is None or r.timestamp >= since)
+        and (until is None or r.timestamp <= until)
+    ]
+
+
+def random_filters(rng: random.Random) -> dict:
+    filters = {}
+    if rng.random() < 0.3:
+        filters["type"] = rng.choice(TYPES)
+    if rng.random() < 0.3:
+        filters["source"] = rng.choice(SOURCES)
+    if rng.random() < 0.4:
+        filters["min_confidence"] = round(rng.random(), 2)
+    if rng.random() < 0.3:
+        filters["tags"] = rng.sample(TAGS, rng.randint(1, 2))
+    if rng.random() < 0.3:
+        filters["search_term"] = rng.choice(["value-1", "LOAD", "ex", "beacon"])
+    if rng.random() < 0.3:
+        filters["since"] = float(rng.randrange(500))
+    if rng.random() < 0.3:
+        filters["until"] = float(rng.randrange(500, 1000))
+    return filters
+
+
+def expected_records(operations):
+    """Replays adds and removals into a plain insertion-ordered dict; a re-added id moves to the end."""
+    records = {}
+    for op, value in operations:
+        records.pop(value if op == "remove" else value.id, None)
+        if op == "add":
+            records[value.id] = value
+    return list(records.values())
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_search_matches_linear_scan(seed):
+    rng = random.Random(seed)
+    store = IndicatorStore()
+    operations = []
+    for _ in range(6):
+        # Batches repeat ids within themselves and across batches
+        batch = [make_record(rng, f"i-{rng.randrange(300)}") for _ in range(150)]
+        store.add_many(batch)
+        operations += [("add", record) for record in batch]
+        for _ in range(20):
+            indicator_id = f"i-{rng.randrange(300)}"
+            store.remove(indicator_id)
+            operations.append(("remove", indicator_id))
+        record = make_record(rng, f"i-{rng.randrange(300)}")
+        store.add(record)
+        operations.append(("add", record))
+
+    live = expected_records(operations)
+    assert len(store) == len(live)
+    for _ in range(200):
+        filters = random_filters(rng)
+        assert [r.id for r in store.search(**filters)] == [r.id for r in linear_search(live, **filters)], filters
+
+
+def test_repeated_id_in_one_batch_keeps_only_the_last_copy():
+    store = IndicatorStore()
+    first = IndicatorRecord("a", "IP", "1.2.3.4", "MISP", 0.9, 100.0, ("apt",))
+    second = IndicatorRecord("a", "IP", "1.2.3.4", "MISP", 0.1, 200.0, ("apt",))
+    store.add_many([first, second])
+
+    assert store.search(min_confidence=0.5) == []
+    assert store.search(until=150.0) == []
+    assert store.search(min_confidence=0.05) == [second]
+    assert len(store._confidence) == len(store._timestamp) == 1
+
+    store.remove("a")
+    assert len(store) == 0
+    assert len(store._confidence) == len(store._timestamp) == 0
+
+
+def test_add_many_then_remove_round_trip():
+    rng = random.Random(7)
+    store = IndicatorStore(relation_graph=True)
+    records = [make_record(rng, f"i-{n}") for n in range(500)]
+    store.add_many(records)
+    assert [r.id for r in store.search()] == [r.id for r in records]
+    assert store.lookup([records[0].value])[records[0].value]
+
+    for record in records:
+        assert store.remove(record.id) is record
+    assert len(store) == 0
+    assert store.search() == []
+    assert store.search(min_confidence=0.0, since=0.0) == []
+    assert store.lookup([r.value for r in records]) == {}
+    assert sum(store.aggregate().by_type.values()) == 0
+    assert len(store._confidence) == len(store._timestamp) == len(store._order) == 0
+
+
+@pytest.mark.parametrize("fanout", [3, 20, 1000])
+def test_relation_graph_matches_tag_postings(fanout):
+    rng = random.Random(fanout)
+    plain, graph = IndicatorStore(), IndicatorStore(relation_graph=True, graph_fanout=fanout)
+    records = [make_record(rng, f"i-{n}") for n in range(200)]
+    for store in (plain, graph):
+        store.add_many(records[:100])
+        for record in records[100:]:
+            store.add(record)
+        for n in range(0, 200, 9):
+            store.remove(f"i-{n}")
+    for n in range(1, 200, 3):
+        for depth in (1, 2):
+            expected = [r.id for r in plain.related(f"i-{n}", limit=20, depth=depth)]
+            assert [r.id for r in graph.related(f"i-{n}", limit=20, depth=depth)] == expected
@@ -0,0 +1,81 @@
+import gzip
+import json
+
+
+def indicator(indicator_id: str, **fields) -> dict:
+    return {"id": indicator_id, "type": "IP", "value": "192.0.2.1", "source": "Bulk", "confidence": 0.5,
+            "timestamp": "2024-01-01T00:00:00", "tags": ["bulk"], **fields}
+
+
+def ndjson(*items) -> bytes:
+    return b"".join(json.dumps(item).encode() + b"\n" if isinstance(item, dict) else item for item in items)
+
+
+def test_bulk_ingest_accepts_valid_lines_and_reports_bad_ones(client, admin_headers):
+    body = ndjson(
+        indicator("bulk-1"),
+        indicator("bulk-2", value=" 192.0.2.2 "),
+        indicator("bulk-nan", confidence="NaN"),
+        indicator("bulk-high", confidence=1.5),
+        indicator("bulk-blank", value="  "),
+        b"{not json\n",
+        indicator("bulk-3", type="Domain", value="bulk.example"),
+    )
+    response = client.post("/api/indicators/bulk", content=gzip.compress(body),
+                           headers={**admin_headers, "Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["received"], result["accepted"], result["rejected"]) == (7, 3, 4)
+    assert [error["line"] for error in result["errors"]] == [3, 4, 5, 6]
+
+    assert client.get("/api/indicators/bulk-2", headers=admin_headers).json()["value"] == "192.0.2.2"
+    for rejected in ("bulk-nan", "bulk-high", "bulk-blank"):
+        assert client.get(f"/api/indicators/{rejected}", headers=admin_headers).status_code == 404
+
+
+def test_bulk_ingest_rejects_a_broken_gzip_body(client, admin_headers):
+    body = gzip.compress(ndjson(indicator("bulk-truncated")))[:-8]
+    response = client.post("/api/indicators/bulk", content=body, headers={**admin_headers, "Content-Encoding": "gzip"})
+    assert response.status_code == 400
+
+
+def seed(client, headers, tag: str, count: int):
+    """Bulk-loads `count` indicators carrying `tag`, so a search on it sees only this test's data."""
+    body = ndjson(*(indicator(f"{tag}-{n}", value=f"198.51.100.{n}", confidence=round(n / count, 2), tags=[tag])
+                    for n in range(count)))
+    assert client.post("/api/indicators/bulk", content=body, headers=headers).json()["accepted"] == count
+
+
+def walk(client, headers, path: str, body: dict, limit: int, **params) -> list:
+    items, cursor = [], None
+    while True:
+        query = {"limit": limit, **params, **({"cursor": cursor} if cursor else {})}
+        response = client.post(path, params=query, json=body, headers=headers)
+        assert response.status_code == 200
+        if params.get("format") == "ndjson":
+            items += [json.loads(line) for line in response.text.splitlines()]
+        else:
+            items += response.json()
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items
+
+
+def test_search_pages_add_up_to_the_unpaged_result(client, admin_headers):
+    seed(client, admin_headers, "paging", 23)
+    filters = {"tags": ["paging"], "confidence": 0.2}
+    everything = client.post("/api/indicators/search", json=filters, headers=admin_headers).json()
+    assert len(everything) == 18
+    assert walk(client, admin_headers, "/api/indicators/search", filters, 5) == everything
+    assert walk(client, admin_headers, "/api/indicators/search", filters, 18) == everything
+    assert walk(client, admin_headers, "/api/indicators/search", filters, 4, format="ndjson") == everything
+
+    streamed = client.post("/api/indicators/search", params={"format": "ndjson"}, json=filters, headers=admin_headers)
+    assert streamed.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in streamed.text.splitlines()] == everything
+
+
+def test_search_rejects_a_bad_cursor(client, admin_headers):
+    response = client.post("/api/indicators/search", params={"limit": 5, "cursor": "not-a-cursor"}, json={},
+                           headers=admin_headers)
+    assert response.status_code == 400
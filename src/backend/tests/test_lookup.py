@@ -0,0 +1,63 @@
+import json
+import random
+
+from app.repositories.value_filter import ValueFilter
+from app.store.bloom import BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    rng = random.Random(3)
+    bloom = BloomFilter(10000, error_rate=0.01)
+    stored = [f"stored-{rng.random()}" for _ in range(10000)]
+    bloom.update(stored)
+    assert all(value in bloom for value in stored)
+    assert not bloom.full
+    false_positives = sum(f"absent-{n}" in bloom for n in range(20000))
+    assert false_positives < 20000 * 0.02
+    bloom.add("stored-extra")
+    assert len(bloom) <= 10001
+
+
+def test_value_filter_catches_up_from_its_position_and_rebuilds_when_full():
+    rows = [(n, f"v{n}") for n in range(10)]
+    fetched = []
+
+    def fetch(after):
+        fetched.append(after)
+        return [row for row in rows if after is None or row[0] > after]
+
+    values = ValueFilter(min_capacity=8)
+    bloom = values.sync(fetch, lambda: len(rows))
+    assert all(f"v{n}" in bloom for n in range(10)) and values.position == 9
+    rows.append((10, "v10"))
+    assert "v10" in values.sync(fetch, lambda: len(rows))
+    assert fetched == [None, 9]
+
+    # Writes past `settled` may still appear out of order, so they are fetched again
+    values.sync(fetch, lambda: len(rows), settled=7)
+    assert values.position == 7
+
+    rows.extend((n, f"v{n}") for n in range(11, 40))
+    assert values.sync(fetch, lambda: len(rows)).full
+    rebuilt = values.sync(fetch, lambda: len(rows))
+    assert fetched[-1] is None and not rebuilt.full and "v39" in rebuilt
+
+
+def test_lookup_endpoint_matches_exact_values_once_each(client, admin_headers):
+    lines = [
+        {"id": f"lookup-{n}", "type": type, "value": value, "source": "Lookup", "confidence": 0.5,
+         "timestamp": "2024-01-01T00:00:00", "tags": []}
+        for n, (type, value) in enumerate([("IP", "198.18.0.1"), ("Hash", "d41d8cd98f00b204e9800998ecf8427e"),
+                                           ("IP", "198.18.0.1")])
+    ]
+    body = "\n".join(json.dumps(line) for line in lines)
+    assert client.post("/api/indicators/bulk", content=body, headers=admin_headers).json()["accepted"] == 3
+
+    values = ["198.18.0.1", " d41d8cd98f00b204e9800998ecf8427e ", "198.18.0.1", "198.18.0.2", ""]
+    result = client.post("/api/indicators/lookup", json={"values": values}, headers=admin_headers).json()
+    assert (result["received"], result["matched"]) == (5, 2)
+    matches = {match["value"]: [i["id"] for i in match["indicators"]] for match in result["matches"]}
+    assert matches == {"198.18.0.1": ["lookup-0", "lookup-2"], "d41d8cd98f00b204e9800998ecf8427e": ["lookup-1"]}
+
+    too_many = client.post("/api/indicators/lookup", json={"values": ["x"] * 50001}, headers=admin_headers)
+    assert too_many.status_code == 422
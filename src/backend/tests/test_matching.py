@@ -0,0 +1,97 @@
+import ipaddress
+import random
+
+import pytest
+
+from app.store import IndicatorRecord, IndicatorStore
+from app.store.matching import domain_labels, parse_prefix
+
+NAMES = ["com", "example", "evil", "www", "mail", "cdn", "a", "b"]
+
+
+def random_network(rng: random.Random) -> str:
+    if rng.random() < 0.7:
+        # Few distinct high octets, so blocks nest and overlap
+        address = ipaddress.IPv4Address(f"10.{rng.randrange(3)}.{rng.randrange(4)}.{rng.randrange(256)}")
+        length = rng.choice([8, 16, 20, 24, 28, 30, 32])
+    else:
+        address = ipaddress.IPv6Address(f"2001:db8:{rng.randrange(3):x}::{rng.randrange(65536):x}")
+        length = rng.choice([32, 48, 64, 112, 128])
+    network = ipaddress.ip_network(f"{address}/{length}", strict=False)
+    if length == network.max_prefixlen and rng.random() < 0.5:
+        return str(address)
+    # Host bits left set, as feeds send them
+    return f"{address}/{length}"
+
+
+def random_domain(rng: random.Random) -> str:
+    labels = [rng.choice(NAMES[1:]) for _ in range(rng.randrange(1, 4))] + ["com"]
+    name = ".".join(labels)
+    return rng.choice([name, name.upper(), f"*.{name}", f"{name}."])
+
+
+def brute_covering(records, observable: str):
+    """Covering indicators by comparing the observable with every record through ipaddress."""
+    try:
+        target = ipaddress.ip_network(observable, strict=False)
+    except ValueError:
+        target = None
+    found = []
+    if target is not None:
+        for r in records:
+            if r.type != "IP":
+                continue
+            network = ipaddress.ip_network(r.value, strict=False)
+            if network.version == target.version and target.subnet_of(network):
+                found.append((network.prefixlen, r.id))
+    else:
+        labels = domain_labels(observable)
+        for r in records:
+            parent = domain_labels(r.value) if r.type == "Domain" else None
+            if labels is not None and parent is not None and labels[:len(parent)] == parent:
+                found.append((len(parent), r.id))
+    return found
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_covering_matches_brute_force(seed):
+    rng = random.Random(seed)
+    records = {}
+    for n in range(400):
+        if rng.random() < 0.5:
+            record = IndicatorRecord(f"i-{n}", "IP", random_network(rng), "MISP", 0.5, 0.0, ())
+        else:
+            record = IndicatorRecord(f"i-{n}", "Domain", random_domain(rng), "MISP", 0.5, 0.0, ())
+        records[record.id] = record
+    store = IndicatorStore()
+    store.add_many(list(records.values()))
+    # Removals have to leave the tries as if the record had never been added
+    for indicator_id in rng.sample(sorted(records), 100):
+        store.remove(indicator_id)
+        del records[indicator_id]
+
+    observables = [random_network(rng) for _ in range(200)] + [random_domain(rng) for _ in range(200)]
+    observables += ["not a domain", "http://evil.com/x", "10.0.0.1/33", "1.2.3.4"]
+    found = store.covering(observables)
+    for observable in observables:
+        expected = brute_covering(records.values(), observable)
+        matches = found.get(observable, [])
+        assert sorted(r.id for r in matches) == sorted(i for _, i in expected), observable
+        # Broadest first
+        depth = {i: d for d, i in expected}
+        assert [depth[r.id] for r in matches] == sorted(depth[r.id] for r in matches)
+
+
+def test_parse_prefix_masks_host_bits():
+    assert parse_prefix("10.1.2.3/8") == (32, 10 << 24, 8)
+    assert parse_prefix("10.1.2.3") == (32, int(ipaddress.IPv4Address("10.1.2.3")), 32)
+    assert parse_prefix("2001:db8::1/32") == (128, int(ipaddress.IPv6Address("2001:db8::")), 32)
+    assert parse_prefix("10.0.0.0/33") is None
+    assert parse_prefix("example.com") is None
+
+
+def test_domain_labels():
+    assert domain_labels("WWW.Example.com.") == ["com", "example", "www"]
+    assert domain_labels("*.example.com") == ["com", "example"]
+    for value in ("1.2.3.4", "http://example.com", "a..com", "user@example.com", ""):
+        assert domain_labels(value) is None
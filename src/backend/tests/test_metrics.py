@@ -0,0 +1,37 @@
+import asyncio
+import re
+
+from fastapi import HTTPException, Request
+
+from app.routes import metrics
+
+
+def scrape(client, **headers):
+    return client.get("/api/metrics/", headers=headers)
+
+
+def test_metrics_need_an_admin_token(client, admin_headers):
+    assert scrape(client).status_code in (401, 403)
+    analyst = client.post("/api/auth/login", json={"username": "analyst", "password": "analyst"}).json()["token"]
+    assert scrape(client, Authorization=f"Bearer {analyst}").status_code == 403
+
+    response = scrape(client, **admin_headers)
+    assert response.status_code == 200
+    assert "tip_response_cache_hits_total" in response.text
+    assert re.search(r'^tip_http_request\w*\{[^}]*route="/api/metrics/"', response.text, re.M)
+
+
+def test_loopback_scrapes_without_a_token_only_when_enabled(monkeypatch):
+    def allowed(host: str) -> bool:
+        request = Request({"type": "http", "method": "GET", "path": "/api/metrics/", "headers": [],
+                           "client": (host, 50000)})
+        try:
+            asyncio.run(metrics.require_local_or_admin(request, None))
+        except HTTPException:
+            return False
+        return True
+
+    assert not allowed("127.0.0.1")
+    monkeypatch.setattr(metrics, "METRICS_LOOPBACK_SCRAPE", True)
+    assert allowed("127.0.0.1") and allowed("::1")
+    assert not allowed("203.0.113.5")
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from app.store import IndicatorRecord, IndicatorStore
+from app.store.ngram import NgramIndex
+
+ALPHABET = "abcAB.-"
+
+
+def random_text(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(12)))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_candidates_confirmed_by_contains_match_substring_search(seed):
+    rng = random.Random(seed)
+    index = NgramIndex()
+    texts = {}
+    for _ in range(600):
+        item_id = f"i-{rng.randrange(200)}"
+        if rng.random() < 0.2:
+            index.remove(item_id)
+            texts.pop(item_id, None)
+        else:
+            fields = [random_text(rng), random_text(rng) if rng.random() < 0.5 else None]
+            index.add(item_id, fields)
+            texts[item_id] = [field.lower() for field in fields if field]
+    assert len(index) == len(texts)
+
+    for _ in range(200):
+        term = random_text(rng).lower()[:rng.randrange(3, 6)]
+        candidates = index.candidates(term)
+        if len(term) < 3:
+            assert candidates is None
+            continue
+        found = {i for i in candidates if index.contains(i, term)}
+        assert found == {i for i, fields in texts.items() if any(term in field for field in fields)}
+
+
+def test_terms_do_not_match_across_fields():
+    index = NgramIndex()
+    index.add("a", ["evil", "corp"])
+    assert not {i for i in index.candidates("ilco") if index.contains(i, "ilco")}
+    assert index.candidates("evi") == {"a"}
+
+
+def test_store_search_term_covers_value_and_description():
+    store = IndicatorStore()
+    store.add_many([
+        IndicatorRecord("a", "Domain", "Login.Example.com", "OTX", 0.5, 0.0, (), "Phishing kit"),
+        IndicatorRecord("b", "Domain", "cdn.example.net", "OTX", 0.5, 0.0, (), None),
+    ])
+    assert [r.id for r in store.search(search_term="EXAMPLE")] == ["a", "b"]
+    assert [r.id for r in store.search(search_term="kit")] == ["a"]
+    # Too short for a trigram: falls back to a scan
+    assert [r.id for r in store.search(search_term="et")] == ["b"]
+    store.remove("a")
+    assert [r.id for r in store.search(search_term="phishing")] == []
@@ -0,0 +1,48 @@
+import json
+
+from app.response_cache import ResponseCache
+
+
+def test_matching_etag_gets_an_empty_304_until_the_data_changes(client, admin_headers):
+    first = client.get("/api/reports/", headers=admin_headers)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"]
+
+    for if_none_match in (etag, f"W/{etag}", f'"other", {etag}', "*"):
+        response = client.get("/api/reports/", headers={**admin_headers, "If-None-Match": if_none_match})
+        assert response.status_code == 304 and response.content == b""
+        assert response.headers["etag"] == etag
+    assert client.get("/api/reports/", headers={**admin_headers, "If-None-Match": '"other"'}).status_code == 200
+
+    body = {"name": "ETag", "description": "d", "format": "text", "content": "c", "createdBy": "admin"}
+    created = client.post("/api/reports/", json=body, headers=admin_headers).json()
+    try:
+        changed = client.get("/api/reports/", headers={**admin_headers, "If-None-Match": etag})
+        assert changed.status_code == 200 and changed.headers["etag"] != etag
+        assert created["id"] in [report["id"] for report in changed.json()]
+    finally:
+        client.delete(f"/api/reports/{created['id']}", headers=admin_headers)
+
+
+def test_visualization_etag_follows_indicator_writes(client, admin_headers):
+    query = {"fromDate": "2024-01-01", "toDate": "2024-01-31"}
+    etag = client.post("/api/visualization/", json=query, headers=admin_headers).headers["etag"]
+    cached = client.post("/api/visualization/", json=query, headers={**admin_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    indicator = {"id": "etag-new", "type": "IP", "value": "203.0.113.78", "source": "ETagTest", "confidence": 0.5,
+                 "timestamp": "2024-01-15T00:00:00", "tags": []}
+    client.post("/api/indicators/bulk", content=json.dumps(indicator), headers=admin_headers)
+    changed = client.post("/api/visualization/", json=query, headers={**admin_headers, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_entries_are_served_only_at_their_versions_and_evicted_oldest_first():
+    cache = ResponseCache(max_entries=2)
+    cache.store("a", ("1",), b"[1]", {})
+    assert cache.lookup("a", ("1",)).body == b"[1]"
+    assert cache.lookup("a", ("2",)) is None
+    cache.store("b", ("1",), b"[2]", {})
+    cache.lookup("a", ("1",))
+    cache.store("c", ("1",), b"[3]", {})
+    assert cache.lookup("b", ("1",)) is None and len(cache) == 2
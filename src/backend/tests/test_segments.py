@@ -0,0 +1,112 @@
+import asyncio
+
+from app.repositories import IndicatorFilters
+from app.repositories.memory import MemoryIndicatorRepository
+from app.store import IndicatorRecord, IndicatorStore, SegmentReader, SegmentStorage, SegmentWriter
+from app.store.segments import Segment, _write_entries, write_segment
+
+
+def record(indicator_id: str, confidence: float = 0.5, value: str = None) -> IndicatorRecord:
+    return IndicatorRecord(indicator_id, "IP", value or f"10.0.0.{indicator_id[-1]}", "MISP", confidence, 0.0, ("apt",))
+
+
+def test_repeated_ids_keep_the_newest_copy(tmp_path):
+    path = str(tmp_path / "one.tip")
+    write_segment(path, [record("a", 0.1), record("b"), record("a", 0.9)], deleted=["b"])
+    segment = Segment(path)
+    assert segment.count == 2
+    assert segment.lookup("a")[1].confidence == 0.9
+    assert segment.lookup("b") == (True, None)
+
+    # Segments written before ids were deduplicated may still repeat them
+    legacy = str(tmp_path / "legacy.tip")
+    _write_entries(legacy, [("a", record("a", 0.1), 0), ("c", record("c"), 0), ("a", record("a", 0.9), 0)])
+    segment = Segment(legacy)
+    assert segment.lookup("a")[1].confidence == 0.9
+    assert [(i, r.confidence) for i, r in segment] == [("c", 0.5), ("a", 0.9)]
+
+
+def test_compaction_keeps_the_newest_versions_and_tombstones(tmp_path):
+    writer = SegmentWriter(str(tmp_path))
+    writer.append([record("a", 0.1), record("b")])
+    writer.append([record("a", 0.9)], deleted=["b"])
+    assert writer.compact()
+    reader = SegmentReader(str(tmp_path))
+    assert [(r.id, r.confidence) for r in reader] == [("a", 0.9)]
+    assert reader.get("b") is None
+    ((_, segment),) = reader.since(0)
+    assert segment.read()[1] == ["b"]
+
+
+def open_worker(directory: str) -> MemoryIndicatorRepository:
+    storage = SegmentStorage()
+    storage.open(directory, compaction_interval=3600)
+    repository = MemoryIndicatorRepository(IndicatorStore(), storage)
+    asyncio.run(repository.open())
+    return repository
+
+
+def ids(repository: MemoryIndicatorRepository, **filters) -> list:
+    async def search():
+        await repository.sync(force=True)
+        return [r.id for r in await repository.search(IndicatorFilters(**filters))]
+    return asyncio.run(search())
+
+
+def test_workers_share_writes_through_segments(tmp_path):
+    directory = str(tmp_path)
+    first, second, lagging = open_worker(directory), open_worker(directory), open_worker(directory)
+    try:
+        asyncio.run(first.add_many([record("a"), record("b"), record("a", 0.9)]))
+        assert ids(first) == ["b", "a"]
+        assert ids(second, min_confidence=0.8) == ["a"]
+        assert ids(lagging) == ["b", "a"]
+
+        assert asyncio.run(second.delete("b"))
+        assert not asyncio.run(second.delete("missing"))
+        assert ids(first) == ["a"]
+
+        # Folding the segments into one neither re-applies what a worker has seen nor loses
+        # the deletion for a worker that has not seen it yet
+        asyncio.run(first.add_many([record("c")]))
+        assert first.segments.writer.compact()
+        asyncio.run(second.add_many([record("d")]))
+        assert ids(first) == ids(second) == ids(lagging) == ["a", "c", "d"]
+
+        # A restarted worker loads the directory
+        restarted = open_worker(directory)
+        assert ids(restarted) == ["a", "c", "d"]
+        restarted.segments.close()
+    finally:
+        for worker in (first, second, lagging):
+            worker.segments.close()
+
+
+def test_a_worker_behind_a_compaction_applies_only_what_it_has_not_seen(tmp_path):
+    directory = str(tmp_path)
+    writer, lagging = open_worker(directory), open_worker(directory)
+
+    async def version(worker):
+        await worker.sync(force=True)
+        return await worker.version()
+
+    try:
+        asyncio.run(writer.add_many([record("a"), record("b"), record("c")]))
+        assert asyncio.run(version(lagging)) == asyncio.run(version(writer)) == "3-3"
+        asyncio.run(writer.add_many([record("d")]))
+        asyncio.run(writer.delete("b"))
+        assert writer.segments.writer.compact()
+
+        ((_, segment),) = lagging.segments.since(0, force=True)
+        records, deleted = segment.read(after=1)
+        assert ([r.id for r in records], deleted) == (["d"], ["b"])
+        assert asyncio.run(version(lagging)) == asyncio.run(version(writer)) == "4-3"
+
+        # Same positions, so a cursor from one worker resumes at the same place on the other
+        async def first_page(worker):
+            page, after = await worker.search_page(IndicatorFilters(), 2)
+            return [r.id for r in page], after
+        assert asyncio.run(first_page(lagging)) == asyncio.run(first_page(writer)) == (["a", "c"], 2)
+    finally:
+        for worker in (writer, lagging):
+            worker.segments.close()
@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from app import serialization
+
+INDICATORS = [
+    {"id": f"fast-{n}", "type": "Domain", "value": f"fast-{n}.example", "source": "FastJSON",
+     "confidence": [0.1, 0.5, 1.0, 0.333][n % 4], "timestamp": f"2024-02-{n + 1:02d}T12:30:00+00:00",
+     "tags": ["fast", "shared"] if n % 2 else ["fast"], "description": [None, "Ümlaut – “quoted” ✓", "", "tab\t"][n % 4]}
+    for n in range(8)
+]
+
+
+@pytest.fixture(scope="module")
+def fast_indicators(client, admin_headers):
+    body = "\n".join(json.dumps(i, ensure_ascii=False) for i in INDICATORS).encode()
+    assert client.post("/api/indicators/bulk", content=body, headers=admin_headers).json()["accepted"] == len(INDICATORS)
+
+
+def responses(client, admin_headers, monkeypatch, fast: bool):
+    monkeypatch.setattr(serialization, "FAST_JSON", fast)
+    search = {"source": "FastJSON"}
+    requests = [
+        ("post", "/api/indicators/search", {"json": search}),
+        ("post", "/api/indicators/search", {"json": search, "params": {"limit": 3}}),
+        ("post", "/api/indicators/search", {"json": search, "params": {"format": "ndjson"}}),
+        ("post", "/api/indicators/search", {"json": search, "params": {"format": "ndjson", "limit": 3}}),
+        ("post", "/api/indicators/search", {"json": {"source": "nothing"}}),
+        ("get", "/api/indicators/fast-1", {}),
+        ("get", "/api/indicators/fast-1/related", {}),
+        ("post", "/api/indicators/lookup", {"json": {"values": ["fast-1.example", "fast-2.example", "none"]}}),
+        ("post", "/api/indicators/match", {"json": {"values": ["a.fast-3.example", "none.example"]}}),
+        ("get", "/api/feeds/feed-1/indicators", {"params": {"limit": 2}}),
+    ]
+    result = []
+    for method, path, kwargs in requests:
+        response = getattr(client, method)(path, headers=admin_headers, **kwargs)
+        assert response.status_code == 200, (path, response.text)
+        result.append((response.headers["content-type"], response.headers.get("x-next-cursor"), response.content))
+    return result
+
+
+def test_fast_path_sends_the_same_bytes_as_the_validated_path(client, admin_headers, fast_indicators, monkeypatch):
+    validated = responses(client, admin_headers, monkeypatch, fast=False)
+    fast = responses(client, admin_headers, monkeypatch, fast=True)
+    for (validated_type, validated_cursor, validated_body), (fast_type, fast_cursor, fast_body) in zip(validated, fast):
+        assert (fast_type, fast_cursor) == (validated_type, validated_cursor)
+        assert fast_body == validated_body
+    assert json.loads(fast[0][2]) == INDICATORS
@@ -0,0 +1,21 @@
+from app.routes.visualization import TIMELINE_MAX_DAYS
+
+
+def test_timeline_is_zero_filled_over_the_range(client, admin_headers):
+    response = client.post(
+        "/api/visualization/", json={"fromDate": "2023-01-01", "toDate": "2023-01-10"}, headers=admin_headers,
+    )
+    assert response.status_code == 200
+    timeline = response.json()["timelineData"]
+    assert [point["date"] for point in timeline] == [f"2023-01-{day:02d}" for day in range(1, 11)]
+
+
+def test_timeline_range_is_bounded(client, admin_headers):
+    response = client.post("/api/visualization/", json={"fromDate": "0001-01-01"}, headers=admin_headers)
+    assert response.status_code == 400
+
+    response = client.post(
+        "/api/visualization/", json={"fromDate": "2020-01-01", "toDate": "2021-12-31"}, headers=admin_headers,
+    )
+    assert response.status_code == 400
+    assert str(TIMELINE_MAX_DAYS) in response.json()["detail"]
@@ -169,7 +169,9 @@ const Feeds: React.FC = () => {
                         source: "Example Source",
                         description: "Example description",
                         lastUpdated: new Date().toISOString(),
-                        indicators: [],
+                        indicatorCount: 0,
+                        typeCounts: {},
+                        lastIngested: null,
                       })
                     }
                   >
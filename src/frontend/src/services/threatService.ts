@@ -1,5 +1,10 @@
 import api from "./api";
-import { ThreatFeed, ThreatIndicator, SearchFilters } from "../types";
+import {
+  ThreatFeed,
+  ThreatIndicator,
+  SearchFilters,
+  IndicatorPage,
+} from "../types";
 
 export const threatService = {
   // Get all threat feeds
@@ -14,6 +19,21 @@ export const threatService = {
     return response.data;
   },
 
+  // Get a feed's indicators one page at a time
+  getFeedIndicators: async (
+    id: string,
+    limit: number,
+    cursor?: string
+  ): Promise<IndicatorPage> => {
+    const response = await api.get(`/feeds/${id}/indicators`, {
+      params: { limit, cursor },
+    });
+    return {
+      items: response.data,
+      nextCursor: response.headers["x-next-cursor"] || null,
+    };
+  },
+
   // Search for indicators with filters
   searchIndicators: async (
     filters: SearchFilters
@@ -22,6 +42,21 @@ export const threatService = {
     return response.data;
   },
 
+  // Search for indicators one page at a time
+  searchIndicatorsPage: async (
+    filters: SearchFilters,
+    limit: number,
+    cursor?: string
+  ): Promise<IndicatorPage> => {
+    const response = await api.post("/indicators/search", filters, {
+      params: { limit, cursor },
+    });
+    return {
+      items: response.data,
+      nextCursor: response.headers["x-next-cursor"] || null,
+    };
+  },
+
   // Get indicator details by ID
   getIndicatorById: async (id: string): Promise<ThreatIndicator> => {
     const response = await api.get(`/indicators/${id}`);
@@ -9,13 +9,22 @@ export interface ThreatIndicator {
   description?: string;
 }
 
+export interface IndicatorPage {
+  items: ThreatIndicator[];
+  nextCursor: string | null;
+}
+
 export interface ThreatFeed {
   id: string;
   name: string;
   source: string;
   description: string;
   lastUpdated: string;
-  indicators: ThreatIndicator[];
+  url?: string;
+  rateLimit?: number | null;
+  indicatorCount: number;
+  typeCounts: Record<string, number>;
+  lastIngested: string | null;
 }
 
 export interface SearchFilters {
@@ -25,6 +34,7 @@ export interface SearchFilters {
   fromDate?: string;
   toDate?: string;
   tags?: string[];
+  searchTerm?: string;
 }
 
 export interface VisualizationData {